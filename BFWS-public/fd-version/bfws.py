@@ -8,12 +8,13 @@ from timeit import default_timer as timer
 #from prof import profiler_start, profiler_stop
 
 
-def main(domain_file, problem_file, search_alg):
+def main(domain_file, problem_file, search_alg, preprocess_cmd=None):
     task = BFWS()
 
     task.ignore_action_costs = True
 
-    dual_BFWS = search_alg == 'dual-1-BFWS'
+    dual_BFWS = search_alg in ('dual-1-BFWS', 'concurrent-dual-1-BFWS')
+    concurrent_sas = search_alg == 'concurrent-dual-1-BFWS'
     if dual_BFWS:
         search_alg = '1-BFWS'
         fdTask, groups, mutex_groups, translation_key, actions, axioms = fd.grounding.dual_translate(domain_file, problem_file, task)
@@ -45,16 +46,40 @@ def main(domain_file, problem_file, search_alg):
     # NIR: Comment line below to deactivate profiling
     #profiler_start( 'bfws.prof' )
 
+    # In concurrent mode the SAS+ translation (and the preprocessor, if
+    # the driver handed us one) runs in a forked worker while 1-BFWS searches.
+    sas_worker = None
+    if concurrent_sas:
+        sas_worker = fd.grounding.startSasWorker(fdTask, groups, mutex_groups, translation_key, actions, axioms, preprocess_cmd)
+
     # NIR: We call the setup method in SIW_Planner
-    task.setup()
+    with fd.timers.timing("BFWS setup", block=True):
+        task.setup()
 
     # NIR: And then we're ready to go
-    task.solve()
+    with fd.timers.timing("BFWS solve", block=True):
+        task.solve()
 
-    if dual_BFWS and os.path.getsize('plan.ipc') == 0:
+    if sas_worker is not None and os.path.getsize('plan.ipc') > 0:
+        fd.grounding.cancelSasWorker(sas_worker)
+        print "1-BFWS found a plan, SAS worker cancelled"
+    elif dual_BFWS and os.path.getsize('plan.ipc') == 0:
         sas_timer = fd.timers.Timer()
-        fd.grounding.translateToSas(fdTask, groups, mutex_groups, translation_key, actions, axioms)
-        print "Output sas file completed in", sas_timer.report(), 'secs'
+        if sas_worker is not None:
+            returncode = fd.grounding.joinSasWorker(sas_worker)
+            print "SAS worker joined", sas_timer.report(), 'secs after search'
+            if returncode != 0:
+                return returncode
+        elif preprocess_cmd:
+            # The driver asked us to run the preprocessor ourselves, so the
+            # grounded task never round-trips through output.sas.
+            returncode = fd.grounding.translateToPreprocess(fdTask, groups, mutex_groups, translation_key, actions, axioms, preprocess_cmd)
+            print "Preprocess completed in", sas_timer.report(), 'secs'
+            if returncode != 0:
+                return returncode
+        else:
+            fd.grounding.translateToSas(fdTask, groups, mutex_groups, translation_key, actions, axioms)
+            print "Output sas file completed in", sas_timer.report(), 'secs'
     elif not dual_BFWS:
         end = timer()
         print "TOTAL TIME:", end - start, 's'
@@ -64,6 +89,7 @@ def main(domain_file, problem_file, search_alg):
     #rv = os.system( 'google-pprof --pdf libbfws.so bfws.prof > bfws.pdf' )
     # if rv != 0 :
     #	print >> sys.stderr, "An error occurred while translating google-perftools profiling information into valgrind format"
+    return 0
 
 
 def debug():
@@ -73,4 +99,28 @@ def debug():
 
 
 if __name__ == "__main__":
-    main(sys.argv[1], sys.argv[2], sys.argv[3])
+    # "--profile FILE" may precede the inputs; the phases measured by
+    # fd.timers are then written to FILE as JSON, even if we exit early.
+    # Any arguments after the search algorithm form the preprocessor
+    # command line used in dual mode (see translateToPreprocess).
+    args = sys.argv[1:]
+    profile_file = None
+    if args[:1] == ['--profile']:
+        profile_file = args[1]
+        args = args[2:]
+    returncode = 0
+    try:
+        returncode = main(args[0], args[1], args[2], args[3:])
+    except MemoryError:
+        # Exit with the out-of-memory code of the planner components
+        # (std::bad_alloc in libbfws arrives here as MemoryError), so the
+        # driver knows that 1-BFWS hit its memory limit.
+        print >> sys.stderr, "1-BFWS ran out of memory"
+        returncode = 6
+    finally:
+        if profile_file:
+            fd.timers.write_profile(profile_file, component='bfws',
+                                    search=args[2])
+    # Exit only after the profile is written: a component killed by a
+    # signal makes us die from the same signal.
+    fd.grounding.exitWithReturncode(returncode)
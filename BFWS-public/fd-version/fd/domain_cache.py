@@ -0,0 +1,167 @@
+#! /usr/bin/env python
+
+"""Persistent cache of the domain-level work of the translator.
+
+When many problems of the same domain are translated, parsing and
+normalizing the domain, translating its actions and axioms into Datalog
+rules and synthesizing invariants is repeated for every problem. With
+--domain-cache DIR, the translator stores the normalized domain together
+with its normalized and split Datalog rules in DIR, and the invariants
+found for it. Later runs only do the problem-specific work.
+
+Entries are keyed by a hash of the domain file, of the translator sources
+and of the Python version, so that changes to any of them invalidate the
+cache. Invariants additionally depend on which action parameters are
+known to be distinct (see invariant_finder.get_inequal_params), so the
+invariant store of a domain keeps them per combination of distinct
+parameters (see DomainCache.get_invariants)."""
+
+from __future__ import print_function
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import invariant_finder
+import normalize
+import options
+import pddl_to_prolog
+from pddl_parser import pddl_file
+from pddl_parser import parsing_functions
+
+
+TRANSLATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_translator_version():
+    """Return a hash of the source files of the translator."""
+    version = hashlib.sha1()
+    for dirpath, dirnames, filenames in sorted(os.walk(TRANSLATOR_DIR)):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(".py"):
+                path = os.path.join(dirpath, filename)
+                version.update(os.path.relpath(path, TRANSLATOR_DIR).encode())
+                with open(path, "rb") as source_file:
+                    version.update(source_file.read())
+    return version.hexdigest()
+
+
+class CachedDomain(object):
+    """A normalized domain and its Datalog program. They are pickled
+    together because the rules refer to the actions and axioms of the
+    domain by identity."""
+    def __init__(self, domain, program):
+        self.domain = domain
+        self.program = program
+
+
+class DomainCache(object):
+    def __init__(self, directory, domain_filename):
+        self.directory = directory
+        self.domain_filename = domain_filename
+        key = hashlib.sha1()
+        with open(domain_filename, "rb") as domain_file:
+            key.update(domain_file.read())
+        key.update(get_translator_version().encode())
+        key.update(repr(sys.version_info[:2]).encode())
+        self.key = key.hexdigest()
+        self.program = None
+
+    def _get_filename(self, kind, suffix=""):
+        return os.path.join(self.directory, "%s-%s%s.pickle" % (
+            self.key, kind, suffix))
+
+    def _load(self, filename):
+        try:
+            with open(filename, "rb") as cache_file:
+                return pickle.load(cache_file)
+        except IOError:
+            return None
+        except Exception as e:
+            # Corrupted or incompatible entries are simply recomputed.
+            print("Ignoring cache entry %s: %s" % (filename, e))
+            return None
+
+    def _store(self, filename, obj):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        # Write to a temporary file first, so that concurrent translator
+        # runs never read a partially written entry.
+        handle, tmp_filename = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(handle, "wb") as cache_file:
+                pickle.dump(obj, cache_file, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_filename, filename)
+        except:
+            os.remove(tmp_filename)
+            raise
+
+    def _load_domain(self):
+        filename = self._get_filename("domain")
+        cached = self._load(filename)
+        if cached is not None:
+            print("Using cached domain %s" % filename)
+            return cached
+        print("Domain not in cache, normalizing it")
+        domain_pddl = pddl_file.parse_pddl_file("domain", self.domain_filename)
+        domain = parsing_functions.parse_domain(domain_pddl)
+        normalize.normalize(domain)
+        program = pddl_to_prolog.translate_domain(domain)
+        cached = CachedDomain(domain, program)
+        self._store(filename, cached)
+        return cached
+
+    def open_task(self, task_filename):
+        """Parse the problem with the cached domain. The actions and axioms
+        of the returned task are normalized already; its goal must be
+        normalized with normalize.normalize_goal."""
+        cached = self._load_domain()
+        self.program = cached.program
+        task_pddl = pddl_file.parse_pddl_file("task", task_filename)
+        return parsing_functions.parse_problem(cached.domain, task_pddl)
+
+    def get_invariants(self, task, reachable_action_params):
+        """Return the sorted invariants of the task.
+
+        The invariant store of the domain maps combinations of distinct
+        action parameters to the invariants found for them. If the
+        combination of this task is in the store, its invariants are
+        returned unchanged. Otherwise, if the store is not empty, all
+        invariants proven for other problems are revalidated for this
+        task instead of synthesizing invariants from scratch. This is
+        much faster, but may miss invariants that only hold with the
+        distinct parameters of this task."""
+        signature = [(action.name, invariant_finder.get_inequal_params(
+            action, reachable_action_params)) for action in task.actions]
+        key = hashlib.sha1(repr((
+            signature, options.invariant_generation_max_candidates,
+            options.generate_relaxed_task)).encode()).hexdigest()
+        filename = self._get_filename("invariants")
+        store = self._load(filename) or {}
+        if key in store:
+            print("Using %d cached invariants" % len(store[key]))
+            return store[key]
+        if store:
+            known_invariants = set()
+            for invariants in store.values():
+                known_invariants.update(invariants)
+            invariants = sorted(invariant_finder.revalidate_invariants(
+                task, sorted(known_invariants), reachable_action_params))
+            print("Revalidated %d of %d cached invariants" % (
+                len(invariants), len(known_invariants)))
+            return invariants
+        start_time = time.time()
+        invariants = sorted(invariant_finder.find_invariants(
+            task, reachable_action_params))
+        # Incomplete results due to the time limit are not cached. The
+        # limit is on CPU time of this process or on wall-clock time (see
+        # invariant_finder.find_invariants), neither of which can exceed
+        # the elapsed wall-clock time here.
+        if time.time() - start_time <= options.invariant_generation_max_time:
+            store[key] = invariants
+            self._store(filename, store)
+        return invariants
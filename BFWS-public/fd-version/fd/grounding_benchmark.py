@@ -0,0 +1,130 @@
+#! /usr/bin/env python
+
+"""Time the encoding of ground actions for the planner.
+
+Usage: python -m fd.grounding_benchmark [DOMAIN TASK]
+
+Compares PropositionalDetAction, which looks up the axioms defining a
+negated effect condition by name, with the former linear scan over all
+axioms (LinearScanAction). Without arguments, the comparison runs on
+synthetic ADL tasks with nested universally quantified conditional
+effects and one derived axiom per object pair. With a domain and task,
+it runs on all ground actions and axioms of that task."""
+
+from __future__ import print_function
+
+import sys
+import timeit
+
+from fd import grounding
+from fd import pddl
+
+
+class LinearScanAction(grounding.PropositionalDetAction):
+    """PropositionalDetAction with the former axiom lookup, which
+    compared the name of every axiom with every negated condition."""
+
+    def encode_condition(self, cond, atom_table, atom_names, axioms):
+        axioms_by_name = {}
+        for cond_lit in cond:
+            sym = atom_table[cond_lit.text()]
+            if cond_lit.negated and sym not in self.negated_conditions:
+                name = '(' + atom_names[sym] + ')'
+                matching = [a for a in axioms if a.name == name]
+                if matching:
+                    axioms_by_name[name] = matching
+        return grounding.PropositionalDetAction.encode_condition(
+            self, cond, atom_table, atom_names, axioms_by_name)
+
+
+def encode_actions(action_class, axiom_lookup, actions, atom_table, atom_names):
+    encoded = []
+    for action in actions:
+        nd_action = action_class(action.name, action.cost)
+        nd_action.set_precondition(action.precondition, atom_table)
+        nd_action.add_effect(action.add_effects, action.del_effects,
+                             atom_table, atom_names, axiom_lookup)
+        encoded.append((nd_action.precondition, nd_action.effects,
+                        nd_action.cond_effs, nd_action.negated_conditions))
+    return encoded
+
+
+def linear_scan(actions, axioms, atom_table, atom_names):
+    return encode_actions(LinearScanAction, axioms,
+                          actions, atom_table, atom_names)
+
+
+def current(actions, axioms, atom_table, atom_names):
+    return encode_actions(grounding.PropositionalDetAction,
+                          grounding.index_axioms_by_name(axioms),
+                          actions, atom_table, atom_names)
+
+
+def synthetic_task(num_objects):
+    """Ground actions and axioms of a task in which (move ?x ?y) adds
+    (at ?y) if (blocked ?y ?z) holds for no ?z, and (blocked ?x ?y) is
+    derived from (at ?x) and not (free ?y). (reset ?x) frees every ?z
+    unless ?x is not free, a negated condition with no axiom."""
+    objects = ["o%d" % i for i in range(num_objects)]
+    axioms = []
+    actions = []
+    for x in objects:
+        for y in objects:
+            axioms.append(pddl.PropositionalAxiom(
+                "(blocked_%s_%s)" % (x, y),
+                [pddl.Atom("at", [x]), pddl.NegatedAtom("free", [y])],
+                pddl.Atom("blocked", [x, y])))
+            condition = [pddl.NegatedAtom("blocked", [y, z]) for z in objects]
+            effects = [(condition, pddl.Atom("at", [y]))]
+            actions.append(pddl.PropositionalAction(
+                "(move %s %s)" % (x, y), [pddl.Atom("at", [x])], effects, 1))
+    for x in objects:
+        effects = [([pddl.NegatedAtom("free", [x])], pddl.Atom("free", [z]))
+                   for z in objects]
+        actions.append(pddl.PropositionalAction(
+            "(reset %s)" % x, [], effects, 1))
+    atoms = set()
+    for x in objects:
+        atoms.update(["at_" + x, "free_" + x])
+        atoms.update("blocked_%s_%s" % (x, y) for y in objects)
+    return actions, axioms, sorted(atoms)
+
+
+def ground_task():
+    from fd import instantiate
+    from fd import normalize
+    from fd import pddl_parser
+
+    task = pddl_parser.open(
+        domain_filename=sys.argv[1], task_filename=sys.argv[2])
+    normalize.normalize(task)
+    _, atoms, actions, axioms, _ = instantiate.explore(task)
+    return actions, axioms, sorted(atom.text() for atom in atoms)
+
+
+def time_encoding(function, arguments, repeat=3):
+    return min(timeit.repeat(lambda: function(*arguments),
+                             number=1, repeat=repeat))
+
+
+def report(label, actions, axioms, atom_names):
+    atom_table = dict((atom, index) for index, atom in enumerate(atom_names))
+    arguments = (actions, axioms, atom_table, atom_names)
+    assert linear_scan(*arguments) == current(*arguments)
+    old = time_encoding(linear_scan, arguments)
+    new = time_encoding(current, arguments)
+    print("%-40s linear scan: %8.3f s  current: %8.3f s  speedup: %6.1fx" % (
+        "%s (%d actions, %d axioms)" % (label, len(actions), len(axioms)),
+        old, new, old / new))
+
+
+def main():
+    if len(sys.argv) == 3:
+        report(sys.argv[2], *ground_task())
+    else:
+        for num_objects in [10, 20, 40]:
+            report("%d objects" % num_objects, *synthetic_task(num_objects))
+
+
+if __name__ == "__main__":
+    main()
@@ -43,7 +43,9 @@ class Axiom(object):
         return PropositionalAxiom(name, condition, effect)
 
 
-class PropositionalAxiom:
+class PropositionalAxiom(object):
+    __slots__ = ("name", "condition", "effect")
+
     def __init__(self, name, condition, effect):
         self.name = name
         self.condition = condition
@@ -35,6 +35,9 @@ class PrimitiveNumericExpression(FunctionalExpression):
         self.hash = hash((self.__class__, self.symbol, self.args))
     def __hash__(self):
         return self.hash
+    def __reduce__(self):
+        # See Condition.__reduce__.
+        return (self.__class__, (self.symbol, self.args))
     def __eq__(self, other):
         return (self.__class__ == other.__class__ and self.symbol == other.symbol
                 and self.args == other.args)
@@ -1,10 +1,3 @@
-try:
-    # Python 3.x
-    from builtins import open as file_open
-except ImportError:
-    # Python 2.x
-    from codecs import open as file_open
-
 from .. import options
 
 from . import lisp_parser
@@ -13,13 +6,7 @@ from . import parsing_functions
 
 def parse_pddl_file(type, filename):
     try:
-        # The builtin open function is shadowed by this module's open function.
-        # We use the Latin-1 encoding (which allows a superset of ASCII, of the
-        # Latin-* encodings and of UTF-8) to allow special characters in
-        # comments. In all other parts, we later validate that only ASCII is
-        # used.
-        return lisp_parser.parse_nested_list(file_open(filename,
-                                                       encoding='ISO-8859-1'))
+        return lisp_parser.parse_nested_list_from_file(filename)
     except IOError as e:
         raise SystemExit("Error: Could not read file: %s\nReason: %s." %
                          (e.filename, e))
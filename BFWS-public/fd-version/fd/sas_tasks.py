@@ -1,9 +1,58 @@
 from __future__ import print_function
 
+import struct
+
 SAS_FILE_VERSION = 3
 
+# The binary format stores the same sections as version SAS_FILE_VERSION
+# of the text format, without the begin_/end_ markers. All integers are
+# little-endian 32-bit integers. Lists (of values, facts, operators, ...)
+# and strings (UTF-8) are prefixed with their length. The leading NUL
+# byte of the magic string lets readers tell the formats apart.
+SAS_BINARY_MAGIC = b"\0SAS"
+SAS_BINARY_FILE_VERSION = 1
+
 DEBUG = False
 
+# The text output is collected in lists of lines, which are written to the
+# stream in chunks of this many lines.
+OUTPUT_CHUNK_LINES = 100000
+
+
+class BinaryWriter:
+    """Collect the binary SAS representation in memory. Integers are
+    packed in bulk with pack_ints, which is much faster than packing
+    them one by one."""
+    def __init__(self):
+        self.chunks = []
+
+    def pack_ints(self, values):
+        self.chunks.append(struct.pack("<%di" % len(values), *values))
+
+    def pack_string(self, string):
+        encoded = string.encode("utf-8")
+        self.chunks.append(struct.pack("<i", len(encoded)))
+        self.chunks.append(encoded)
+
+    def write(self, stream):
+        stream.write(b"".join(self.chunks))
+        self.chunks = []
+
+
+def flatten_pairs(pairs):
+    """Return [len(pairs), var1, val1, var2, val2, ...]."""
+    result = [len(pairs)]
+    for var, val in pairs:
+        result.append(var)
+        result.append(val)
+    return result
+
+
+def write_lines(stream, lines):
+    if lines:
+        stream.write("\n".join(lines))
+        stream.write("\n")
+
 
 class SASTask:
     """Planning task in finite-domain representation.
@@ -78,24 +127,51 @@ class SASTask:
         print("metric: %s" % self.metric)
 
     def output(self, stream):
-        print("begin_version", file=stream)
-        print(SAS_FILE_VERSION, file=stream)
-        print("end_version", file=stream)
-        print("begin_metric", file=stream)
-        print(int(self.metric), file=stream)
-        print("end_metric", file=stream)
-        self.variables.output(stream)
-        print(len(self.mutexes), file=stream)
+        """Write the task in the text format to stream. The lines are
+        assembled in memory and written in large chunks, which is much
+        faster than writing them one by one."""
+        lines = [
+            "begin_version", str(SAS_FILE_VERSION), "end_version",
+            "begin_metric", str(int(self.metric)), "end_metric"]
+        self.variables.output_lines(lines)
+        lines.append(str(len(self.mutexes)))
+        for mutex in self.mutexes:
+            mutex.output_lines(lines)
+        self.init.output_lines(lines)
+        self.goal.output_lines(lines)
+        lines.append(str(len(self.operators)))
+        for op in self.operators:
+            op.output_lines(lines)
+            if len(lines) >= OUTPUT_CHUNK_LINES:
+                write_lines(stream, lines)
+                lines = []
+        lines.append(str(len(self.axioms)))
+        for axiom in self.axioms:
+            axiom.output_lines(lines)
+            if len(lines) >= OUTPUT_CHUNK_LINES:
+                write_lines(stream, lines)
+                lines = []
+        write_lines(stream, lines)
+
+    def output_binary(self, stream):
+        """Write the task in the binary format to stream, which must be
+        opened in binary mode."""
+        writer = BinaryWriter()
+        writer.chunks.append(SAS_BINARY_MAGIC)
+        writer.pack_ints([SAS_BINARY_FILE_VERSION, int(self.metric)])
+        self.variables.output_binary(writer)
+        writer.pack_ints([len(self.mutexes)])
         for mutex in self.mutexes:
-            mutex.output(stream)
-        self.init.output(stream)
-        self.goal.output(stream)
-        print(len(self.operators), file=stream)
+            mutex.output_binary(writer)
+        self.init.output_binary(writer)
+        self.goal.output_binary(writer)
+        writer.pack_ints([len(self.operators)])
         for op in self.operators:
-            op.output(stream)
-        print(len(self.axioms), file=stream)
+            op.output_binary(writer)
+        writer.pack_ints([len(self.axioms)])
         for axiom in self.axioms:
-            axiom.output(stream)
+            axiom.output_binary(writer)
+        writer.write(stream)
 
     def get_encoding_size(self):
         task_size = 0
@@ -157,18 +233,27 @@ class SASVariables:
                 axiom_str = ""
             print("v%d in {%s}%s" % (var, list(range(rang)), axiom_str))
 
-    def output(self, stream):
-        print(len(self.ranges), file=stream)
+    def output_lines(self, lines):
+        lines.append(str(len(self.ranges)))
+        for var, (rang, axiom_layer, values) in enumerate(zip(
+                self.ranges, self.axiom_layers, self.value_names)):
+            lines.append("begin_variable")
+            lines.append("var%d" % var)
+            lines.append(str(axiom_layer))
+            lines.append(str(rang))
+            assert rang == len(values), (rang, values)
+            lines.extend(values)
+            lines.append("end_variable")
+
+    def output_binary(self, writer):
+        writer.pack_ints([len(self.ranges)])
         for var, (rang, axiom_layer, values) in enumerate(zip(
                 self.ranges, self.axiom_layers, self.value_names)):
-            print("begin_variable", file=stream)
-            print("var%d" % var, file=stream)
-            print(axiom_layer, file=stream)
-            print(rang, file=stream)
             assert rang == len(values), (rang, values)
+            writer.pack_string("var%d" % var)
+            writer.pack_ints([axiom_layer, rang])
             for value in values:
-                print(value, file=stream)
-            print("end_variable", file=stream)
+                writer.pack_string(value)
 
     def get_encoding_size(self):
         # A variable with range k has encoding size k + 1 to also give the
@@ -191,12 +276,14 @@ class SASMutexGroup:
         for var, val in self.facts:
             print("v%d: %d" % (var, val))
 
-    def output(self, stream):
-        print("begin_mutex_group", file=stream)
-        print(len(self.facts), file=stream)
-        for var, val in self.facts:
-            print(var, val, file=stream)
-        print("end_mutex_group", file=stream)
+    def output_lines(self, lines):
+        lines.append("begin_mutex_group")
+        lines.append(str(len(self.facts)))
+        lines.extend("%s %s" % (var, val) for var, val in self.facts)
+        lines.append("end_mutex_group")
+
+    def output_binary(self, writer):
+        writer.pack_ints(flatten_pairs(self.facts))
 
     def get_encoding_size(self):
         return len(self.facts)
@@ -221,11 +308,13 @@ class SASInit:
         for var, val in enumerate(self.values):
             print("v%d: %d" % (var, val))
 
-    def output(self, stream):
-        print("begin_state", file=stream)
-        for val in self.values:
-            print(val, file=stream)
-        print("end_state", file=stream)
+    def output_lines(self, lines):
+        lines.append("begin_state")
+        lines.extend(map(str, self.values))
+        lines.append("end_state")
+
+    def output_binary(self, writer):
+        writer.pack_ints([len(self.values)] + list(self.values))
 
 
 class SASGoal:
@@ -241,12 +330,14 @@ class SASGoal:
         for var, val in self.pairs:
             print("v%d: %d" % (var, val))
 
-    def output(self, stream):
-        print("begin_goal", file=stream)
-        print(len(self.pairs), file=stream)
-        for var, val in self.pairs:
-            print(var, val, file=stream)
-        print("end_goal", file=stream)
+    def output_lines(self, lines):
+        lines.append("begin_goal")
+        lines.append(str(len(self.pairs)))
+        lines.extend("%s %s" % (var, val) for var, val in self.pairs)
+        lines.append("end_goal")
+
+    def output_binary(self, writer):
+        writer.pack_ints(flatten_pairs(self.pairs))
 
     def get_encoding_size(self):
         return len(self.pairs)
@@ -358,20 +449,34 @@ class SASOperator:
                 cond_str = ""
             print("  v%d: %d -> %d%s" % (var, pre, post, cond_str))
 
-    def output(self, stream):
-        print("begin_operator", file=stream)
-        print(self.name[1:-1], file=stream)
-        print(len(self.prevail), file=stream)
-        for var, val in self.prevail:
-            print(var, val, file=stream)
-        print(len(self.pre_post), file=stream)
+    def output_lines(self, lines):
+        lines.append("begin_operator")
+        lines.append(self.name[1:-1])
+        lines.append(str(len(self.prevail)))
+        lines.extend("%s %s" % (var, val) for var, val in self.prevail)
+        lines.append(str(len(self.pre_post)))
         for var, pre, post, cond in self.pre_post:
-            print(len(cond), end=' ', file=stream)
-            for cvar, cval in cond:
-                print(cvar, cval, end=' ', file=stream)
-            print(var, pre, post, file=stream)
-        print(self.cost, file=stream)
-        print("end_operator", file=stream)
+            if cond:
+                cond_str = " ".join(
+                    "%s %s" % (cvar, cval) for cvar, cval in cond)
+                lines.append("%d %s %s %s %s" % (
+                    len(cond), cond_str, var, pre, post))
+            else:
+                lines.append("0 %s %s %s" % (var, pre, post))
+        lines.append(str(self.cost))
+        lines.append("end_operator")
+
+    def output_binary(self, writer):
+        writer.pack_string(self.name[1:-1])
+        ints = flatten_pairs(self.prevail)
+        ints.append(len(self.pre_post))
+        for var, pre, post, cond in self.pre_post:
+            ints.extend(flatten_pairs(cond))
+            ints.append(var)
+            ints.append(pre)
+            ints.append(post)
+        ints.append(self.cost)
+        writer.pack_ints(ints)
 
     def get_encoding_size(self):
         size = 1 + len(self.prevail)
@@ -466,14 +571,19 @@ class SASAxiom:
         var, val = self.effect
         print("  v%d: %d" % (var, val))
 
-    def output(self, stream):
-        print("begin_rule", file=stream)
-        print(len(self.condition), file=stream)
-        for var, val in self.condition:
-            print(var, val, file=stream)
+    def output_lines(self, lines):
+        lines.append("begin_rule")
+        lines.append(str(len(self.condition)))
+        lines.extend("%s %s" % (var, val) for var, val in self.condition)
+        var, val = self.effect
+        lines.append("%s %s %s" % (var, 1 - val, val))
+        lines.append("end_rule")
+
+    def output_binary(self, writer):
+        ints = flatten_pairs(self.condition)
         var, val = self.effect
-        print(var, 1 - val, val, file=stream)
-        print("end_rule", file=stream)
+        ints.extend([var, 1 - val, val])
+        writer.pack_ints(ints)
 
     def get_encoding_size(self):
         return 1 + len(self.condition)
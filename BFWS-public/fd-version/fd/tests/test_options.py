@@ -0,0 +1,25 @@
+import options
+
+
+def test_set_options():
+    options.set_options(task="p01.pddl", use_partial_encoding=False)
+    assert options.task == "p01.pddl"
+    assert options.domain is None
+    assert not options.use_partial_encoding
+    assert options.invariant_generation_max_time == 300
+    options.set_options()
+    assert options.task is None
+    assert options.use_partial_encoding
+    try:
+        options.set_options(no_such_option=True)
+    except TypeError:
+        pass
+    else:
+        assert False
+
+
+def test_setup():
+    options.setup(["d.pddl", "p.pddl", "--full-encoding"])
+    assert (options.domain, options.task) == ("d.pddl", "p.pddl")
+    assert not options.use_partial_encoding
+    options.set_options()
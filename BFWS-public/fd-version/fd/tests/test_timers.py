@@ -0,0 +1,13 @@
+import timers
+
+
+def test_reset():
+    with timers.timing("Outer", block=True):
+        with timers.timing("Inner"):
+            timers.add_counts(atoms=3)
+        timers.reset()
+        assert [phase.name for phase in timers._phases] == ["Outer"]
+    timers.add_counts(actions=5)
+    timers.reset()
+    assert timers._phases == []
+    assert timers._counts == {}
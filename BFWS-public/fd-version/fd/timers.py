@@ -3,10 +3,13 @@ from __future__ import print_function
 # -*- coding: utf-8 -*-
 
 import contextlib
+import json
 import os
 import sys
 import time
 
+import tools
+
 
 class Timer(object):
     def __init__(self):
@@ -26,17 +29,92 @@ class Timer(object):
         return  self._clock() - self.start_clock
 
 
+class Phase(object):
+    """Measurements of one timing() block, kept for write_profile()."""
+    def __init__(self, name, parent):
+        self.name = name
+        self.parent = parent
+        self.timer = Timer()
+        self.counts = {}
+        self.wall_time = None
+        self.cpu_time = None
+        self.peak_rss = None
+
+    def finish(self):
+        self.wall_time = time.time() - self.timer.start_time
+        self.cpu_time = self.timer._clock() - self.timer.start_clock
+        self.peak_rss = _get_peak_rss_in_kb()
+
+    def to_dict(self):
+        return {"name": self.name, "parent": self.parent,
+                "wall_time": self.wall_time, "cpu_time": self.cpu_time,
+                "peak_rss_kb": self.peak_rss, "counts": self.counts}
+
+
+_phases = []
+_open_phases = []
+_counts = {}
+_process_timer = Timer()
+
+
+def _get_peak_rss_in_kb():
+    try:
+        return tools.get_peak_rss_in_kb()
+    except Warning:
+        return None
+
+
+def add_counts(**counts):
+    """Attach object counts (e.g. number of atoms) to the innermost open
+    timing() block, or to the whole process outside of any block."""
+    if _open_phases:
+        _open_phases[-1].counts.update(counts)
+    else:
+        _counts.update(counts)
+
+
+def reset():
+    """Forget the phases and counts measured so far and restart the
+    process timer, e.g. before translating the next task in the same
+    process. Open timing() blocks are kept."""
+    global _process_timer
+    _phases[:] = _open_phases
+    _counts.clear()
+    _process_timer = Timer()
+
+
+def write_profile(filename, **info):
+    """Write all phases measured so far as JSON to filename. Phases are
+    listed in the order in which they started; nested phases name their
+    parent."""
+    profile = dict(info)
+    profile["wall_time"] = time.time() - _process_timer.start_time
+    profile["cpu_time"] = _process_timer._clock() - _process_timer.start_clock
+    profile["peak_rss_kb"] = _get_peak_rss_in_kb()
+    profile["counts"] = _counts
+    profile["phases"] = [phase.to_dict() for phase in _phases]
+    with open(filename, "w") as profile_file:
+        json.dump(profile, profile_file, indent=2, sort_keys=True)
+
+
 @contextlib.contextmanager
 def timing(text, block=False):
-    timer = Timer()
+    parent = _open_phases[-1].name if _open_phases else None
+    phase = Phase(text, parent)
     if block:
         print("%s..." % text)
     else:
         print("%s..." % text, end=' ')
     sys.stdout.flush()
-    yield
+    _phases.append(phase)
+    _open_phases.append(phase)
+    try:
+        yield
+    finally:
+        phase.finish()
+        _open_phases.pop()
     if block:
-        print("%s: %s" % (text, timer))
+        print("%s: %s" % (text, phase.timer))
     else:
-        print(timer)
+        print(phase.timer)
     sys.stdout.flush()
@@ -28,3 +28,16 @@ def get_peak_memory_in_kb():
     except IOError:
         pass
     raise Warning("warning: could not determine peak memory")
+
+
+def get_peak_rss_in_kb():
+    try:
+        # This will only work on Linux systems.
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                parts = line.split()
+                if parts[0] == "VmHWM:":
+                    return int(parts[1])
+    except IOError:
+        pass
+    raise Warning("warning: could not determine peak resident set size")
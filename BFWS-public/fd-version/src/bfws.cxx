@@ -34,6 +34,172 @@ BFWS::setup() {
 }
 
 
+namespace {
+
+// Read-only view of the native ints held by an object that exports the
+// buffer interface, so bulk loading does not convert Python lists of tuples.
+class Int_Buffer {
+public:
+	Int_Buffer( boost::python::object& obj ) {
+		if ( PyObject_GetBuffer( obj.ptr(), &m_view, PyBUF_SIMPLE ) != 0 )
+			boost::python::throw_error_already_set();
+		if ( m_view.len % sizeof(int) != 0 ) {
+			PyBuffer_Release( &m_view );
+			PyErr_SetString( PyExc_ValueError, "buffer size is not a multiple of sizeof(int)" );
+			boost::python::throw_error_already_set();
+		}
+	}
+
+	~Int_Buffer() {
+		PyBuffer_Release( &m_view );
+	}
+
+	size_t	size() const { return m_view.len / sizeof(int); }
+	int	operator[]( size_t i ) const { return static_cast<const int*>( m_view.buf )[i]; }
+
+private:
+	Py_buffer	m_view;
+};
+
+void
+check_offsets( const Int_Buffer& offsets, size_t num_items, size_t num_lits ) {
+	if ( offsets.size() != num_items + 1 || offsets[0] != 0 || (size_t)offsets[num_items] != num_lits ) {
+		PyErr_SetString( PyExc_ValueError, "offsets do not match the number of items and literals" );
+		boost::python::throw_error_already_set();
+	}
+}
+
+}
+
+unsigned
+BFWS::condition_fluent( int lit ) const {
+	unsigned fl_idx = lit >> 1;
+	if ( lit & 1 )
+		return m_negated[ fl_idx ]->index();
+	return fl_idx;
+}
+
+void
+BFWS::add_effect_literal( int lit, aptk::Fluent_Vec& adds, aptk::Fluent_Vec& dels ) const {
+	unsigned fl_idx = lit >> 1;
+	bool negated = lit & 1;
+	// NIR: Fluents used in negated conditions also maintain their negation
+	if ( m_negated[ fl_idx ] == nullptr ) {
+		if ( negated )
+			dels.push_back( fl_idx );
+		else
+			adds.push_back( fl_idx );
+		return;
+	}
+	unsigned neg_fl_idx = m_negated[ fl_idx ]->index();
+	if ( negated ) {
+		adds.push_back( neg_fl_idx );
+		dels.push_back( fl_idx );
+		return;
+	}
+	dels.push_back( neg_fl_idx );
+	adds.push_back( fl_idx );
+}
+
+void
+BFWS::add_atoms( boost::python::list& names ) {
+	for ( int i = 0; i < len(names); i++ )
+		add_atom( boost::python::extract<std::string>( names[i] ) );
+}
+
+void
+BFWS::add_actions( boost::python::list& names, boost::python::object costs ) {
+	Int_Buffer cost_buf( costs );
+	size_t first = instance()->num_actions();
+	if ( cost_buf.size() != (size_t)len(names) ) {
+		PyErr_SetString( PyExc_ValueError, "need one cost per action" );
+		boost::python::throw_error_already_set();
+	}
+	for ( int i = 0; i < len(names); i++ ) {
+		add_action( boost::python::extract<std::string>( names[i] ) );
+		set_cost( first + i, cost_buf[i] );
+	}
+}
+
+void
+BFWS::add_preconditions( boost::python::object offsets, boost::python::object lits ) {
+	Int_Buffer off( offsets ), lit( lits );
+	size_t num_actions = instance()->num_actions();
+	check_offsets( off, num_actions, lit.size() );
+	for ( size_t a = 0; a < num_actions; a++ ) {
+		aptk::Action& action = *(instance()->actions()[a]);
+		for ( int k = off[a]; k < off[a+1]; k++ ) {
+			unsigned fl_idx = condition_fluent( lit[k] );
+			action.prec_vec().push_back( fl_idx );
+			action.prec_set().set( fl_idx );
+			action.prec_varval().push_back( std::make_pair( fl_idx, 0 ) );
+		}
+	}
+}
+
+void
+BFWS::add_effects( boost::python::object offsets, boost::python::object lits ) {
+	Int_Buffer off( offsets ), lit( lits );
+	size_t num_actions = instance()->num_actions();
+	check_offsets( off, num_actions, lit.size() );
+	for ( size_t a = 0; a < num_actions; a++ ) {
+		aptk::Action& action = *(instance()->actions()[a]);
+		aptk::Fluent_Vec adds, dels;
+		for ( int k = off[a]; k < off[a+1]; k++ )
+			add_effect_literal( lit[k], adds, dels );
+		for ( auto p : adds ) {
+			action.add_vec().push_back( p );
+			action.add_set().set( p );
+		}
+		for ( auto p : dels ) {
+			action.del_vec().push_back( p );
+			action.del_set().set( p );
+			action.edel_vec().push_back( p );
+			action.edel_set().set( p );
+		}
+	}
+}
+
+void
+BFWS::add_cond_effects( boost::python::object action_offsets,
+			boost::python::object cond_offsets, boost::python::object cond_lits,
+			boost::python::object eff_offsets, boost::python::object eff_lits ) {
+	Int_Buffer act_off( action_offsets ), cond_off( cond_offsets ), cond( cond_lits );
+	Int_Buffer eff_off( eff_offsets ), eff( eff_lits );
+	size_t num_actions = instance()->num_actions();
+	check_offsets( act_off, num_actions, cond_off.size() - 1 );
+	size_t num_ceffs = act_off[num_actions];
+	check_offsets( cond_off, num_ceffs, cond.size() );
+	check_offsets( eff_off, num_ceffs, eff.size() );
+	for ( size_t a = 0; a < num_actions; a++ ) {
+		aptk::Action& action = *(instance()->actions()[a]);
+		for ( int c = act_off[a]; c < act_off[a+1]; c++ ) {
+			aptk::Fluent_Vec cond_fluents, add_fluents, del_fluents;
+			for ( int k = cond_off[c]; k < cond_off[c+1]; k++ )
+				cond_fluents.push_back( condition_fluent( cond[k] ) );
+			for ( int k = eff_off[c]; k < eff_off[c+1]; k++ )
+				add_effect_literal( eff[k], add_fluents, del_fluents );
+			aptk::Conditional_Effect* cond_eff = new aptk::Conditional_Effect( *instance() );
+			cond_eff->define( cond_fluents, add_fluents, del_fluents );
+			action.ceff_vec().push_back( cond_eff );
+			instance()->notify_cond_eff_in_action();
+		}
+	}
+}
+
+void
+BFWS::add_mutex_groups( boost::python::object offsets, boost::python::object lits ) {
+	Int_Buffer off( offsets ), lit( lits );
+	size_t num_groups = off.size() - 1;
+	check_offsets( off, num_groups, lit.size() );
+	for ( size_t g = 0; g < num_groups; g++ ) {
+		aptk::Fluent_Vec group;
+		for ( int k = off[g]; k < off[g+1]; k++ )
+			group.push_back( condition_fluent( lit[k] ) );
+		instance()->mutexes().add( group );
+	}
+}
+
 template <typename Search_Engine>
 void BFWS::bfws_options( Fwd_Search_Problem&	search_prob, Search_Engine& bfs_engine, unsigned max_novelty, Landmarks_Graph& graph){
 
@@ -160,6 +160,19 @@ public:
     virtual void setup();
     void    solve();
 
+    // Bulk loading of the grounded task. The integer arguments are
+    // objects exporting the buffer interface with native ints (e.g. the
+    // bytes of an array('i')). Literals are encoded as 2 * fluent + negated,
+    // and offsets[i]..offsets[i+1] delimit the literals of the i-th item.
+    void    add_atoms( boost::python::list& names );
+    void    add_actions( boost::python::list& names, boost::python::object costs );
+    void    add_preconditions( boost::python::object offsets, boost::python::object lits );
+    void    add_effects( boost::python::object offsets, boost::python::object lits );
+    void    add_cond_effects( boost::python::object action_offsets,
+                              boost::python::object cond_offsets, boost::python::object cond_lits,
+                              boost::python::object eff_offsets, boost::python::object eff_lits );
+    void    add_mutex_groups( boost::python::object offsets, boost::python::object lits );
+
 
     std::string m_log_filename;
     std::string m_plan_filename;
@@ -168,6 +181,9 @@ public:
     unsigned m_max_novelty;  	
 
 protected:
+    unsigned condition_fluent( int lit ) const;
+    void     add_effect_literal( int lit, aptk::Fluent_Vec& adds, aptk::Fluent_Vec& dels ) const;
+
     template <typename Search_Engine>
     void bfws_options( Fwd_Search_Problem& search_prob, Search_Engine& bfs_engine, unsigned max_novelty, Landmarks_Graph& graph);
 	
@@ -7,6 +7,12 @@ BOOST_PYTHON_MODULE( libbfws )
 	.def( init< std::string, std::string >() )
 	.def( "add_atom", &BFWS::add_atom )
 	.def( "add_action", &BFWS::add_action )
+	.def( "add_atoms", &BFWS::add_atoms )
+	.def( "add_actions", &BFWS::add_actions )
+	.def( "add_preconditions", &BFWS::add_preconditions )
+	.def( "add_effects", &BFWS::add_effects )
+	.def( "add_cond_effects", &BFWS::add_cond_effects )
+	.def( "add_mutex_groups", &BFWS::add_mutex_groups )
 	.def( "add_mutex_group", &BFWS::add_mutex_group )
 	.def( "num_atoms", &BFWS::n_atoms )
 	.def( "num_actions", &BFWS::n_actions )
@@ -5,6 +5,8 @@ from __future__ import print_function
 
 import sys
 import itertools
+from collections import defaultdict
+from operator import itemgetter
 
 import pddl
 import timers
@@ -323,16 +325,275 @@ def compute_model(prog):
             for rule, cond_index in matches:
                 rule.update_index(next_atom, cond_index)
                 rule.fire(next_atom, cond_index, queue.push)
+        timers.add_counts(rules=len(rules), atoms=len(queue.queue))
     print("%d relevant atoms" % relevant_atoms)
     print("%d auxiliary atoms" % auxiliary_atoms)
     print("%d final queue length" % len(queue.queue))
     print("%d total queue pushes" % queue.num_pushes)
     return queue.queue
 
+class SemiNaiveRule:
+    """A JoinRule, ProductRule or ProjectRule compiled for
+    SemiNaiveEngine: predicates and objects are replaced by integer
+    ids and every condition is described by the positions that bind
+    effect variables and the positions that must hold constants."""
+    def __init__(self, rule, engine):
+        self.kind = rule.__class__
+        self.effect_pred = engine.predicate_id(rule.effect.predicate)
+        self.effect_template = [
+            None if isinstance(arg, int) else engine.object_id(arg)
+            for arg in rule.effect.args]
+        self.cond_preds = []
+        self.cond_bindings = []
+        self.cond_constants = []
+        for cond in rule.conditions:
+            self.cond_preds.append(engine.predicate_id(cond.predicate))
+            self.cond_bindings.append(
+                [(pos, arg) for pos, arg in enumerate(cond.args)
+                 if isinstance(arg, int)])
+            self.cond_constants.append(
+                [(pos, engine.object_id(arg))
+                 for pos, arg in enumerate(cond.args)
+                 if not isinstance(arg, int) and arg[0] != "?"])
+        if self.kind is JoinRule:
+            # Like JoinRule, join on the shared effect variables only.
+            # Constants of the partner condition are folded into the
+            # lookup key, so the index only returns matching atoms.
+            common_vars = sorted(
+                set(var for _, var in self.cond_bindings[0]) &
+                set(var for _, var in self.cond_bindings[1]))
+            self.join_keys = []
+            self.join_indexes = []
+            for cond_index in (0, 1):
+                args = rule.conditions[cond_index].args
+                var_positions = [list(args).index(var) for var in common_vars]
+                self.join_keys.append(_tuple_getter(var_positions))
+                other = 1 - cond_index
+                other_args = rule.conditions[other].args
+                other_positions = (
+                    [list(other_args).index(var) for var in common_vars] +
+                    [pos for pos, _ in self.cond_constants[other]])
+                self.join_indexes.append(engine.index(
+                    self.cond_preds[other], other_positions))
+        elif self.kind is ProductRule:
+            self.product_factors = [
+                (engine.index(pred, [pos for pos, _ in constants]),
+                 tuple(obj for _, obj in constants), bindings)
+                for pred, constants, bindings in zip(
+                    self.cond_preds, self.cond_constants,
+                    self.cond_bindings)]
+            # Last condition found without atoms; it is checked first,
+            # since most firings of a wide product fail on it.
+            self.blocking_factor = 0
+
+    def fire(self, cond_index, atoms, emit):
+        # The engine only passes atoms that match the constants of the
+        # condition.
+        if self.kind is JoinRule:
+            self._fire_join(cond_index, atoms, emit)
+        elif self.kind is ProductRule:
+            self._fire_product(cond_index, atoms, emit)
+        else:
+            self._fire_project(atoms, emit)
+
+    def _fire_project(self, atoms, emit):
+        pred = self.effect_pred
+        template = self.effect_template
+        bindings = self.cond_bindings[0]
+        for args in atoms:
+            effect_args = list(template)
+            for pos, var in bindings:
+                effect_args[var] = args[pos]
+            emit(pred, tuple(effect_args))
+
+    def _fire_join(self, cond_index, atoms, emit):
+        pred = self.effect_pred
+        template = self.effect_template
+        bindings = self.cond_bindings[cond_index]
+        other = 1 - cond_index
+        other_bindings = self.cond_bindings[other]
+        other_constants = tuple(obj for _, obj in self.cond_constants[other])
+        get_key = self.join_keys[cond_index]
+        index = self.join_indexes[cond_index]
+        for args in atoms:
+            partners = index.get(get_key(args) + other_constants)
+            if not partners:
+                continue
+            effect_args = list(template)
+            for pos, var in bindings:
+                effect_args[var] = args[pos]
+            for partner in partners:
+                for pos, var in other_bindings:
+                    effect_args[var] = partner[pos]
+                emit(pred, tuple(effect_args))
+
+    def _fire_product(self, cond_index, atoms, emit):
+        blocking = self.blocking_factor
+        if blocking != cond_index:
+            index, key, _ = self.product_factors[blocking]
+            if not index.get(key):
+                return
+        partner_lists = []
+        partner_bindings = []
+        for pos, (index, key, factor_bindings) in enumerate(
+                self.product_factors):
+            if pos == cond_index:
+                continue
+            partners = index.get(key)
+            if not partners:
+                self.blocking_factor = pos
+                return
+            partner_lists.append(partners)
+            partner_bindings.append(factor_bindings)
+        pred = self.effect_pred
+        bindings = self.cond_bindings[cond_index]
+        for args in atoms:
+            effect_args = list(self.effect_template)
+            for pos, var in bindings:
+                effect_args[var] = args[pos]
+            for combination in itertools.product(*partner_lists):
+                for partner, factor_bindings in zip(combination,
+                                                    partner_bindings):
+                    for pos, var in factor_bindings:
+                        effect_args[var] = partner[pos]
+                emit(pred, tuple(effect_args))
+
+
+def _tuple_getter(positions):
+    if not positions:
+        return lambda args: ()
+    elif len(positions) == 1:
+        position = positions[0]
+        return lambda args: (args[position],)
+    else:
+        return itemgetter(*positions)
+
+
+class SemiNaiveEngine:
+    """Bottom-up evaluation of a normalized Datalog program in rounds.
+
+    Each round fires every rule once per condition, joining the atoms
+    derived in the previous round (the delta) against hash indexes over
+    all atoms derived so far. Atoms are tuples of object ids grouped by
+    predicate id, so no pddl.Atom is built before the model is final."""
+    def __init__(self, prog):
+        self.predicates = []
+        self.predicate_ids = {}
+        self.objects = []
+        self.object_ids = {}
+        self.atoms = []
+        self.indexes = []
+        # Maps a predicate id to {constant positions: {constants:
+        # [(rule, cond_index)]}}, so that a batch of new atoms is split
+        # once per set of positions instead of being filtered per rule.
+        self.rules_by_predicate = defaultdict(dict)
+        for rule in convert_rules(prog):
+            compiled = SemiNaiveRule(rule, self)
+            for cond_index, pred in enumerate(compiled.cond_preds):
+                constants = compiled.cond_constants[cond_index]
+                positions = tuple(pos for pos, _ in constants)
+                values = tuple(obj for _, obj in constants)
+                by_values = self.rules_by_predicate[pred].setdefault(
+                    positions, {})
+                by_values.setdefault(values, []).append(
+                    (compiled, cond_index))
+        self.num_rules = len(prog.rules)
+
+    def predicate_id(self, predicate):
+        pred_id = self.predicate_ids.get(predicate)
+        if pred_id is None:
+            pred_id = len(self.predicates)
+            self.predicate_ids[predicate] = pred_id
+            self.predicates.append(predicate)
+            self.atoms.append(set())
+            self.indexes.append({})
+        return pred_id
+
+    def object_id(self, obj):
+        obj_id = self.object_ids.get(obj)
+        if obj_id is None:
+            obj_id = len(self.objects)
+            self.object_ids[obj] = obj_id
+            self.objects.append(obj)
+        return obj_id
+
+    def index(self, pred_id, positions):
+        positions = tuple(positions)
+        index = self.indexes[pred_id].get(positions)
+        if index is None:
+            index = {}
+            self.indexes[pred_id][positions] = index
+        return index
+
+    def compute(self, facts):
+        derived = []
+        delta = defaultdict(list)
+        def emit(pred_id, args):
+            pred_atoms = self.atoms[pred_id]
+            if args not in pred_atoms:
+                pred_atoms.add(args)
+                delta[pred_id].append(args)
+                derived.append((pred_id, args))
+        for fact in facts:
+            emit(self.predicate_id(fact.predicate),
+                 tuple(self.object_id(arg) for arg in fact.args))
+
+        self.num_rounds = 0
+        while delta:
+            self.num_rounds += 1
+            current, delta = delta, defaultdict(list)
+            for pred_id, new_atoms in current.items():
+                for positions, index in self.indexes[pred_id].items():
+                    get_key = _tuple_getter(positions)
+                    for args in new_atoms:
+                        index.setdefault(get_key(args), []).append(args)
+            for pred_id, new_atoms in current.items():
+                for positions, by_values in (
+                        self.rules_by_predicate[pred_id].items()):
+                    if positions:
+                        get_key = _tuple_getter(positions)
+                        groups = defaultdict(list)
+                        for args in new_atoms:
+                            groups[get_key(args)].append(args)
+                    else:
+                        groups = {(): new_atoms}
+                    for values, group in groups.items():
+                        for rule, cond_index in by_values.get(values, ()):
+                            rule.fire(cond_index, group, emit)
+
+        objects = self.objects
+        return [pddl.Atom(self.predicates[pred_id],
+                          [objects[obj_id] for obj_id in args])
+                for pred_id, args in derived]
+
+def compute_model_seminaive(prog):
+    with timers.timing("Preparing model"):
+        engine = SemiNaiveEngine(prog)
+        fact_atoms = sorted(fact.atom for fact in prog.facts)
+
+    print("Generated %d rules." % engine.num_rules)
+    with timers.timing("Computing model"):
+        model = engine.compute(fact_atoms)
+        timers.add_counts(rules=engine.num_rules, atoms=len(model))
+    relevant_atoms = 0
+    auxiliary_atoms = 0
+    for atom in model:
+        pred = atom.predicate
+        if isinstance(pred, str) and "$" in pred:
+            auxiliary_atoms += 1
+        else:
+            relevant_atoms += 1
+    print("%d relevant atoms" % relevant_atoms)
+    print("%d auxiliary atoms" % auxiliary_atoms)
+    print("%d semi-naive rounds" % engine.num_rounds)
+    return model
+
 if __name__ == "__main__":
+    import options
     import pddl_parser
     import pddl_to_prolog
 
+    options.setup()
     print("Parsing...")
     task = pddl_parser.open()
     print("Writing rules...")
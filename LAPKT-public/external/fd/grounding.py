@@ -1,7 +1,17 @@
 from __future__ import print_function
 
+from array import array
 from collections import defaultdict
 
+import ctypes
+import errno
+import math
+import os
+import resource
+import signal
+import subprocess
+import traceback
+
 import build_model
 import pddl_to_prolog
 import pddl
@@ -25,102 +35,51 @@ class PropositionalDetAction:
         self.precondition = []
         self.effects = []
         self.cond_effs = {}
-        self.negated_conditions = []
+        self.negated_conditions = set()
 
     def set_precondition(self, prec, atom_table):
         precset = set()
-        negprecset = set()
         for p in prec:
             sym = atom_table[p.text()]
-            if p.negated and sym not in self.negated_conditions:
-                negprecset.add(sym)
-                self.negated_conditions.append(sym)
+            if p.negated:
+                self.negated_conditions.add(sym)
             precset.add((sym, p.negated))
         for sym, negated in precset:
             self.precondition.append((sym, negated))
-        for sym in negprecset:
-            self.negated_conditions.append(sym)
 
-    def add_effect(self, adds, dels, atom_table, atom_names, axioms):
+    def encode_condition(self, cond, atom_table, atom_names, axioms_by_name):
+        condition = []
+        axioms_changed = []
+        for cond_lit in cond:
+            sym = atom_table[cond_lit.text()]
+            if cond_lit.negated and sym not in self.negated_conditions:
+                axioms = axioms_by_name.get('(' + atom_names[sym] + ')')
+                if axioms:
+                    axioms_changed.extend(axioms)
+                    continue
+                self.negated_conditions.add(sym)
+            condition.append((sym, cond_lit.negated))
+        # Reencode axioms from universal quantifier introduced by the normalize.remove_universal_quantifier function
+        # Remove once we add proper support for axioms
+        for a in axioms_changed:
+            for c in a.condition:
+                sym = atom_table[c.text()]
+                if not c.negated:
+                    self.negated_conditions.add(sym)
+                condition.append((sym, not c.negated))
+        return tuple(condition)
+
+    def add_effect(self, adds, dels, atom_table, atom_names, axioms_by_name):
         effs = []
-        for cond, lit in adds:
-            if len(cond) == 0:
-                effs.append((atom_table[lit.text()], False))
-            else:
-                condition_unfiltered = [
-                    (atom_table[cond_lit.text()], cond_lit.negated) for cond_lit in cond]
-                condition = []
-                axioms_changed = []
-                for c in condition_unfiltered:
-                    if c[1] and c[0] not in self.negated_conditions:
-                        has_axiom = False
-                        for a in axioms:
-                            if '('+atom_names[c[0]]+')' == a.name:
-                                axioms_changed.append(a)
-                                has_axiom = True
-                        if has_axiom is False:
-                            self.negated_conditions.append(c[0])
-                    else:
-                        condition.append(c)
-                # Reencode axioms from universal quantifier introduced by the normalize.remove_universal_quantifier function
-                # Remove once we add proper support for axioms
-                has_axiom = False
-                for a in axioms_changed:
-                    has_axiom = True
-                    for c in a.condition:
-                        if c.negated == False:
-                            self.negated_conditions.append(
-                                atom_table[c.text()])
-                            condition.append((atom_table[c.text()], True))
-                        else:
-                            condition.append((atom_table[c.text()], False))
-
-                condition = tuple(condition)
-                try:
-                    self.cond_effs[condition].append(
-                        (atom_table[lit.text()], False))
-                except KeyError:
-                    self.cond_effs[condition] = [
-                        (atom_table[lit.text()], False)]
-        for cond, lit in dels:
-            if len(cond) == 0:
-                effs.append((atom_table[lit.text()], True))
-            else:
-                condition_unfiltered = [
-                    (atom_table[cond_lit.text()], cond_lit.negated) for cond_lit in cond]
-                condition = []
-                axioms_changed = []
-                for c in condition_unfiltered:
-                    if c[1] and c[0] not in self.negated_conditions:
-                        has_axiom = False
-                        for a in axioms:
-                            if '('+atom_names[c[0]]+')' == a.name:
-                                axioms_changed.append(a)
-                                has_axiom = True
-                        if has_axiom is False:
-                            self.negated_conditions.append(c[0])
-                    else:
-                        condition.append(c)
-                # Reencode axioms from universal quantifier introduced by the normalize.remove_universal_quantifier function
-                # Remove once we add proper support for axioms
-                has_axiom = False
-                for a in axioms_changed:
-                    has_axiom = True
-                    for c in a.condition:
-                        if c.negated == False:
-                            self.negated_conditions.append(
-                                atom_table[c.text()])
-                            condition.append((atom_table[c.text()], True))
-                        else:
-                            condition.append((atom_table[c.text()], False))
-
-                condition = tuple(condition)
-                try:
-                    self.cond_effs[condition].append(
-                        (atom_table[lit.text()], True))
-                except KeyError:
-                    self.cond_effs[condition] = [
-                        (atom_table[lit.text()], True)]
+        for effects, negated in ((adds, False), (dels, True)):
+            for cond, lit in effects:
+                eff = (atom_table[lit.text()], negated)
+                if len(cond) == 0:
+                    effs.append(eff)
+                else:
+                    condition = self.encode_condition(
+                        cond, atom_table, atom_names, axioms_by_name)
+                    self.cond_effs.setdefault(condition, []).append(eff)
 
         if len(effs) > 0:
             self.effects.append(effs)
@@ -130,6 +89,13 @@ class PropositionalDetAction:
         #         print( "Condition: %s %s\n"%(cond,eff) )
 
 
+def index_axioms_by_name(axioms):
+    axioms_by_name = defaultdict(list)
+    for axiom in axioms:
+        axioms_by_name[axiom.name].append(axiom)
+    return axioms_by_name
+
+
 def encode(lits, atom_table):
     encoded = []
     if isinstance(lits, pddl.Atom) or isinstance(lits, pddl.NegatedAtom):
@@ -195,13 +161,14 @@ def fodet(domain_file, problem_file, output_task):
             encode(axiom.condition, atom_table), encode([axiom.effect], atom_table))
 
     print("Deterministic %d actions" % len(actions))
+    axioms_by_name = index_axioms_by_name(axioms)
     nd_actions = []
     for action in actions:
         #print( "action: %s cost: %d"%(action.name,action.cost) )
         nd_action = PropositionalDetAction(action.name, action.cost)
         nd_action.set_precondition(action.precondition, atom_table)
         nd_action.add_effect(
-            action.add_effects, action.del_effects, atom_table, atom_names, axioms)
+            action.add_effects, action.del_effects, atom_table, atom_names, axioms_by_name)
         nd_actions.append((nd_action.name, nd_action))
 
     for name, _ in nd_actions.iteritems():
@@ -225,54 +192,57 @@ def fodet(domain_file, problem_file, output_task):
     output_task.parsing_time = parsing_timer.report()
 
 
-def default(domain_file, problem_file, output_task):
-    parsing_timer = timers.Timer()
-    print("Domain: %s Problem: %s" % (domain_file, problem_file))
-
-    with timers.timing("Parsing", True):
-        task = pddl_parser.open(
-            domain_filename=domain_file, task_filename=problem_file)
-
-    normalize.normalize(task)
-
-    relaxed_reachable, atoms, actions, axioms, reachable_action_params = explore(
-        task)
-    print("goal relaxed reachable: %s" % relaxed_reachable)
-    if not relaxed_reachable:
-        print("No plan exists")
-        sys.exit(2)
-
-    print("%d atoms" % len(atoms))
-
-    with timers.timing("Computing fact groups", block=True):
-        groups, mutex_groups, translation_key = fact_groups.compute_groups(
-            task, atoms, reachable_action_params)
-
-    index = 0
-    atom_table = {}
-
+def load_task(task, atoms, actions, axioms, mutex_groups, output_task):
     atom_names = [atom.text() for atom in atoms]
     atom_names.sort()
-
-    for atom in atom_names:
-        atom_table[atom] = index
-        output_task.add_atom(atom.encode('utf-8'))
-        index += 1
+    atom_table = dict((atom, index) for index, atom in enumerate(atom_names))
 
     print("Axioms %d" % len(axioms))
 
     print("Deterministic %d actions" % len(actions))
+    axioms_by_name = index_axioms_by_name(axioms)
     nd_actions = []
     for action in actions:
         #print( "action: %s cost: %d"%(action.name,action.cost) )
         nd_action = PropositionalDetAction(action.name, action.cost)
         nd_action.set_precondition(action.precondition, atom_table)
         nd_action.add_effect(
-            action.add_effects, action.del_effects, atom_table, atom_names, axioms)
-        if len(nd_action.negated_conditions) > 0:
-            output_task.notify_negated_conditions(nd_action.negated_conditions)
+            action.add_effects, action.del_effects, atom_table, atom_names, axioms_by_name)
         nd_actions.append((nd_action.name, nd_action))
 
+    # Planners exposing the bulk loading API get the whole task in a
+    # handful of calls, the others one call per atom, action and effect.
+    if hasattr(output_task, 'add_actions'):
+        load_task_bulk(atom_names, nd_actions, output_task)
+    else:
+        load_task_incremental(atom_names, nd_actions, output_task)
+
+    # NIR: Default options assign 0 seconds. Change Options file to 300s to have the same configuration as FD
+    # MRJ: Mutex groups processing needs to go after negations are compiled away
+    print("Invariants %d" % len(mutex_groups))
+    groups = [encode(group, atom_table) for group in mutex_groups if len(group) >= 2]
+    if hasattr(output_task, 'add_mutex_groups'):
+        offsets, lits = encode_offsets(groups)
+        output_task.add_mutex_groups(offsets.tostring(), lits.tostring())
+    else:
+        for group in groups:
+            output_task.add_mutex_group(group)
+
+    output_task.set_domain_name(task.domain_name.encode('utf-8'))
+    output_task.set_problem_name(task.task_name.encode('utf-8'))
+    output_task.set_init(encode(task.init, atom_table))
+    output_task.set_goal(encode(task.goal, atom_table))
+
+
+def load_task_incremental(atom_names, nd_actions, output_task):
+    for atom in atom_names:
+        output_task.add_atom(atom.encode('utf-8'))
+
+    for (_, action) in nd_actions:
+        if len(action.negated_conditions) > 0:
+            output_task.notify_negated_conditions(
+                list(action.negated_conditions))
+
     output_task.create_negated_fluents()
 
     for (name, _) in nd_actions:
@@ -293,22 +263,87 @@ def default(domain_file, problem_file, output_task):
         output_task.set_cost(index, action.cost)
         index += 1
 
-    # NIR: Default options assign 0 seconds. Change Options file to 300s to have the same configuration as FD
-    # MRJ: Mutex groups processing needs to go after negations are compiled away
-    print("Invariants %d" % len(mutex_groups))
-    for group in mutex_groups:
-        if len(group) >= 2:
-            #print("{%s}" % ", ".join(map(str, group)))
-            output_task.add_mutex_group(encode(group, atom_table))
-            #print( encode( group, atom_table ) )
 
-    output_task.set_domain_name(task.domain_name.encode('utf-8'))
-    output_task.set_problem_name(task.task_name.encode('utf-8'))
-    output_task.set_init(encode(task.init, atom_table))
-    output_task.set_goal(encode(task.goal, atom_table))
+def encode_offsets(sequences):
+    # Flatten lists of (atom index, negated) pairs into CSR form: literal
+    # 2 * index + negated, sequence i spanning offsets[i]..offsets[i+1].
+    offsets = array('i', [0])
+    lits = array('i')
+    for sequence in sequences:
+        lits.extend(2 * index + negated for index, negated in sequence)
+        offsets.append(len(lits))
+    return offsets, lits
+
+
+def load_task_bulk(atom_names, nd_actions, output_task):
+    output_task.add_atoms([atom.encode('utf-8') for atom in atom_names])
+
+    negated_conditions = set()
+    for (_, action) in nd_actions:
+        negated_conditions.update(action.negated_conditions)
+    if negated_conditions:
+        output_task.notify_negated_conditions(list(negated_conditions))
+
+    output_task.create_negated_fluents()
+
+    names = [name.encode('utf-8') for (name, _) in nd_actions]
+    costs = array('i', [action.cost for (_, action) in nd_actions])
+    output_task.add_actions(names, costs.tostring())
+
+    pre_offsets, pre_lits = encode_offsets(
+        action.precondition for (_, action) in nd_actions)
+    output_task.add_preconditions(pre_offsets.tostring(), pre_lits.tostring())
+
+    eff_offsets, eff_lits = encode_offsets(
+        [lit for eff in action.effects for lit in eff]
+        for (_, action) in nd_actions)
+    output_task.add_effects(eff_offsets.tostring(), eff_lits.tostring())
+
+    ceff_offsets = array('i', [0])
+    conditions = []
+    cond_effects = []
+    for (_, action) in nd_actions:
+        for cond, eff in action.cond_effs.iteritems():
+            conditions.append(cond)
+            cond_effects.append(eff)
+        ceff_offsets.append(len(conditions))
+    cond_offsets, cond_lits = encode_offsets(conditions)
+    ceff_eff_offsets, ceff_eff_lits = encode_offsets(cond_effects)
+    output_task.add_cond_effects(
+        ceff_offsets.tostring(), cond_offsets.tostring(), cond_lits.tostring(),
+        ceff_eff_offsets.tostring(), ceff_eff_lits.tostring())
+
+
+def default(domain_file, problem_file, output_task):
+    parsing_timer = timers.Timer()
+    print("Domain: %s Problem: %s" % (domain_file, problem_file))
+
+    with timers.timing("Parsing", True):
+        task = pddl_parser.open(
+            domain_filename=domain_file, task_filename=problem_file)
+
+    normalize.normalize(task)
+
+    relaxed_reachable, atoms, actions, axioms, reachable_action_params = explore(
+        task)
+    print("goal relaxed reachable: %s" % relaxed_reachable)
+    if not relaxed_reachable:
+        print("No plan exists")
+        sys.exit(2)
+
+    print("%d atoms" % len(atoms))
+
+    with timers.timing("Computing fact groups", block=True):
+        groups, mutex_groups, translation_key = fact_groups.compute_groups(
+            task, atoms, reachable_action_params)
+
+    with timers.timing("Loading task into BFWS", block=True):
+        load_task(task, atoms, actions, axioms, mutex_groups, output_task)
+        timers.add_counts(atoms=len(atoms), actions=len(actions),
+                          axioms=len(axioms))
     output_task.parsing_time = parsing_timer.report()
 
-def translateToSas(task, groups, mutex_groups, translation_key, actions, axioms):
+def buildSasTask(task, groups, mutex_groups, translation_key, actions, axioms):
     print("INFO     Calculating sas")
     if isinstance(task.goal, pddl.Conjunction):
         goal_list = task.goal.parts
@@ -351,12 +386,158 @@ def translateToSas(task, groups, mutex_groups, translation_key, actions, axioms)
             return translate.solvable_sas_task("Simplified to empty goal")
 
     translate.dump_statistics(sas_task)
+    return sas_task
+
+def translateToSas(task, groups, mutex_groups, translation_key, actions, axioms):
+    sas_task = buildSasTask(
+        task, groups, mutex_groups, translation_key, actions, axioms)
 
     with timers.timing("Writing output"):
         with open("output.sas", "w") as output_file:
             sas_task.output(output_file)
     print("INFO     Sas saved to file")
 
+PR_SET_PDEATHSIG = 1
+
+def dieWithParent(parent_pid):
+    # Have the kernel kill this process when its parent exits, so that
+    # the SAS worker and its preprocessor do not outlive a bfws.py that
+    # was killed by its time or memory limit. Only Linux supports this.
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.prctl(PR_SET_PDEATHSIG, signal.SIGKILL) != 0:
+            return
+    except (OSError, AttributeError):
+        return
+    if os.getppid() != parent_pid:
+        # The parent exited before we asked to be notified.
+        os._exit(1)
+
+def cpuTimeUsed():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def inheritRemainingCpuTime(parent_cpu_time):
+    # RLIMIT_CPU is counted per process and a child starts from zero, so a
+    # child of bfws.py would get the whole CPU budget of 1-BFWS again.
+    # Limit it to what its parent had not used yet when it was started.
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if soft == resource.RLIM_INFINITY:
+        return
+    remaining = max(1, int(math.ceil(soft - parent_cpu_time)))
+    if hard != resource.RLIM_INFINITY:
+        hard = min(hard, remaining + 1)
+    resource.setrlimit(resource.RLIMIT_CPU, (remaining, hard))
+
+def translateToPreprocess(task, groups, mutex_groups, translation_key, actions, axioms, preprocess_cmd):
+    # Hand the SAS task we grounded for 1-BFWS straight to the
+    # preprocessor through a pipe instead of going through output.sas.
+    # The task is sent in the binary format, which the preprocessor reads
+    # much faster than the text format.
+    sas_task = buildSasTask(
+        task, groups, mutex_groups, translation_key, actions, axioms)
+
+    sys.stdout.flush()
+    parent_pid = os.getpid()
+    parent_cpu_time = cpuTimeUsed()
+    def prepare_preprocess():
+        dieWithParent(parent_pid)
+        inheritRemainingCpuTime(parent_cpu_time)
+    preprocess = subprocess.Popen(
+        preprocess_cmd, stdin=subprocess.PIPE, preexec_fn=prepare_preprocess)
+    try:
+        with timers.timing("Piping output to preprocessor"):
+            try:
+                sas_task.output_binary(preprocess.stdin)
+                preprocess.stdin.close()
+            except IOError as err:
+                # The preprocessor exited early; report its exit code below.
+                if err.errno != errno.EPIPE:
+                    raise
+        returncode = preprocess.wait()
+    finally:
+        if preprocess.poll() is None:
+            preprocess.kill()
+            preprocess.wait()
+    print("INFO     Sas handed to preprocessor (exit code %d)" % returncode)
+    return returncode
+
+def raiseSignal(signum):
+    # Die from signum like a component killed by it, without dumping core.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if signum != signal.SIGKILL:
+        signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+def exitWithReturncode(returncode):
+    # A negative returncode means that a component was killed by a signal,
+    # usually because it hit its CPU or memory limit. Passing it to
+    # sys.exit would give the exit code 256 + returncode, which the driver
+    # cannot tell from an error, so we are killed by the same signal.
+    if returncode < 0:
+        raiseSignal(-returncode)
+        returncode = 128 - returncode
+    sys.exit(returncode)
+
+def startSasWorker(task, groups, mutex_groups, translation_key, actions, axioms, preprocess_cmd=None):
+    # Fork a worker that does the SAS+ translation (and hands it to the
+    # preprocessor if preprocess_cmd is given) while the parent runs 1-BFWS.
+    # The worker shares the grounded task with the parent copy-on-write.
+    sys.stdout.flush()
+    parent_pid = os.getpid()
+    parent_cpu_time = cpuTimeUsed()
+    pid = os.fork()
+    if pid != 0:
+        return pid
+    dieWithParent(parent_pid)
+    inheritRemainingCpuTime(parent_cpu_time)
+    # Turn a cancellation into SystemExit so that translateToPreprocess
+    # can take the preprocessor down with it.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    returncode = 1
+    try:
+        if preprocess_cmd:
+            returncode = translateToPreprocess(
+                task, groups, mutex_groups, translation_key, actions, axioms,
+                preprocess_cmd)
+        else:
+            translateToSas(
+                task, groups, mutex_groups, translation_key, actions, axioms)
+            returncode = 0
+    except SystemExit:
+        pass
+    except MemoryError:
+        # Exit like bfws.py does when it runs out of memory.
+        returncode = 6
+    except Exception:
+        traceback.print_exc()
+    finally:
+        if returncode < 0:
+            # The preprocessor was killed by a signal; so are we.
+            raiseSignal(-returncode)
+            returncode = 128 - returncode
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(returncode)
+
+def joinSasWorker(pid):
+    # Like subprocess, report a worker killed by a signal (e.g. SIGXCPU
+    # for the CPU limit inherited from bfws.py) as minus the signal.
+    _, status = os.waitpid(pid, 0)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+def cancelSasWorker(pid):
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except OSError as err:
+        if err.errno != errno.ESRCH:
+            raise
+    os.waitpid(pid, 0)
+
 def dual_translate(domain_file, problem_file, output_task):
     timer = timers.Timer()
     with timers.timing("Parsing", True):
@@ -380,64 +561,10 @@ def dual_translate(domain_file, problem_file, output_task):
         groups, mutex_groups, translation_key = fact_groups.compute_groups(
             task, atoms, reachable_action_params)
 
-    index = 0
-    atom_table = {}
-
-    atom_names = [atom.text() for atom in atoms]
-    atom_names.sort()
-
-    for atom in atom_names:
-        atom_table[atom] = index
-        output_task.add_atom(atom.encode('utf-8'))
-        index += 1
-
-    print("Axioms %d" % len(axioms))
-
-    print("Deterministic %d actions" % len(actions))
-    nd_actions = []
-    for action in actions:
-        #print( "action: %s cost: %d"%(action.name,action.cost) )
-        nd_action = PropositionalDetAction(action.name, action.cost)
-        nd_action.set_precondition(action.precondition, atom_table)
-        nd_action.add_effect(
-            action.add_effects, action.del_effects, atom_table, atom_names, axioms)
-        if len(nd_action.negated_conditions) > 0:
-            output_task.notify_negated_conditions(nd_action.negated_conditions)
-        nd_actions.append((nd_action.name, nd_action))
-
-    output_task.create_negated_fluents()
-
-    for (name, _) in nd_actions:
-        output_task.add_action(name.encode('utf-8'))
-
-    index = 0
-    for (_, action) in nd_actions:
-        output_task.add_precondition(index, action.precondition)
-        for eff in action.effects:
-            output_task.add_effect(index, eff)
-        # if len(action.cond_effs) != 0 :
-        #    print action.name, len(action.cond_effs), "has conditional effects"
-        for cond, eff in action.cond_effs.iteritems():
-            #print( action.name, cond, atom_names[cond[0][0]] )
-
-            output_task.add_cond_effect(index, list(cond), eff)
-
-        output_task.set_cost(index, action.cost)
-        index += 1
-
-    # NIR: Default options assign 0 seconds. Change Options file to 300s to have the same configuration as FD
-    # MRJ: Mutex groups processing needs to go after negations are compiled away
-    print("Invariants %d" % len(mutex_groups))
-    for group in mutex_groups:
-        if len(group) >= 2:
-            #print("{%s}" % ", ".join(map(str, group)))
-            output_task.add_mutex_group(encode(group, atom_table))
-            #print( encode( group, atom_table ) )
-
-    output_task.set_domain_name(task.domain_name.encode('utf-8'))
-    output_task.set_problem_name(task.task_name.encode('utf-8'))
-    output_task.set_init(encode(task.init, atom_table))
-    output_task.set_goal(encode(task.goal, atom_table))
+    with timers.timing("Loading task into BFWS", block=True):
+        load_task(task, atoms, actions, axioms, mutex_groups, output_task)
+        timers.add_counts(atoms=len(atoms), actions=len(actions),
+                          axioms=len(axioms))
     output_task.parsing_time = timer.report()
 
     return task, groups, mutex_groups, translation_key, actions, axioms
@@ -117,13 +117,17 @@ def get_axiom_predicate(axiom):
         variables += [par.name for par in axiom.condition.parameters]
     return pddl.Atom(name, variables)
 
-def all_conditions(task):
+def domain_conditions(task):
     for action in task.actions:
         yield PreconditionProxy(action)
         for effect in action.effects:
             yield EffectConditionProxy(action, effect)
     for axiom in task.axioms:
         yield AxiomConditionProxy(axiom)
+
+def all_conditions(task):
+    for proxy in domain_conditions(task):
+        yield proxy
     yield GoalConditionProxy(task)
 
 # [1] Remove universal quantifications from conditions.
@@ -336,6 +340,21 @@ def normalize(task):
 
     verify_axiom_predicates(task)
 
+def normalize_goal(task):
+    """Normalize a task whose actions and axioms are normalized already,
+    e.g. because they come from a cached domain (see domain_cache). The
+    goal goes through the same steps as in normalize(), and the axioms
+    introduced for it are appended to the axioms of the task, just as
+    normalize() appends them after the axioms of the domain."""
+    goal_task = copy.copy(task)
+    goal_task.actions = []
+    goal_task.axioms = []
+    normalize(goal_task)
+    task.goal = goal_task.goal
+    task.axioms.extend(goal_task.axioms)
+    task.axiom_counter = goal_task.axiom_counter
+    verify_axiom_predicates(task)
+
 def verify_axiom_predicates(task):
     # Verify that derived predicates are not used in :init or
     # action effects.
@@ -366,6 +385,22 @@ def build_exploration_rules(task):
         proxy.build_rules(result)
     return result
 
+def build_domain_exploration_rules(domain):
+    # Rules of the actions and axioms, i.e., all rules except the goal rule.
+    result = []
+    for proxy in domain_conditions(domain):
+        proxy.build_rules(result)
+    return result
+
+def build_problem_exploration_rules(task, num_domain_axioms):
+    # Rules of the axioms introduced by normalize_goal and the goal rule,
+    # i.e., the rules that build_domain_exploration_rules misses.
+    result = []
+    for axiom in task.axioms[num_domain_axioms:]:
+        AxiomConditionProxy(axiom).build_rules(result)
+    GoalConditionProxy(task).build_rules(result)
+    return result
+
 def condition_to_rule_body(parameters, condition):
     result = []
     for par in parameters:
@@ -391,7 +426,9 @@ def condition_to_rule_body(parameters, condition):
     return result
 
 if __name__ == "__main__":
+    import options
     import pddl_parser
+    options.setup()
     task = pddl_parser.open()
     normalize(task)
     task.dump()
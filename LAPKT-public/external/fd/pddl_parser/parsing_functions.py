@@ -304,24 +304,45 @@ def parse_axiom(alist, type_dict, predicate_dict):
 
 
 def parse_task(domain_pddl, task_pddl):
-    domain_name, domain_requirements, types, type_dict, constants, predicates, predicate_dict, functions, actions, axioms \
+    return parse_problem(parse_domain(domain_pddl), task_pddl)
+
+
+def parse_domain(domain_pddl):
+    """Return the domain as a task without a name, initial state and goal,
+    whose objects are the constants of the domain."""
+    domain_name, requirements, types, type_dict, constants, predicates, predicate_dict, functions, actions, axioms \
                  = parse_domain_pddl(domain_pddl)
+    return pddl.Task(
+        domain_name, None, requirements, types, constants,
+        predicates, functions, [], pddl.Conjunction([]), actions, axioms,
+        False)
+
+
+def parse_problem(domain, task_pddl):
+    """Combine a domain returned by parse_domain with a problem. The task
+    shares the types, predicates, actions and axioms of the domain, which
+    may already be normalized (see domain_cache)."""
+    type_dict = dict((type.name, type) for type in domain.types)
+    predicate_dict = dict((pred.name, pred) for pred in domain.predicates)
     task_name, task_domain_name, task_requirements, objects, init, goal, use_metric = parse_task_pddl(task_pddl, type_dict, predicate_dict)
 
-    assert domain_name == task_domain_name
+    assert domain.domain_name == task_domain_name
     requirements = pddl.Requirements(sorted(set(
-                domain_requirements.requirements +
+                domain.requirements.requirements +
                 task_requirements.requirements)))
-    objects = constants + objects
+    objects = domain.objects + objects
     check_for_duplicates(
         [o.name for o in objects],
         errmsg="error: duplicate object %r",
         finalmsg="please check :constants and :objects definitions")
     init += [pddl.Atom("=", (obj.name, obj.name)) for obj in objects]
 
-    return pddl.Task(
-        domain_name, task_name, requirements, types, objects,
-        predicates, functions, init, goal, actions, axioms, use_metric)
+    task = pddl.Task(
+        domain.domain_name, task_name, requirements, domain.types, objects,
+        domain.predicates, domain.functions, init, goal, domain.actions,
+        domain.axioms, use_metric)
+    task.axiom_counter = domain.axiom_counter
+    return task
 
 
 def parse_domain_pddl(domain_pddl):
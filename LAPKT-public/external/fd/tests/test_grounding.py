@@ -0,0 +1,272 @@
+from array import array
+
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+
+from fd import fact_groups
+from fd import grounding
+from fd import instantiate
+from fd import normalize
+from fd import pddl
+from fd import pddl_parser
+
+
+FD_VERSION_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+ATOM_NAMES = ["p", "q", "r", "s"]
+ATOM_TABLE = dict((atom, index) for index, atom in enumerate(ATOM_NAMES))
+
+
+def encode_effect(condition, axioms=()):
+    action = grounding.PropositionalDetAction("a", 1)
+    adds = [(condition, pddl.Atom("s", []))]
+    action.add_effect(adds, [], ATOM_TABLE, ATOM_NAMES,
+                      grounding.index_axioms_by_name(axioms))
+    return action
+
+
+def test_negated_condition_without_axiom_is_kept():
+    action = encode_effect([pddl.NegatedAtom("p", []), pddl.Atom("q", []),
+                            pddl.NegatedAtom("r", [])])
+    assert action.cond_effs == {((0, True), (1, False), (2, True)): [(3, False)]}
+    assert action.negated_conditions == set([0, 2])
+
+
+def test_negated_condition_with_axiom_is_replaced():
+    axiom = pddl.PropositionalAxiom(
+        "(p)", [pddl.Atom("q", []), pddl.NegatedAtom("r", [])],
+        pddl.Atom("p", []))
+    action = encode_effect([pddl.NegatedAtom("p", [])], [axiom])
+    assert action.cond_effs == {((1, True), (2, False)): [(3, False)]}
+    assert action.negated_conditions == set([1])
+
+
+DOMAIN = """
+(define (domain lights)
+  (:requirements :adl)
+  (:predicates (room ?r) (on ?r) (linked ?r ?s) (broken ?r))
+  (:action toggle
+    :parameters (?r)
+    :precondition (and (room ?r) (not (broken ?r)))
+    :effect (and (on ?r)
+                 (forall (?s) (when (and (linked ?r ?s) (not (on ?s)))
+                                    (on ?s)))
+                 (forall (?s) (when (and (linked ?r ?s) (on ?s))
+                                    (not (on ?s))))))
+  (:action break
+    :parameters (?r)
+    :precondition (and (room ?r) (on ?r))
+    :effect (broken ?r)))
+"""
+
+PROBLEM = """
+(define (problem lights-3)
+  (:domain lights)
+  (:objects a b c)
+  (:init (room a) (room b) (room c) (linked a b) (linked b c) (on c))
+  (:goal (and (broken a) (broken b))))
+"""
+
+
+class TaskRecorder(object):
+    """Records the task passed to the per-call loading API."""
+
+    def __init__(self):
+        self.atoms = []
+        self.negated_conditions = set()
+        self.actions = []
+        self.mutex_groups = []
+
+    def add_atom(self, name):
+        self.atoms.append(name)
+
+    def notify_negated_conditions(self, atoms):
+        self.negated_conditions.update(atoms)
+
+    def create_negated_fluents(self):
+        pass
+
+    def add_action(self, name):
+        self.actions.append({"name": name, "pre": [], "eff": [], "ceff": []})
+
+    def add_precondition(self, index, lits):
+        self.actions[index]["pre"].extend(lits)
+
+    def add_effect(self, index, lits):
+        self.actions[index]["eff"].extend(lits)
+
+    def add_cond_effect(self, index, cond, lits):
+        self.actions[index]["ceff"].append((list(cond), list(lits)))
+
+    def set_cost(self, index, cost):
+        self.actions[index]["cost"] = cost
+
+    def add_mutex_group(self, lits):
+        self.mutex_groups.append(list(lits))
+
+    def set_domain_name(self, name):
+        self.domain_name = name
+
+    def set_problem_name(self, name):
+        self.problem_name = name
+
+    def set_init(self, lits):
+        self.init = lits
+
+    def set_goal(self, lits):
+        self.goal = lits
+
+
+def decode_ints(data):
+    ints = array('i')
+    ints.fromstring(data)
+    return ints
+
+
+def decode_rows(offsets, lits, num_rows):
+    # Mirrors check_offsets in src/bfws.cxx.
+    assert len(offsets) == num_rows + 1
+    assert offsets[0] == 0 and offsets[num_rows] == len(lits)
+    return [[(lit >> 1, bool(lit & 1)) for lit in lits[offsets[i]:offsets[i + 1]]]
+            for i in range(num_rows)]
+
+
+class BulkTaskRecorder(TaskRecorder):
+    """Records the task passed to the bulk loading API."""
+
+    def add_atoms(self, names):
+        self.atoms.extend(names)
+
+    def add_actions(self, names, costs):
+        costs = decode_ints(costs)
+        assert len(names) == len(costs)
+        for index, name in enumerate(names):
+            self.add_action(name)
+            self.set_cost(index, costs[index])
+
+    def add_preconditions(self, offsets, lits):
+        rows = decode_rows(decode_ints(offsets), decode_ints(lits),
+                           len(self.actions))
+        for index, row in enumerate(rows):
+            self.add_precondition(index, row)
+
+    def add_effects(self, offsets, lits):
+        rows = decode_rows(decode_ints(offsets), decode_ints(lits),
+                           len(self.actions))
+        for index, row in enumerate(rows):
+            self.add_effect(index, row)
+
+    def add_cond_effects(self, action_offsets, cond_offsets, cond_lits,
+                         eff_offsets, eff_lits):
+        action_offsets = decode_ints(action_offsets)
+        cond_offsets = decode_ints(cond_offsets)
+        eff_offsets = decode_ints(eff_offsets)
+        assert len(action_offsets) == len(self.actions) + 1
+        assert action_offsets[0] == 0
+        # As in BFWS::add_cond_effects, the last action offset is the
+        # number of conditional effects.
+        num_ceffs = action_offsets[-1]
+        conds = decode_rows(cond_offsets, decode_ints(cond_lits), num_ceffs)
+        effs = decode_rows(eff_offsets, decode_ints(eff_lits), num_ceffs)
+        for index in range(len(self.actions)):
+            for ceff in range(action_offsets[index], action_offsets[index + 1]):
+                self.add_cond_effect(index, conds[ceff], effs[ceff])
+
+    def add_mutex_groups(self, offsets, lits):
+        offsets = decode_ints(offsets)
+        for group in decode_rows(offsets, decode_ints(lits), len(offsets) - 1):
+            self.add_mutex_group(group)
+
+
+def ground_task():
+    directory = tempfile.mkdtemp()
+    try:
+        domain_file = os.path.join(directory, "domain.pddl")
+        problem_file = os.path.join(directory, "problem.pddl")
+        with open(domain_file, "w") as f:
+            f.write(DOMAIN)
+        with open(problem_file, "w") as f:
+            f.write(PROBLEM)
+        task = pddl_parser.open(
+            domain_filename=domain_file, task_filename=problem_file)
+    finally:
+        shutil.rmtree(directory)
+    normalize.normalize(task)
+    _, atoms, actions, axioms, reachable_action_params = instantiate.explore(task)
+    groups, mutex_groups, translation_key = fact_groups.compute_groups(
+        task, atoms, reachable_action_params)
+    return task, atoms, actions, axioms, groups, mutex_groups, translation_key
+
+
+def test_bulk_and_incremental_loading_agree():
+    task, atoms, actions, axioms, _, mutex_groups, _ = ground_task()
+    incremental = TaskRecorder()
+    grounding.load_task(task, atoms, actions, axioms, mutex_groups,
+                        incremental)
+    bulk = BulkTaskRecorder()
+    grounding.load_task(task, atoms, actions, axioms, mutex_groups, bulk)
+    num_ceffs = sum(len(action["ceff"]) for action in bulk.actions)
+    assert incremental.negated_conditions
+    assert 0 < num_ceffs != len(bulk.actions)
+    assert vars(bulk) == vars(incremental)
+
+
+def test_preprocessor_killed_by_signal():
+    task, _, actions, axioms, groups, mutex_groups, translation_key = ground_task()
+    returncode = grounding.translateToPreprocess(
+        task, groups, mutex_groups, translation_key, actions, axioms,
+        ["sh", "-c", "ulimit -c 0; kill -XCPU $$"])
+    assert returncode == -signal.SIGXCPU
+
+
+def burn_cpu_time():
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    resource.setrlimit(resource.RLIMIT_CPU, (1, hard))
+    while True:
+        pass
+
+
+def test_sas_worker_killed_by_sigxcpu():
+    pid = os.fork()
+    if pid == 0:
+        try:
+            burn_cpu_time()
+        finally:
+            os._exit(1)
+    assert grounding.joinSasWorker(pid) == -signal.SIGXCPU
+
+
+def test_sas_worker_passes_on_preprocessor_signal():
+    task, _, actions, axioms, groups, mutex_groups, translation_key = ground_task()
+    pid = grounding.startSasWorker(
+        task, groups, mutex_groups, translation_key, actions, axioms,
+        ["sh", "-c", "ulimit -c 0; kill -XCPU $$"])
+    assert grounding.joinSasWorker(pid) == -signal.SIGXCPU
+
+
+def test_child_inherits_remaining_cpu_time():
+    pid = os.fork()
+    if pid == 0:
+        inherited = None
+        try:
+            resource.setrlimit(resource.RLIMIT_CPU, (100, 101))
+            grounding.inheritRemainingCpuTime(30.5)
+            inherited = resource.getrlimit(resource.RLIMIT_CPU)
+        finally:
+            os._exit(0 if inherited == (70, 71) else 1)
+    assert os.waitpid(pid, 0)[1] == 0
+
+
+def test_exit_with_returncode():
+    for returncode in [0, 6, -signal.SIGXCPU, -signal.SIGKILL]:
+        code = ("from fd import grounding; "
+                "grounding.exitWithReturncode(%d)" % returncode)
+        assert subprocess.call([sys.executable, "-c", code],
+                               cwd=FD_VERSION_DIR) == returncode
@@ -18,6 +18,7 @@ from copy import deepcopy
 from itertools import product
 
 import axiom_rules
+import domain_cache
 import fact_groups
 import instantiate
 import normalize
@@ -43,6 +44,8 @@ DEBUG = False
 
 simplified_effect_condition_counter = 0
 added_implied_precondition_counter = 0
+negated_precondition_operator_counter = 0
+negated_precondition_sas_operator_counter = 0
 
 
 def strips_to_sas_dictionary(groups, assert_partial):
@@ -56,7 +59,43 @@ def strips_to_sas_dictionary(groups, assert_partial):
     return [len(group) + 1 for group in groups], dictionary
 
 
-def translate_strips_conditions_aux(conditions, dictionary, ranges):
+class NegatedConditionVariables(object):
+    """Derived variables that encode negated conditions instead of
+    multiplying them out (see translate_strips_conditions_aux).
+
+    The derived variable for a variable var and a set of values vals is
+    true (value 0) iff var has one of the values in vals. It is defined
+    by one axiom per value in vals. New variables are appended to ranges
+    and translation_key, which are modified in place."""
+    def __init__(self, ranges, translation_key):
+        self.ranges = ranges
+        self.translation_key = translation_key
+        self.first_variable = len(ranges)
+        self.variables = {}
+        self.axioms = []
+
+    def get_variable(self, var, vals):
+        key = (var, frozenset(vals))
+        derived_var = self.variables.get(key)
+        if derived_var is None:
+            derived_var = len(self.ranges)
+            name = "negated-condition@%d()" % (
+                derived_var - self.first_variable)
+            self.ranges.append(2)
+            self.translation_key.append(
+                ["Atom %s" % name, "NegatedAtom %s" % name])
+            for val in sorted(vals):
+                self.axioms.append(
+                    sas_tasks.SASAxiom([(var, val)], (derived_var, 0)))
+            self.variables[key] = derived_var
+        return derived_var
+
+    def get_new_variables(self):
+        return range(self.first_variable, len(self.ranges))
+
+
+def translate_strips_conditions_aux(conditions, dictionary, ranges,
+                                    negated_condition_variables=None):
     condition = {}
     for fact in conditions:
         if fact.negated:
@@ -99,6 +138,9 @@ def translate_strips_conditions_aux(conditions, dictionary, ranges):
            ##       precondition and expanding it by "multiplying out" the
            ##       possibilities.  This can lead to an exponential blow-up so
            ##       it would be nice to choose the behaviour as an option.
+           ##       With --negated-conditions=axioms, conditions on more than
+           ##       one value are replaced by a derived variable below
+           ##       (see NegatedConditionVariables).
             done = False
             new_condition = {}
             atom = pddl.Atom(fact.predicate, fact.args)  # force positive
@@ -130,28 +172,37 @@ def translate_strips_conditions_aux(conditions, dictionary, ranges):
                 var, vals = candidates[0]
                 condition[var] = vals
 
-        def multiply_out(condition):  # destroys the input
-            sorted_conds = sorted(condition.items(), key=number_of_values)
-            flat_conds = [{}]
-            for var, vals in sorted_conds:
-                if len(vals) == 1:
-                    for cond in flat_conds:
-                        cond[var] = vals.pop()  # destroys the input here
-                else:
-                    new_conds = []
-                    for cond in flat_conds:
-                        for val in vals:
-                            new_cond = deepcopy(cond)
-                            new_cond[var] = val
-                            new_conds.append(new_cond)
-                    flat_conds = new_conds
-            return flat_conds
+    def multiply_out(condition):  # destroys the input
+        sorted_conds = sorted(condition.items(), key=number_of_values)
+        flat_conds = [{}]
+        for var, vals in sorted_conds:
+            if len(vals) == 1:
+                for cond in flat_conds:
+                    cond[var] = vals.pop()  # destroys the input here
+            else:
+                new_conds = []
+                for cond in flat_conds:
+                    for val in vals:
+                        new_cond = deepcopy(cond)
+                        new_cond[var] = val
+                        new_conds.append(new_cond)
+                flat_conds = new_conds
+        return flat_conds
+
+    if negated_condition_variables is not None:
+        for var, vals in list(condition.items()):
+            if len(vals) > 1:
+                del condition[var]
+                derived_var = negated_condition_variables.get_variable(
+                    var, vals)
+                condition[derived_var] = set([0])
 
     return multiply_out(condition)
 
 
 def translate_strips_conditions(conditions, dictionary, ranges,
-                                mutex_dict, mutex_ranges):
+                                mutex_dict, mutex_ranges,
+                                negated_condition_variables=None):
     if not conditions:
         return [{}]  # Quick exit for common case.
 
@@ -160,54 +211,132 @@ def translate_strips_conditions(conditions, dictionary, ranges,
                                        mutex_ranges) is None:
         return None
 
-    return translate_strips_conditions_aux(conditions, dictionary, ranges)
+    return translate_strips_conditions_aux(conditions, dictionary, ranges,
+                                           negated_condition_variables)
 
 
 def translate_strips_operator(operator, dictionary, ranges, mutex_dict,
-                              mutex_ranges, implied_facts):
+                              mutex_ranges, implied_facts,
+                              negated_condition_variables=None):
     conditions = translate_strips_conditions(operator.precondition, dictionary,
-                                             ranges, mutex_dict, mutex_ranges)
+                                             ranges, mutex_dict, mutex_ranges,
+                                             negated_condition_variables)
     if conditions is None:
         return []
     sas_operators = []
     for condition in conditions:
         op = translate_strips_operator_aux(operator, dictionary, ranges,
                                            mutex_dict, mutex_ranges,
-                                           implied_facts, condition)
+                                           implied_facts, condition,
+                                           negated_condition_variables)
         if op is not None:
             sas_operators.append(op)
     return sas_operators
 
 
-def negate_and_translate_condition(condition, dictionary, ranges, mutex_dict,
-                                   mutex_ranges):
-    # condition is a list of lists of literals (DNF)
-    # the result is the negation of the condition in DNF in
-    # finite-domain representation (a list of dictionaries that map
-    # variables to values)
-    negation = []
-    if [] in condition:  # condition always satisfied
-        return None  # negation unsatisfiable
-    for combination in product(*condition):
-        cond = [l.negate() for l in combination]
-        cond = translate_strips_conditions(cond, dictionary, ranges,
-                                           mutex_dict, mutex_ranges)
-        if cond is not None:
-            negation.extend(cond)
-    return negation if negation else None
+class NegatedCondition(object):
+    """The negation of a condition in DNF (a list of lists of literals)
+    in finite-domain representation.
+
+    The negation is the disjunction over all combinations of one negated
+    literal per disjunct. Combinations are only translated when they are
+    needed and each combination is translated at most once. Translations
+    are stored under the position of their combination in the product of
+    all disjuncts."""
+    def __init__(self, condition, dictionary, ranges, mutex_dict,
+                 mutex_ranges, negated_condition_variables=None):
+        self.disjuncts = [[literal.negate() for literal in disjunct]
+                          for disjunct in condition]
+        # offsets[i][j] is the contribution of the j-th literal of the
+        # i-th disjunct to the position of a combination.
+        self.strides = []
+        self.offsets = []
+        stride = 1
+        for disjunct in reversed(self.disjuncts):
+            self.strides.append(stride)
+            self.offsets.append([index * stride
+                                 for index in range(len(disjunct))])
+            stride *= len(disjunct)
+        self.strides.reverse()
+        self.offsets.reverse()
+        self.dictionary = dictionary
+        self.ranges = ranges
+        self.mutex_dict = mutex_dict
+        self.mutex_ranges = mutex_ranges
+        self.negated_condition_variables = negated_condition_variables
+        self.translations = {}
+
+    def _translate(self, offsets):
+        position = sum(offsets)
+        try:
+            return self.translations[position]
+        except KeyError:
+            combination = [
+                disjunct[offset // stride] for disjunct, stride, offset
+                in zip(self.disjuncts, self.strides, offsets)]
+            translation = translate_strips_conditions(
+                combination, self.dictionary, self.ranges,
+                self.mutex_dict, self.mutex_ranges,
+                self.negated_condition_variables)
+            self.translations[position] = translation
+            return translation
+
+    def is_satisfiable(self):
+        for offsets in product(*self.offsets):
+            if self._translate(offsets):
+                return True
+        return False
+
+    def _contradicts(self, literal, cond):
+        """Test if every translation of a combination containing literal
+        contradicts cond."""
+        pairs = self.dictionary.get(literal.positive(), ())
+        if not literal.negated:
+            for var, val in pairs:
+                if var in cond and cond[var] != val:
+                    return True
+        elif len(pairs) == 1:
+            # With one pair, the translation requires var != val. Unless
+            # this is replaced by a derived variable, it contradicts cond
+            # if cond requires var == val.
+            [(var, val)] = pairs
+            if cond.get(var) == val and (
+                    self.negated_condition_variables is None or
+                    self.ranges[var] == 2):
+                return True
+        return False
+
+    def get_conditions(self, cond):
+        """Yield the conditions of the negation that are consistent with
+        cond, in the order in which they occur in the negation. Literals
+        that contradict cond are removed before building the
+        combinations, so their combinations are never translated."""
+        all_offsets = []
+        for disjunct, disjunct_offsets in zip(self.disjuncts, self.offsets):
+            offsets = [offset for literal, offset
+                       in zip(disjunct, disjunct_offsets)
+                       if not self._contradicts(literal, cond)]
+            if not offsets:
+                # Some add effect triggers whenever cond holds.
+                return
+            all_offsets.append(offsets)
+        for offsets in product(*all_offsets):
+            for no_add_cond in self._translate(offsets) or ():
+                yield no_add_cond
 
 
 def translate_strips_operator_aux(operator, dictionary, ranges, mutex_dict,
-                                  mutex_ranges, implied_facts, condition):
+                                  mutex_ranges, implied_facts, condition,
+                                  negated_condition_variables=None):
 
     # collect all add effects
     effects_by_variable = defaultdict(lambda: defaultdict(list))
     # effects_by_variables: var -> val -> list(FDR conditions)
     add_conds_by_variable = defaultdict(list)
     for conditions, fact in operator.add_effects:
-        eff_condition_list = translate_strips_conditions(conditions, dictionary,
-                                                         ranges, mutex_dict,
-                                                         mutex_ranges)
+        eff_condition_list = translate_strips_conditions(
+            conditions, dictionary, ranges, mutex_dict, mutex_ranges,
+            negated_condition_variables)
         if eff_condition_list is None:  # Impossible condition for this effect.
             continue
         for var, val in dictionary[fact]:
@@ -217,9 +346,9 @@ def translate_strips_operator_aux(operator, dictionary, ranges, mutex_dict,
     # collect all del effects
     del_effects_by_variable = defaultdict(lambda: defaultdict(list))
     for conditions, fact in operator.del_effects:
-        eff_condition_list = translate_strips_conditions(conditions, dictionary,
-                                                         ranges, mutex_dict,
-                                                         mutex_ranges)
+        eff_condition_list = translate_strips_conditions(
+            conditions, dictionary, ranges, mutex_dict, mutex_ranges,
+            negated_condition_variables)
         if eff_condition_list is None:  # Impossible condition for this effect.
             continue
         for var, val in dictionary[fact]:
@@ -228,10 +357,13 @@ def translate_strips_operator_aux(operator, dictionary, ranges, mutex_dict,
     # add effect var=none_of_those for all del effects with the additional
     # condition that the deleted value has been true and no add effect triggers
     for var in del_effects_by_variable:
-        no_add_effect_condition = negate_and_translate_condition(
-            add_conds_by_variable[var], dictionary, ranges, mutex_dict,
-            mutex_ranges)
-        if no_add_effect_condition is None:  # there is always an add effect
+        add_conds = add_conds_by_variable[var]
+        if [] in add_conds:  # there is always an add effect
+            continue
+        no_add_effect_condition = NegatedCondition(
+            add_conds, dictionary, ranges, mutex_dict, mutex_ranges,
+            negated_condition_variables)
+        if not no_add_effect_condition.is_satisfiable():
             continue
         none_of_those = ranges[var] - 1
         for val, conds in del_effects_by_variable[var].items():
@@ -241,18 +373,12 @@ def translate_strips_operator_aux(operator, dictionary, ranges, mutex_dict,
                     continue  # condition inconsistent with deleted atom
                 cond[var] = val
                 # add condition that no add effect triggers
-                for no_add_cond in no_add_effect_condition:
+                for no_add_cond in no_add_effect_condition.get_conditions(
+                        cond):
                     new_cond = dict(cond)
-                    # This is a rather expensive step. We try every no_add_cond
-                    # with every condition of the delete effect and discard the
-                    # overal combination if it is unsatisfiable. Since
-                    # no_add_effect_condition is precomputed it can contain many
-                    # no_add_conds in which a certain literal occurs. So if cond
-                    # plus the literal is already unsatisfiable, we still try
-                    # all these combinations. A possible optimization would be
-                    # to re-compute no_add_effect_condition for every delete
-                    # effect and to unfold the product(*condition) in
-                    # negate_and_translate_condition to allow an early break.
+                    # Combinations with a literal that contradicts cond are
+                    # skipped by get_conditions, but other contradictions
+                    # (e.g. with full encodings) are only detected here.
                     for cvar, cval in no_add_cond.items():
                         if cvar in new_cond and new_cond[cvar] != cval:
                             # the del effect condition plus the deleted atom
@@ -356,9 +482,11 @@ def prune_stupid_effect_conditions(var, val, conditions):
     return simplified
 
 
-def translate_strips_axiom(axiom, dictionary, ranges, mutex_dict, mutex_ranges):
+def translate_strips_axiom(axiom, dictionary, ranges, mutex_dict, mutex_ranges,
+                           negated_condition_variables=None):
     conditions = translate_strips_conditions(axiom.condition, dictionary,
-                                             ranges, mutex_dict, mutex_ranges)
+                                             ranges, mutex_dict, mutex_ranges,
+                                             negated_condition_variables)
     if conditions is None:
         return []
     if axiom.effect.negated:
@@ -373,22 +501,30 @@ def translate_strips_axiom(axiom, dictionary, ranges, mutex_dict, mutex_ranges):
 
 
 def translate_strips_operators(actions, strips_to_sas, ranges, mutex_dict,
-                               mutex_ranges, implied_facts):
+                               mutex_ranges, implied_facts,
+                               negated_condition_variables=None):
+    global negated_precondition_operator_counter
+    global negated_precondition_sas_operator_counter
     result = []
     for action in actions:
         sas_ops = translate_strips_operator(action, strips_to_sas, ranges,
                                             mutex_dict, mutex_ranges,
-                                            implied_facts)
+                                            implied_facts,
+                                            negated_condition_variables)
+        if any(fact.negated for fact in action.precondition):
+            negated_precondition_operator_counter += 1
+            negated_precondition_sas_operator_counter += len(sas_ops)
         result.extend(sas_ops)
     return result
 
 
 def translate_strips_axioms(axioms, strips_to_sas, ranges, mutex_dict,
-                            mutex_ranges):
+                            mutex_ranges, negated_condition_variables=None):
     result = []
     for axiom in axioms:
         sas_axioms = translate_strips_axiom(axiom, strips_to_sas, ranges,
-                                            mutex_dict, mutex_ranges)
+                                            mutex_dict, mutex_ranges,
+                                            negated_condition_variables)
         result.extend(sas_axioms)
     return result
 
@@ -423,9 +559,14 @@ def translate_task(strips_to_sas, ranges, translation_key,
                    mutex_dict, mutex_ranges, mutex_key,
                    init, goals,
                    actions, axioms, metric, implied_facts):
+    # Actions may be a one-shot iterator (see instantiate.explore_lazily).
+    # Only axiom processing and dumping need a pass over all of them
+    # before the operators are translated.
+    if axioms or options.dump_task:
+        actions = list(actions)
     with timers.timing("Processing axioms", block=True):
         axioms, axiom_init, axiom_layer_dict = axiom_rules.handle_axioms(
-            actions, axioms, goals)
+            actions if axioms else [], axioms, goals)
     init = init + axiom_init
     #axioms.sort(key=lambda axiom: axiom.name)
     #for axiom in axioms:
@@ -445,10 +586,18 @@ def translate_task(strips_to_sas, ranges, translation_key,
             if curr_val != ranges[var] - 1 and curr_val != val:
                 assert False, "Inconsistent init facts! [fact = %s]" % fact
             init_values[var] = val
-    init = sas_tasks.SASInit(init_values)
+
+    if options.negated_conditions == "axioms":
+        ranges = list(ranges)
+        translation_key = list(translation_key)
+        negated_condition_variables = NegatedConditionVariables(
+            ranges, translation_key)
+    else:
+        negated_condition_variables = None
 
     goal_dict_list = translate_strips_conditions(goals, strips_to_sas, ranges,
-                                                 mutex_dict, mutex_ranges)
+                                                 mutex_dict, mutex_ranges,
+                                                 negated_condition_variables)
     if goal_dict_list is None:
         # "None" is a signal that the goal is unreachable because it
         # violates a mutex.
@@ -468,15 +617,33 @@ def translate_task(strips_to_sas, ranges, translation_key,
 
     operators = translate_strips_operators(actions, strips_to_sas, ranges,
                                            mutex_dict, mutex_ranges,
-                                           implied_facts)
+                                           implied_facts,
+                                           negated_condition_variables)
     axioms = translate_strips_axioms(axioms, strips_to_sas, ranges, mutex_dict,
-                                     mutex_ranges)
+                                     mutex_ranges, negated_condition_variables)
 
     axiom_layers = [-1] * len(ranges)
     for atom, layer in axiom_layer_dict.items():
         assert layer >= 0
         [(var, val)] = strips_to_sas[atom]
         axiom_layers[var] = layer
+    if negated_condition_variables is not None:
+        # The new derived variables only depend on non-derived variables
+        # (negated conditions on binary variables are never multiplied
+        # out) and are only used positively, so they can share the
+        # lowest layer.
+        for var in negated_condition_variables.get_new_variables():
+            init_values.append(1)
+            axiom_layers[var] = 0
+        axioms.extend(negated_condition_variables.axioms)
+        print("%d derived variables for negated conditions" %
+              len(negated_condition_variables.variables))
+        timers.add_counts(
+            negated_condition_variables=len(
+                negated_condition_variables.variables))
+    # The initial values are complete only now that the derived variables
+    # for negated conditions exist.
+    init = sas_tasks.SASInit(init_values)
     variables = sas_tasks.SASVariables(ranges, axiom_layers, translation_key)
     mutexes = [sas_tasks.SASMutexGroup(group) for group in mutex_key]
     return sas_tasks.SASTask(variables, mutexes, init, goal,
@@ -511,10 +678,13 @@ def unsolvable_sas_task(msg):
     print("%s! Generating unsolvable task..." % msg)
     return trivial_task(solvable=False)
 
-def pddl_to_sas(task):
+def pddl_to_sas(task, cache=None):
+    domain_program = cache.program if cache is not None else None
     with timers.timing("Instantiating", block=True):
         (relaxed_reachable, atoms, actions, axioms,
-         reachable_action_params) = instantiate.explore(task)
+         reachable_action_params) = instantiate.explore_lazily(
+             task, domain_program)
+        timers.add_counts(fluent_facts=len(atoms), axioms=len(axioms))
 
     if not relaxed_reachable:
         return unsolvable_sas_task("No relaxed solution")
@@ -529,7 +699,7 @@ def pddl_to_sas(task):
 
     with timers.timing("Computing fact groups", block=True):
         groups, mutex_groups, translation_key = fact_groups.compute_groups(
-            task, atoms, reachable_action_params)
+            task, atoms, reachable_action_params, cache)
 
     with timers.timing("Building STRIPS to SAS dictionary"):
         ranges, strips_to_sas = strips_to_sas_dictionary(
@@ -555,16 +725,31 @@ def pddl_to_sas(task):
             mutex_dict, mutex_ranges, mutex_key,
             task.init, goal_list, actions, axioms, task.use_min_cost_metric,
             implied_facts)
+        timers.add_counts(variables=len(sas_task.variables.ranges),
+                          operators=len(sas_task.operators),
+                          axioms=len(sas_task.axioms))
 
     print("%d effect conditions simplified" %
           simplified_effect_condition_counter)
     print("%d implied preconditions added" %
           added_implied_precondition_counter)
+    print("%d operators with negated preconditions translated to "
+          "%d SAS operators (negated conditions: %s)" % (
+              negated_precondition_operator_counter,
+              negated_precondition_sas_operator_counter,
+              options.negated_conditions))
+    timers.add_counts(
+        negated_precondition_operators=negated_precondition_operator_counter,
+        negated_precondition_sas_operators=(
+            negated_precondition_sas_operator_counter))
 
     if options.filter_unreachable_facts:
         with timers.timing("Detecting unreachable propositions", block=True):
             try:
                 simplify.filter_unreachable_propositions(sas_task)
+                timers.add_counts(variables=len(sas_task.variables.ranges),
+                                  operators=len(sas_task.operators),
+                                  axioms=len(sas_task.axioms))
             except simplify.Impossible:
                 return unsolvable_sas_task("Simplified to trivially false goal")
             except simplify.TriviallySolvable:
@@ -654,14 +839,41 @@ def dump_statistics(sas_task):
         print("Translator peak memory: %d KB" % peak_memory)
 
 
-def main():
-    timer = timers.Timer()
+def reset_counters():
+    """Reset the statistics collected while translating a task."""
+    global simplified_effect_condition_counter
+    global added_implied_precondition_counter
+    global negated_precondition_operator_counter
+    global negated_precondition_sas_operator_counter
+    simplified_effect_condition_counter = 0
+    added_implied_precondition_counter = 0
+    negated_precondition_operator_counter = 0
+    negated_precondition_sas_operator_counter = 0
+
+
+def translate_current_task():
+    """Translate the task given by the current options and return the SAS+
+    task. The statistics and profile phases of earlier tasks are reset."""
+    reset_counters()
+    timers.reset()
+    cache = None
     with timers.timing("Parsing", True):
-        task = pddl_parser.open(
-            domain_filename=options.domain, task_filename=options.task)
+        if options.domain_cache:
+            cache = domain_cache.DomainCache(
+                options.domain_cache, options.domain)
+            task = cache.open_task(options.task)
+        else:
+            task = pddl_parser.open(
+                domain_filename=options.domain, task_filename=options.task)
+        timers.add_counts(objects=len(task.objects),
+                          action_schemas=len(task.actions),
+                          axiom_schemas=len(task.axioms))
 
     with timers.timing("Normalizing task"):
-        normalize.normalize(task)
+        if cache is not None:
+            normalize.normalize_goal(task)
+        else:
+            normalize.normalize(task)
 
     if options.generate_relaxed_task:
         # Remove delete effects.
@@ -670,13 +882,46 @@ def main():
                 if effect.literal.negated:
                     del action.effects[index]
 
-    sas_task = pddl_to_sas(task)
+    sas_task = pddl_to_sas(task, cache)
     dump_statistics(sas_task)
+    return sas_task
 
-    with timers.timing("Writing output"):
+
+def pddl_files_to_sas(domain_filename, task_filename, **kwargs):
+    """Translate the given PDDL files and return the SAS+ task. This is the
+    entry point for programs that use the translator as a library, e.g.
+
+        sas_task = translate.pddl_files_to_sas(
+            "domain.pddl", "p01.pddl", use_partial_encoding=False)
         with open("output.sas", "w") as output_file:
             sas_task.output(output_file)
+
+    The keyword arguments set the options of the translator, all others
+    get their default values (see options.set_options). The options are
+    the module globals of options.py, not an object passed to the
+    translator, so they stay set after the call, and tasks with different
+    options cannot be translated at the same time in one process."""
+    options.set_options(
+        domain=domain_filename, task=task_filename, **kwargs)
+    return translate_current_task()
+
+
+def main(argv=None):
+    options.setup(argv)
+    timer = timers.Timer()
+    sas_task = translate_current_task()
+
+    with timers.timing("Writing output"):
+        if options.output_format == "binary":
+            with open(options.sas_file, "wb") as output_file:
+                sas_task.output_binary(output_file)
+        else:
+            with open(options.sas_file, "w") as output_file:
+                sas_task.output(output_file)
+        timers.add_counts(task_size=sas_task.get_encoding_size())
     print("Done! %s" % timer)
+    if options.profile:
+        timers.write_profile(options.profile, component="translate")
 
 
 if __name__ == "__main__":
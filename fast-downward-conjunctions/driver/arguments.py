@@ -44,6 +44,16 @@ suffixes s, m, h and K, M, G.
 By default, all limits are inactive. Only external limits (e.g. set with
 ulimit) are respected.
 
+In --dual mode, the "bfws" limits apply to the 1-BFWS phase (including the
+translation and preprocessing it performs for the second phase). Use
+--bfws-time-fraction to give 1-BFWS only a share of the remaining time.
+If 1-BFWS exceeds its limits, the second phase is run from scratch.
+Time limits count CPU time per process: the SAS worker and the
+preprocessor started by 1-BFWS get the time their parent had left when it
+started them. With --concurrent-translate, the worker runs alongside the
+1-BFWS search, so the phase can use up to twice its time limit. The memory
+limit applies to each of these processes separately.
+
 Portfolios require that a time limit is in effect. Portfolio configurations
 that exceed their time or memory limit are aborted, and the next
 configuration is run."""
@@ -87,7 +97,8 @@ Examples:
 %s
 """ % "\n\n".join("%s\n%s" % (desc, " ".join(cmd)) for desc, cmd in EXAMPLES)
 
-COMPONENTS_PLUS_OVERALL = ["translate", "preprocess", "search", "overall"]
+COMPONENTS_PLUS_OVERALL = [
+    "bfws", "translate", "preprocess", "search", "overall"]
 
 
 class RawHelpFormatter(argparse.HelpFormatter):
@@ -177,10 +188,13 @@ def _check_mutex_args(parser, args, required=False):
 def _looks_like_search_input(filename):
     # We don't currently have a good way to distinguish preprocess and
     # search inputs without going through most of the file, so we
-    # don't even try.
-    with open(filename) as input_file:
-        first_line = next(input_file, "").rstrip()
-    return first_line == "begin_version"
+    # don't even try. Binary inputs start with the magic string "\0SAS".
+    with open(filename, "rb") as input_file:
+        if input_file.read(4) == b"\0SAS":
+            return True
+        input_file.seek(0)
+        first_line = input_file.readline().rstrip()
+    return first_line == b"begin_version"
 
 
 def _set_components_automatically(parser, args):
@@ -277,7 +291,7 @@ def _convert_limits_to_ints(parser, args):
         limits.set_memory_limit_in_bytes(parser, args, component)
 
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(
         description=DESCRIPTION, epilog=EPILOG,
         formatter_class=RawHelpFormatter,
@@ -314,12 +328,20 @@ def parse_args():
     parser.add_argument(
         "--dual", type=bool, nargs='?', const=True, default=False,
         help="run 1-BFWS before search")
+    parser.add_argument(
+        "--concurrent-translate", action="store_true",
+        help="with --dual, translate (and preprocess) the task while "
+        "1-BFWS is still searching instead of after it has failed")
 
     limits = parser.add_argument_group(
         title="time and memory limits", description=LIMITS_HELP)
     for component in COMPONENTS_PLUS_OVERALL:
         limits.add_argument("--{}-time-limit".format(component))
         limits.add_argument("--{}-memory-limit".format(component))
+    limits.add_argument(
+        "--bfws-time-fraction", type=float,
+        help="share of the remaining overall time given to 1-BFWS in "
+        "--dual mode (between 0 and 1; default: no share)")
 
     driver_other = parser.add_argument_group(
         title="other driver options")
@@ -352,10 +374,27 @@ def parse_args():
     driver_other.add_argument(
         "--portfolio", metavar="FILE",
         help="run a portfolio specified in FILE")
+    driver_other.add_argument(
+        "--portfolio-jobs", metavar="N", type=int, default=1,
+        help="run up to N configurations of a portfolio in parallel, "
+            "dividing the memory limit evenly among them (default: %(default)s)")
 
+    driver_other.add_argument(
+        "--keep-intermediate", action="store_true",
+        help="write the translator output to output.sas and the preprocessor "
+            "output to output, and run the components one after the other. "
+            "By default, when translator, preprocessor and search all run, "
+            "they run at the same time connected by pipes and these files "
+            "are not written (unless an overall time limit is set and the "
+            "Python version cannot lower the limits of running processes).")
     driver_other.add_argument(
         "--cleanup", action="store_true",
         help="clean up temporary files (output, output.sas, sas_plan, sas_plan.*) and exit")
+    driver_other.add_argument(
+        "--profile", metavar="FILE",
+        help="write the wall time, CPU time and peak memory of every "
+            "component, and of the phases of the translator and 1-BFWS, "
+            "to FILE as JSON")
 
 
     parser.add_argument(
@@ -369,7 +408,7 @@ def parse_args():
     # can be used as an explicit separator. For example, "./fast-downward.py --
     # --help" passes "--help" to the search code.
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if args.build and args.debug:
         parser.error("The option --debug is an alias for --build=debug32. "
@@ -387,6 +426,15 @@ def parse_args():
             ("--portfolio", args.portfolio is not None),
             ("options for search component", bool(args.search_options))])
 
+    if args.portfolio_jobs < 1:
+        parser.error("--portfolio-jobs must be at least 1")
+
+    if args.concurrent_translate and not args.dual:
+        parser.error("--concurrent-translate requires --dual")
+    if (args.bfws_time_fraction is not None and
+            not 0 < args.bfws_time_fraction <= 1):
+        parser.error("--bfws-time-fraction must be in (0, 1]")
+
     _convert_limits_to_ints(parser, args)
 
     if args.alias:
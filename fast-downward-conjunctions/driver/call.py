@@ -6,25 +6,196 @@ from __future__ import print_function
 
 from . import limits
 
+import errno
+import os
+import signal
 import subprocess
 import sys
+import threading
+import traceback
 
 
-def check_call(cmd, stdin=None, time_limit=None, memory_limit=None):
-    def set_limits():
+class InputData(object):
+    """Data written to the standard input of a call instead of the
+    contents of a file (see check_call and start_call)."""
+    def __init__(self, data):
+        self.data = data
+
+
+def _set_close_on_exec(fd, close_on_exec):
+    import fcntl
+    flags = fcntl.fcntl(fd, fcntl.F_GETFD)
+    if close_on_exec:
+        flags |= fcntl.FD_CLOEXEC
+    else:
+        flags &= ~fcntl.FD_CLOEXEC
+    fcntl.fcntl(fd, fcntl.F_SETFD, flags)
+
+
+def make_pipe():
+    """Return the file descriptors (read, write) of a new pipe. Child
+    processes only inherit them if they are passed in pass_fds."""
+    fds = os.pipe()
+    for fd in fds:
+        _set_close_on_exec(fd, True)
+    return fds
+
+
+def _get_limit_kwargs(time_limit, memory_limit, pass_fds=()):
+    # Python 3 keeps only the file descriptors in pass_fds open in the
+    # child. Python 2 keeps all that are not close-on-exec.
+    use_pass_fds = sys.version_info >= (3, 2)
+
+    def prepare_child():
         limits.set_time_limit(time_limit)
         limits.set_memory_limit(memory_limit)
+        if not use_pass_fds:
+            for fd in pass_fds:
+                _set_close_on_exec(fd, False)
 
     kwargs = {}
     if time_limit is not None or memory_limit is not None:
-        if limits.can_set_limits():
-            kwargs["preexec_fn"] = set_limits
-        else:
+        if not limits.can_set_limits():
             sys.exit(limits.RESOURCE_MODULE_MISSING_MSG)
+        kwargs["preexec_fn"] = prepare_child
+    if pass_fds:
+        if use_pass_fds:
+            kwargs["pass_fds"] = pass_fds
+        else:
+            kwargs["preexec_fn"] = prepare_child
+    return kwargs
+
+
+def _write_input(stdin_file, data):
+    try:
+        stdin_file.write(data)
+        stdin_file.close()
+    except (IOError, OSError) as err:
+        # The process exited without reading all of its input.
+        if err.errno not in [errno.EPIPE, errno.EINVAL]:
+            raise
+
 
+def check_call(cmd, stdin=None, time_limit=None, memory_limit=None):
+    """Call cmd with the given limits and raise
+    subprocess.CalledProcessError if it fails. stdin can be the name of a
+    file or an InputData object."""
+    if isinstance(stdin, InputData):
+        returncode = start_call(cmd, stdin, time_limit, memory_limit).wait()
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, cmd)
+        return returncode
+    kwargs = _get_limit_kwargs(time_limit, memory_limit)
     sys.stdout.flush()
     if stdin:
         with open(stdin) as stdin_file:
             return subprocess.check_call(cmd, stdin=stdin_file, **kwargs)
     else:
         return subprocess.check_call(cmd, **kwargs)
+
+
+def start_call(cmd, stdin=None, time_limit=None, memory_limit=None,
+               pass_fds=()):
+    """Start cmd with the given limits like check_call, but return the
+    subprocess.Popen object instead of waiting for the process. stdin can
+    also be a file descriptor. The child inherits the file descriptors in
+    pass_fds."""
+    kwargs = _get_limit_kwargs(time_limit, memory_limit, pass_fds)
+    sys.stdout.flush()
+    if isinstance(stdin, InputData):
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, **kwargs)
+        # Write from a thread, so that the caller can go on while the
+        # process reads its input.
+        writer = threading.Thread(
+            target=_write_input, args=(process.stdin, stdin.data))
+        writer.daemon = True
+        writer.start()
+        return process
+    elif isinstance(stdin, int):
+        return subprocess.Popen(cmd, stdin=stdin, **kwargs)
+    elif stdin:
+        with open(stdin) as stdin_file:
+            return subprocess.Popen(cmd, stdin=stdin_file, **kwargs)
+    else:
+        return subprocess.Popen(cmd, **kwargs)
+
+
+def get_returncode(status):
+    """Convert a status returned by os.waitpid into a return code like
+    the ones of subprocess: negative numbers mean killed by a signal."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def fork_call(function, time_limit=None, memory_limit=None):
+    """Call function() in a forked child with the given limits and
+    return the pid of the child. The exit code of the child is 0 if
+    function returns and the code of SystemExit if it raises it. Other
+    exceptions are printed and make the child exit with code 1."""
+    if ((time_limit is not None or memory_limit is not None) and
+            not limits.can_set_limits()):
+        sys.exit(limits.RESOURCE_MODULE_MISSING_MSG)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        return pid
+    exitcode = 1
+    try:
+        limits.set_time_limit(time_limit)
+        limits.set_memory_limit(memory_limit)
+        function()
+        exitcode = 0
+    except SystemExit as err:
+        if err.code is None:
+            exitcode = 0
+        elif isinstance(err.code, int):
+            exitcode = err.code
+        else:
+            print(err.code, file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exitcode)
+
+
+class ForkedProcess(object):
+    """Child forked by fork_call with the methods of subprocess.Popen
+    needed to wait for it or to stop it."""
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid:
+                self.returncode = get_returncode(status)
+        return self.returncode
+
+    def wait(self):
+        if self.returncode is None:
+            _, status = os.waitpid(self.pid, 0)
+            self.returncode = get_returncode(status)
+        return self.returncode
+
+    def kill(self):
+        if self.returncode is None:
+            os.kill(self.pid, signal.SIGKILL)
+
+
+def check_fork(cmd, function, time_limit=None, memory_limit=None):
+    """Call function() in a forked child like fork_call and wait for it.
+    Raise subprocess.CalledProcessError for cmd, which describes the
+    call, if the child fails, like check_call does."""
+    pid = fork_call(function, time_limit, memory_limit)
+    _, status = os.waitpid(pid, 0)
+    returncode = get_returncode(status)
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+
+"""
+Run the planner on the instances of a benchmark in parallel and record
+a result for every run. Run with
+
+    ./fast-downward-experiment.py MANIFEST --results FILE [options]
+
+MANIFEST is a Python file that defines the benchmark as a dict mapping
+domain names to lists of (domain file, problem file) pairs, like the
+benchmark_* dicts of LAPKT-public/benchmarks/domains.py. The files of a
+domain are relative to BENCHMARKS_DIR/<domain name>. Use --benchmark to
+select the dict if the manifest defines several of them.
+
+By default, every run uses the configuration of the sysu-planner (1-BFWS
+followed by Forward-RHC, see the Singularity file). With --alias, runs
+use a configuration of the driver instead. Every run starts the driver
+in a directory of its own, RUN_DIR/<domain name>/<problem file>, with
+its output in run.log. Its time and memory limits are set as resource
+limits of the driver, which passes them on to the planner components,
+and a run that exceeds its wall-clock limit is killed.
+
+The results are appended to FILE, one JSON object per line, with the
+keys
+
+  domain        domain name
+  problem       problem file as given in the manifest
+  run_dir       directory the driver ran in
+  exitcode      exit code of the driver (negative if killed by a signal)
+  killed        whether the run was killed for exceeding the wall-clock
+                limit
+  wall_time     wall-clock time of the run in seconds
+  cpu_time      CPU time of the driver and all planner components
+  peak_rss_kb   peak resident memory of the driver or its largest
+                component in KB
+  plan_found    whether a plan file was written
+  plan_length   number of actions of the last plan written
+  plan_cost     cost of that plan, if it states its cost
+  phase         "1-BFWS" if 1-BFWS found the plan, "Forward-RHC" if the
+                sysu-planner went on to the second phase, null otherwise
+"""
+
+from __future__ import print_function
+
+import argparse
+import errno
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+
+from . import call
+from . import limits
+from .plan_manager import PlanManager
+from .util import REPO_ROOT_DIR
+
+
+POLL_INTERVAL = 0.1
+DRIVER = os.path.join(REPO_ROOT_DIR, "fast-downward.py")
+DEFAULT_BFWS_REPO = os.path.join(
+    os.path.dirname(REPO_ROOT_DIR), "BFWS-public")
+LOG = "run.log"
+PLAN_FILE = "sas_plan"
+
+# The configuration of the sysu-planner (see the Singularity file).
+SYSU_PLANNER_SEED = 37
+SYSU_PLANNER_SEARCH_OPTIONS = [
+    "--heuristic",
+    "hcff=cff(seed=%d, cache_estimates=false, cost_type=ONE)" %
+    SYSU_PLANNER_SEED,
+    "--heuristic", "hn=novelty(cache_estimates=false)",
+    "--search",
+    "ehc_cn(seed=%d, h=hcff, novelty=hn, learning_stagnation=PROCEED, "
+    "learning_stagnation=1, preferred=hcff, cost_type=ONE, "
+    "max_growth=infinity)" % SYSU_PLANNER_SEED]
+
+_PLAN_COST_REGEX = re.compile(r"; cost = (\d+) ")
+
+
+def load_benchmark(manifest, name=None):
+    """Return the benchmark dict defined in the manifest file. Without a
+    name, the manifest must define exactly one dict of benchmarks."""
+    attributes = {}
+    with open(manifest) as manifest_file:
+        content = manifest_file.read()
+    # Manifests like domains.py list the files of their directory.
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(os.path.abspath(manifest)))
+    try:
+        exec(content, attributes)
+    finally:
+        os.chdir(cwd)
+    benchmarks = dict(
+        (key, value) for key, value in attributes.items()
+        if isinstance(value, dict) and not key.startswith("__"))
+    if name is None:
+        if len(benchmarks) != 1:
+            raise ValueError(
+                "%s defines the benchmarks %s, select one with --benchmark" %
+                (manifest, ", ".join(sorted(benchmarks))))
+        name, = benchmarks
+    if name not in benchmarks:
+        raise ValueError("%s does not define the benchmark %s" %
+                         (manifest, name))
+    return benchmarks[name]
+
+
+def get_instances(benchmark, domains=None):
+    """Return the (domain name, domain file, problem file) triples of the
+    benchmark, restricted to the given domain names."""
+    if domains is None:
+        domains = sorted(benchmark)
+    instances = []
+    for domain in domains:
+        if domain not in benchmark:
+            raise ValueError("unknown domain: %s" % domain)
+        for domain_file, problem_file in benchmark[domain]:
+            instances.append((domain, domain_file, problem_file))
+    return instances
+
+
+def get_driver_args(domain_file, problem_file, build, alias=None):
+    args = ["--build", build, "--plan-file", PLAN_FILE]
+    if alias is None:
+        # --dual takes an optional value, so it must not come right
+        # before the input files.
+        return ["--dual"] + args + [
+            domain_file, problem_file,
+            "--search-options"] + SYSU_PLANNER_SEARCH_OPTIONS
+    return args + ["--alias", alias, domain_file, problem_file]
+
+
+def get_plan_info(plan_file):
+    """Return the number of actions of the plan and its cost, or None for
+    the cost if the plan does not state it (like the plans of 1-BFWS)."""
+    length = 0
+    cost = None
+    with open(plan_file) as plan:
+        for line in plan:
+            if line.startswith("("):
+                length += 1
+            else:
+                match = _PLAN_COST_REGEX.match(line)
+                if match:
+                    cost = int(match.group(1))
+    return length, cost
+
+
+def get_phase(log):
+    """Return the phase in which the sysu-planner ended according to the
+    log of the driver, or None if it did not run the two phases."""
+    phase = None
+    with open(log) as log_file:
+        for line in log_file:
+            if line.startswith("Plan found by 1-BFWS."):
+                phase = "1-BFWS"
+            elif line.startswith("Plan not found by 1-BFWS"):
+                phase = "Forward-RHC"
+    return phase
+
+
+def _read_finished_runs(results):
+    finished = set()
+    if os.path.exists(results):
+        with open(results) as results_file:
+            for line in results_file:
+                result = json.loads(line)
+                finished.add((result["domain"], result["problem"]))
+    return finished
+
+
+def _start_run(cmd, run_dir, env, time_limit, memory_limit):
+    def prepare_child():
+        # A new process group, so that all planner components of a run
+        # can be killed together.
+        os.setpgid(0, 0)
+        limits.set_time_limit(time_limit)
+        limits.set_memory_limit(memory_limit)
+
+    with open(os.devnull) as devnull:
+        with open(os.path.join(run_dir, LOG), "w") as log:
+            return subprocess.Popen(
+                cmd, cwd=run_dir, env=env, stdin=devnull, stdout=log,
+                stderr=subprocess.STDOUT, preexec_fn=prepare_child)
+
+
+class _Run(object):
+    def __init__(self, domain, problem, run_dir, process, wall_time_limit):
+        self.domain = domain
+        self.problem = problem
+        self.run_dir = run_dir
+        self.process = process
+        self.start_time = time.time()
+        self.wall_time_limit = wall_time_limit
+        self.killed = False
+
+    def get_result(self, status, rusage):
+        wall_time = time.time() - self.start_time
+        plans = list(PlanManager(
+            os.path.join(self.run_dir, PLAN_FILE)).get_existing_plans())
+        plan_length, plan_cost = None, None
+        if plans:
+            plan_length, plan_cost = get_plan_info(plans[-1])
+        log = os.path.join(self.run_dir, LOG)
+        return {
+            "domain": self.domain,
+            "problem": self.problem,
+            "run_dir": self.run_dir,
+            "exitcode": call.get_returncode(status),
+            "killed": self.killed,
+            "wall_time": wall_time,
+            "cpu_time": rusage.ru_utime + rusage.ru_stime,
+            # ru_maxrss is in KB on Linux.
+            "peak_rss_kb": rusage.ru_maxrss,
+            "plan_found": bool(plans),
+            "plan_length": plan_length,
+            "plan_cost": plan_cost,
+            "phase": get_phase(log) if os.path.exists(log) else None,
+        }
+
+
+class Experiment(object):
+    def __init__(self, instances, args):
+        self.pending = list(instances)
+        self.args = args
+        # Maps the pids of the drivers to their runs.
+        self.running = {}
+        self.env = dict(os.environ)
+        self.env.setdefault("BFWS_REPO", DEFAULT_BFWS_REPO)
+
+    def _start(self, domain, domain_file, problem_file):
+        args = self.args
+        domain_dir = os.path.join(args.benchmarks_dir, domain)
+        run_dir = os.path.join(
+            args.run_dir, domain, os.path.splitext(problem_file)[0])
+        if not os.path.isdir(run_dir):
+            os.makedirs(run_dir)
+        cmd = [sys.executable, DRIVER] + get_driver_args(
+            os.path.join(domain_dir, domain_file),
+            os.path.join(domain_dir, problem_file), args.build, args.alias)
+        process = _start_run(
+            cmd, run_dir, self.env, args.run_time_limit,
+            args.run_memory_limit)
+        self.running[process.pid] = _Run(
+            domain, problem_file, run_dir, process, args.wall_time_limit)
+
+    def _kill(self, run):
+        try:
+            os.killpg(run.process.pid, signal.SIGKILL)
+        except OSError as err:
+            if err.errno != errno.ESRCH:
+                raise
+
+    def _reap(self, results_file):
+        while self.running:
+            pid, status, rusage = os.wait4(-1, os.WNOHANG)
+            if not pid:
+                break
+            run = self.running.pop(pid)
+            # Tell subprocess that we have waited for the process.
+            run.process.returncode = call.get_returncode(status)
+            # Components that the driver left behind must not keep
+            # running alongside the next runs.
+            self._kill(run)
+            result = run.get_result(status, rusage)
+            results_file.write(json.dumps(result, sort_keys=True) + "\n")
+            results_file.flush()
+            print("%s %s: exit code %d, %.2fs" % (
+                result["domain"], result["problem"], result["exitcode"],
+                result["wall_time"]))
+            sys.stdout.flush()
+
+    def _kill_overdue_runs(self):
+        now = time.time()
+        for run in self.running.values():
+            if (run.wall_time_limit is not None and not run.killed and
+                    now - run.start_time > run.wall_time_limit):
+                run.killed = True
+                self._kill(run)
+
+    def run(self, results_file):
+        try:
+            while self.pending or self.running:
+                while self.pending and len(self.running) < self.args.jobs:
+                    self._start(*self.pending.pop(0))
+                time.sleep(POLL_INTERVAL)
+                self._kill_overdue_runs()
+                self._reap(results_file)
+        finally:
+            for run in self.running.values():
+                self._kill(run)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "manifest", help="Python file defining the benchmark")
+    parser.add_argument(
+        "--results", metavar="FILE", required=True,
+        help="append the results to FILE as JSON lines")
+    parser.add_argument(
+        "--benchmark", metavar="NAME",
+        help="name of the benchmark dict in the manifest, e.g. benchmark_11")
+    parser.add_argument(
+        "--benchmarks-dir", metavar="DIR",
+        help="directory holding the domain directories (default: the "
+        "directory of the manifest)")
+    parser.add_argument(
+        "--domains", metavar="DOMAIN", nargs="+",
+        help="run only the instances of these domains")
+    parser.add_argument(
+        "--run-dir", metavar="DIR", default="runs",
+        help="directory holding the directories of the runs "
+        "(default: %(default)s)")
+    parser.add_argument(
+        "--jobs", metavar="N", type=int, default=1,
+        help="run up to N instances at the same time (default: %(default)s)")
+    parser.add_argument(
+        "--build", default="release64",
+        help="build of the planner (default: %(default)s)")
+    parser.add_argument(
+        "--alias",
+        help="run a configuration of the driver instead of the "
+        "sysu-planner, e.g. lama-first")
+    parser.add_argument(
+        "--time-limit", dest="run_time_limit", default="30m",
+        help="CPU time limit of a run (default: %(default)s)")
+    parser.add_argument(
+        "--memory-limit", dest="run_memory_limit", default="4G",
+        help="memory limit of every process of a run (default: %(default)s)")
+    parser.add_argument(
+        "--wall-time-limit",
+        help="wall-clock limit of a run (default: twice the time limit)")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="skip the instances that already have a result in the "
+        "results file")
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    for limit in ["run", "wall"]:
+        limits.set_time_limit_in_seconds(parser, args, limit)
+    limits.set_memory_limit_in_bytes(parser, args, "run")
+    if args.wall_time_limit is None:
+        args.wall_time_limit = 2 * args.run_time_limit
+    if args.benchmarks_dir is None:
+        args.benchmarks_dir = os.path.dirname(os.path.abspath(args.manifest))
+    # The drivers run in their own directories.
+    args.benchmarks_dir = os.path.abspath(args.benchmarks_dir)
+    args.run_dir = os.path.abspath(args.run_dir)
+    if os.path.exists(args.build):
+        args.build = os.path.abspath(args.build)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not limits.can_set_limits():
+        sys.exit(limits.RESOURCE_MODULE_MISSING_MSG)
+    try:
+        benchmark = load_benchmark(args.manifest, args.benchmark)
+        instances = get_instances(benchmark, args.domains)
+    except (IOError, ValueError) as err:
+        sys.exit("Error: %s" % err)
+    if args.resume:
+        finished = _read_finished_runs(args.results)
+        instances = [
+            (domain, domain_file, problem_file)
+            for domain, domain_file, problem_file in instances
+            if (domain, problem_file) not in finished]
+    print("%d instances, %d jobs" % (len(instances), args.jobs))
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    with open(args.results, "a") as results_file:
+        try:
+            Experiment(instances, args).run(results_file)
+        except KeyboardInterrupt:
+            sys.exit("Interrupted, killed the running instances.")
+
+
+if __name__ == "__main__":
+    main()
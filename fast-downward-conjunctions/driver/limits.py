@@ -5,6 +5,7 @@ from __future__ import division, print_function
 from . import util
 
 import math
+import os
 import re
 try:
     import resource
@@ -62,6 +63,50 @@ def set_time_limit(time_limit):
     _set_limit(resource.RLIMIT_CPU, soft_limit, hard_limit)
 
 
+def get_cpu_time(pid):
+    """Return the CPU time in seconds used so far by the running process
+    pid, or None if it cannot be determined (only Linux provides it)."""
+    try:
+        with open("/proc/%d/stat" % pid) as stat_file:
+            stat = stat_file.read()
+        # The fields after the command name, which is put in parentheses
+        # and may contain spaces, start with the state (field 3). The user
+        # and system times are fields 14 and 15.
+        fields = stat[stat.rindex(")") + 2:].split()
+        ticks = int(fields[11]) + int(fields[12])
+        return ticks / os.sysconf("SC_CLK_TCK")
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+
+def can_lower_time_limits():
+    """Return True if lower_time_limit can change the limits of other
+    processes."""
+    return getattr(resource, "prlimit", None) is not None
+
+
+def lower_time_limit(pid, time_limit):
+    """Lower the CPU time limit of the running process pid to time_limit
+    seconds. Limits are never raised. This needs resource.prlimit
+    (Python 3.4 or newer on Linux) and does nothing without it."""
+    prlimit = getattr(resource, "prlimit", None)
+    if prlimit is None:
+        return
+    new_soft = int(math.ceil(time_limit))
+    try:
+        soft, hard = prlimit(pid, resource.RLIMIT_CPU)
+        if soft != resource.RLIM_INFINITY and soft <= new_soft:
+            return
+        new_hard = new_soft + 1
+        if hard != resource.RLIM_INFINITY:
+            new_soft = min(new_soft, hard)
+            new_hard = min(new_hard, hard)
+        prlimit(pid, resource.RLIMIT_CPU, (new_soft, new_hard))
+    except (OSError, ValueError):
+        # The process has exited in the meantime.
+        pass
+
+
 def set_memory_limit(memory):
     """*memory* must be given in bytes or None."""
     if memory is None:
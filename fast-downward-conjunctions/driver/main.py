@@ -8,13 +8,14 @@ import sys
 from . import aliases
 from . import arguments
 from . import cleanup
+from . import profiling
 from . import run_components
 from timeit import default_timer as timer
 
 
-def main():
+def main(argv=None):
     start = timer()
-    args = arguments.parse_args()
+    args = arguments.parse_args(argv)
     logging.basicConfig(level=getattr(logging, args.log_level.upper()),
                         format="%(levelname)-8s %(message)s",
                         stream=sys.stdout)
@@ -28,35 +29,48 @@ def main():
         cleanup.cleanup_temporary_files(args)
         sys.exit()
 
+    profile = profiling.Profile(args.profile)
+
     # If validation succeeds, exit with the search component's exitcode.
     exitcode = None
     plan_found, validated = False, False
+    # In dual mode, 1-BFWS runs the preprocessor on the task it grounded.
+    preprocessed_by_bfws = args.dual and "translate" in args.components
+
+    components = args.components
+    if run_components.can_pipe_components(args):
+        components = ["pipeline"] + components[3:]
 
-    for component in args.components:
+    for component in components:
         try:
-            if component == "translate":
-                if args.dual:
-                    dual_first_found = run_components.run_1_bfws(args)
-                    if dual_first_found:
-                        print("Plan found by 1-BFWS.")
-                        plan_found = True
+            with profile.component(component) as component_profile:
+                if component == "pipeline":
+                    exitcode = run_components.run_pipeline(
+                        args, component_profile)
+                elif component == "translate":
+                    if args.dual:
+                        dual_first_found = run_components.run_1_bfws(
+                            args, component_profile)
+                        if dual_first_found:
+                            print("Plan found by 1-BFWS.")
+                            plan_found = True
+                        else:
+                            print("Plan not found by 1-BFWS, entering second phase")
                     else:
-                        print("Plan not found by 1-BFWS, entering second phase")
+                        run_components.run_translate(args, component_profile)
+                elif component == "preprocess":
+                    if not plan_found and not preprocessed_by_bfws:
+                        run_components.run_preprocess(args)
+                elif component == "search":
+                    if not plan_found:
+                        exitcode = run_components.run_search(args)
+                elif component == "validate":
+                    end = timer()
+                    print("TOTAL TIME:", end - start, 's')
+                    validated = True
+                    run_components.run_validate(args)
                 else:
-                    run_components.run_translate(args)
-            elif component == "preprocess":
-                if not plan_found:
-                    run_components.run_preprocess(args)
-            elif component == "search":
-                if not plan_found:
-                    exitcode = run_components.run_search(args)
-            elif component == "validate":
-                end = timer()
-                print("TOTAL TIME:", end - start, 's')
-                validated = True
-                run_components.run_validate(args)
-            else:
-                assert False
+                    assert False
         except subprocess.CalledProcessError as err:
             print(err)
             exitcode = err.returncode
@@ -64,6 +78,7 @@ def main():
     if not validated:
         end = timer()
         print("TOTAL TIME:", end - start, 's')
+    profile.write(exitcode)
     sys.exit(exitcode)
 
 
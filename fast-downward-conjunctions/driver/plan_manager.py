@@ -91,6 +91,32 @@ class PlanManager(object):
                         bogus_plan("plan quality has not improved")
                 self._plan_costs.append(cost)
 
+    def merge_plan(self, plan_filename):
+        """Merge a plan written by a search run with a plan prefix of its
+        own (see portfolio_runner.ParallelPortfolio).
+
+        A plan that is cheaper than all plans found so far becomes the
+        next plan of this plan manager, other plans are deleted. Return
+        False and leave the file alone if the plan is incomplete.
+        """
+        cost, problem_type = _parse_plan(plan_filename)
+        if cost is None:
+            return False
+        if self._problem_type is None:
+            self._problem_type = problem_type
+        elif self._problem_type != problem_type:
+            raise RuntimeError(
+                "%s: problem type has changed" % plan_filename)
+        if self._plan_costs and cost >= self._plan_costs[-1]:
+            print("plan manager: discarded plan with cost %d" % cost)
+            os.remove(plan_filename)
+        else:
+            print("plan manager: found new plan with cost %d" % cost)
+            self._plan_costs.append(cost)
+            os.rename(plan_filename,
+                      self._get_plan_file(self.get_plan_counter()))
+        return True
+
     def get_existing_plans(self):
         """Yield all plans that match the given plan prefix."""
         if os.path.exists(self._plan_prefix):
@@ -15,6 +15,18 @@ amount of memory that the Python process needs. On maia for example
 this amounts to 128MB of reserved virtual memory. We can make Python
 reserve less space by lowering the soft limit for virtual memory before
 the process is started.
+
+Parallel portfolios: With jobs > 1, up to *jobs* configurations run at
+the same time. The memory limit is divided evenly among them, and each
+configuration gets the share of the remaining time it would get if the
+configurations were run one after another on *jobs* processors. Since
+the configurations use the processors at the same time, the time they
+take is measured in wall-clock time instead of CPU time. Every run
+writes its plans to a plan prefix of its own. The plans are merged into
+the plans of the plan manager while the runs are going on. Satisficing
+configurations get the bound of the best plan found when they are
+started, so the bound of a still running configuration only tightens
+when it is started again in the next round.
 """
 
 __all__ = ["run"]
@@ -22,6 +34,7 @@ __all__ = ["run"]
 import os
 import subprocess
 import sys
+import time
 import traceback
 
 from . import call
@@ -31,6 +44,9 @@ from . import util
 
 
 DEFAULT_TIMEOUT = 1800
+# Seconds between two checks for finished runs and new plans of a
+# parallel portfolio.
+POLL_INTERVAL = 0.1
 
 
 def adapt_args(args, search_cost_type, heuristic_cost_type, plan_manager):
@@ -76,16 +92,21 @@ def run_search(executable, args, sas_file, plan_manager, time, memory):
     return exitcode
 
 
-def compute_run_time(timeout, configs, pos):
-    remaining_time = timeout - util.get_elapsed_time()
+def compute_run_time(timeout, configs, pos, jobs=1,
+                     get_elapsed_time=util.get_elapsed_time):
+    remaining_time = timeout - get_elapsed_time()
     print("remaining time: {}".format(remaining_time))
     relative_time = configs[pos][0]
     remaining_relative_time = sum(config[0] for config in configs[pos:])
     print("config {}: relative time {}, remaining {}".format(
           pos, relative_time, remaining_relative_time))
     # For the last config we have relative_time == remaining_relative_time, so
-    # we use all of the remaining time at the end.
-    return remaining_time * relative_time / remaining_relative_time
+    # we use all of the remaining time at the end. The remaining configs
+    # share min(jobs, number of remaining configs) processors.
+    processors = min(jobs, len(configs) - pos)
+    return min(remaining_time,
+               remaining_time * processors * relative_time /
+               remaining_relative_time)
 
 
 def run_sat_config(configs, pos, search_cost_type, heuristic_cost_type,
@@ -173,6 +194,209 @@ def run_opt(configs, executable, sas_file, plan_manager, timeout, memory):
             break
 
 
+class _Job(object):
+    def __init__(self, pos, config, process, plan_prefix):
+        self.pos = pos
+        self.config = config
+        self.process = process
+        self.plan_prefix = plan_prefix
+        self.next_plan_number = 1
+
+
+class ParallelPortfolio(object):
+    """Run up to *jobs* search configurations at the same time. Each run
+    writes its plans to its own plan prefix. In anytime mode, the runs
+    write numbered plans, which are merged into the plans of the plan
+    manager as they appear (see PlanManager.merge_plan)."""
+    def __init__(self, executable, sas_file, plan_manager, jobs, memory,
+                 anytime):
+        self.executable = executable
+        self.sas_file = sas_file
+        self.plan_manager = plan_manager
+        self.jobs = jobs
+        if memory is not None:
+            memory //= jobs
+        self.memory = memory
+        self.anytime = anytime
+        self.running = []
+        self.num_started = 0
+        self.start_elapsed_time = util.get_elapsed_time()
+        self.start_wall_clock_time = time.time()
+
+    def get_elapsed_time(self):
+        """Return the elapsed time in the sense of util.get_elapsed_time,
+        counting the time since the portfolio started in wall-clock time."""
+        return (self.start_elapsed_time +
+                time.time() - self.start_wall_clock_time)
+
+    def has_free_slot(self):
+        return len(self.running) < self.jobs
+
+    def start(self, pos, config, args, run_time):
+        self.num_started += 1
+        plan_prefix = "%s.job%d" % (
+            self.plan_manager.get_plan_prefix(), self.num_started)
+        if self.anytime:
+            args = args + ["--internal-previous-portfolio-plans", "0"]
+        complete_args = [self.executable] + args + [
+            "--internal-plan-file", plan_prefix]
+        print("job %d: config %d, args: %s" % (
+            self.num_started, pos, complete_args))
+        process = call.start_call(
+            complete_args, stdin=self.sas_file,
+            time_limit=run_time, memory_limit=self.memory)
+        self.running.append(_Job(pos, config, process, plan_prefix))
+
+    def wait(self):
+        """Wait until one of the running jobs finishes and return it."""
+        assert self.running
+        while True:
+            for job in self.running:
+                finished = job.process.poll() is not None
+                if self.anytime:
+                    self._merge_plans(job, finished)
+                if finished:
+                    self.running.remove(job)
+                    print("job exitcode: %d" % job.process.returncode)
+                    print()
+                    return job
+            time.sleep(POLL_INTERVAL)
+
+    def stop(self):
+        """Terminate all running jobs. In anytime mode, merge their
+        complete plans, otherwise delete their plans."""
+        for job in self.running:
+            job.process.terminate()
+            job.process.wait()
+            if self.anytime:
+                self._merge_plans(job, finished=True)
+            elif os.path.exists(job.plan_prefix):
+                os.remove(job.plan_prefix)
+        self.running = []
+
+    def claim_plan(self, job):
+        """Make the plan of a finished non-anytime job the plan of the
+        plan manager."""
+        os.rename(job.plan_prefix, self.plan_manager.get_plan_prefix())
+
+    def _merge_plans(self, job, finished):
+        while True:
+            plan_filename = "%s.%d" % (job.plan_prefix, job.next_plan_number)
+            if not os.path.exists(plan_filename):
+                break
+            if not self.plan_manager.merge_plan(plan_filename):
+                # The plan is still being written or the run was cut off.
+                if finished:
+                    print("%s is incomplete. Deleted the file." %
+                          plan_filename)
+                    os.remove(plan_filename)
+                break
+            job.next_plan_number += 1
+
+
+def start_sat_config(portfolio, configs, pos, search_cost_type,
+                     heuristic_cost_type, plan_manager, timeout):
+    run_time = compute_run_time(
+        timeout, configs, pos, portfolio.jobs, portfolio.get_elapsed_time)
+    if run_time <= 0:
+        return False
+    _, args_template = configs[pos]
+    args = list(args_template)
+    adapt_args(args, search_cost_type, heuristic_cost_type, plan_manager)
+    portfolio.start(pos, configs[pos], args, run_time)
+    return True
+
+
+def run_sat_parallel(configs, executable, sas_file, plan_manager, final_config,
+                     final_config_builder, timeout, memory, jobs):
+    heuristic_cost_type = "one"
+    search_cost_type = "one"
+    changed_cost_types = False
+    portfolio = ParallelPortfolio(
+        executable, sas_file, plan_manager, jobs, memory, anytime=True)
+    try:
+        while configs:
+            configs_next_round = []
+            pending = list(range(len(configs)))
+            while pending or portfolio.running:
+                while pending and portfolio.has_free_slot():
+                    pos = pending.pop(0)
+                    if not start_sat_config(
+                            portfolio, configs, pos, search_cost_type,
+                            heuristic_cost_type, plan_manager, timeout):
+                        pending = []
+                if not portfolio.running:
+                    break
+                job = portfolio.wait()
+                exitcode = job.process.returncode
+                yield exitcode
+                if exitcode == returncodes.EXIT_UNSOLVABLE:
+                    return
+
+                if exitcode == returncodes.EXIT_PLAN_FOUND:
+                    if job.config not in configs_next_round:
+                        configs_next_round.append(job.config)
+                    _, args = job.config
+                    if (not changed_cost_types and
+                            can_change_cost_type(args) and
+                            plan_manager.get_problem_type() == "general cost"):
+                        print("Switch to real costs and repeat last run.")
+                        changed_cost_types = True
+                        search_cost_type = "normal"
+                        heuristic_cost_type = "plusone"
+                        pending.insert(0, job.pos)
+                    if final_config_builder:
+                        print("Build final config.")
+                        final_config = final_config_builder(args)
+                        break
+
+            if final_config:
+                break
+
+            # Only run the successful configs in the next round.
+            configs = configs_next_round
+
+        if final_config:
+            print("Abort portfolio and run final config.")
+            # The final config runs alone, with all of the memory. Its run
+            # time is measured in CPU time again, so we convert the timeout.
+            portfolio.stop()
+            timeout += util.get_elapsed_time() - portfolio.get_elapsed_time()
+            exitcode = run_sat_config(
+                [(1, final_config)], 0, search_cost_type,
+                heuristic_cost_type, executable, sas_file, plan_manager,
+                timeout, memory)
+            if exitcode is not None:
+                yield exitcode
+    finally:
+        portfolio.stop()
+
+
+def run_opt_parallel(configs, executable, sas_file, plan_manager, timeout,
+                     memory, jobs):
+    portfolio = ParallelPortfolio(
+        executable, sas_file, plan_manager, jobs, memory, anytime=False)
+    try:
+        pending = list(range(len(configs)))
+        while pending or portfolio.running:
+            while pending and portfolio.has_free_slot():
+                pos = pending.pop(0)
+                run_time = compute_run_time(
+                    timeout, configs, pos, jobs, portfolio.get_elapsed_time)
+                portfolio.start(pos, configs[pos], list(configs[pos][1]),
+                                run_time)
+            job = portfolio.wait()
+            exitcode = job.process.returncode
+            yield exitcode
+            if exitcode == returncodes.EXIT_PLAN_FOUND:
+                portfolio.claim_plan(job)
+            if exitcode in [returncodes.EXIT_PLAN_FOUND,
+                            returncodes.EXIT_UNSOLVABLE]:
+                break
+    finally:
+        portfolio.stop()
+
+
 def can_change_cost_type(args):
     return any("S_COST_TYPE" in part or "H_COST_TYPE" in part for part in args)
 
@@ -196,12 +420,14 @@ def get_portfolio_attributes(portfolio):
     return attributes
 
 
-def run(portfolio, executable, sas_file, plan_manager, time, memory):
+def run(portfolio, executable, sas_file, plan_manager, time, memory,
+        jobs=1):
     """
     Run the configs in the given portfolio file.
 
     The portfolio is allowed to run for at most *time* seconds and may
-    use a maximum of *memory* bytes.
+    use a maximum of *memory* bytes. With jobs > 1, up to *jobs* configs
+    run in parallel.
     """
     attributes = get_portfolio_attributes(portfolio)
     configs = attributes["CONFIGS"]
@@ -223,7 +449,15 @@ def run(portfolio, executable, sas_file, plan_manager, time, memory):
 
     timeout = util.get_elapsed_time() + time
 
-    if optimal:
+    if jobs > 1 and optimal:
+        exitcodes = run_opt_parallel(
+            configs, executable, sas_file, plan_manager, timeout, memory,
+            jobs)
+    elif jobs > 1:
+        exitcodes = run_sat_parallel(
+            configs, executable, sas_file, plan_manager, final_config,
+            final_config_builder, timeout, memory, jobs)
+    elif optimal:
         exitcodes = run_opt(
             configs, executable, sas_file, plan_manager, timeout, memory)
     else:
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""Collect per-component profiles for the --profile driver option.
+
+Every component run by the driver is timed here. Components implemented
+in Python (the translator and 1-BFWS) additionally write the phases they
+measured to a temporary JSON file, which is merged into the profile of
+the component that started them."""
+
+from __future__ import print_function
+
+import contextlib
+import json
+import logging
+import os
+import tempfile
+from timeit import default_timer as timer
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def _get_children_cpu_time():
+    times = os.times()
+    return times[2] + times[3]
+
+
+def _get_children_peak_rss_in_kb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux. It is the maximum over all waited-for
+    # children, so it only grows from one component to the next.
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+def _read_phase_file(filename):
+    try:
+        with open(filename) as phase_file:
+            return json.load(phase_file)
+    except (IOError, ValueError):
+        # The process was killed before it could write its profile.
+        return None
+    finally:
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+
+class ComponentProfile(object):
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = None
+        self.cpu_time = None
+        self.children_peak_rss_kb = None
+        self.processes = []
+        self._phase_files = []
+
+    def new_phase_file(self, process):
+        """Return the name of a fresh file to which the given process
+        should write its phases."""
+        handle, filename = tempfile.mkstemp(
+            prefix="%s-" % process, suffix=".json")
+        os.close(handle)
+        self._phase_files.append((process, filename))
+        return filename
+
+    def collect_phase_files(self):
+        for process, filename in self._phase_files:
+            phases = _read_phase_file(filename)
+            if phases is None:
+                phases = {"component": process}
+            self.processes.append(phases)
+        self._phase_files = []
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "children_peak_rss_kb": self.children_peak_rss_kb,
+            "processes": self.processes,
+        }
+
+
+class Profile(object):
+    """Profile of a driver run. If filename is None, profiling is
+    disabled and component() yields None."""
+    def __init__(self, filename):
+        self.filename = filename
+        self.start = timer()
+        self.components = []
+
+    @contextlib.contextmanager
+    def component(self, name):
+        if self.filename is None:
+            yield None
+            return
+        component = ComponentProfile(name)
+        start_wall = timer()
+        start_cpu = _get_children_cpu_time()
+        try:
+            yield component
+        finally:
+            component.wall_time = timer() - start_wall
+            component.cpu_time = _get_children_cpu_time() - start_cpu
+            component.children_peak_rss_kb = _get_children_peak_rss_in_kb()
+            component.collect_phase_files()
+            self.components.append(component)
+
+    def write(self, exitcode):
+        if self.filename is None:
+            return
+        profile = {
+            "total_wall_time": timer() - self.start,
+            "exitcode": exitcode,
+            "components": [
+                component.to_dict() for component in self.components],
+        }
+        with open(self.filename, "w") as profile_file:
+            json.dump(profile, profile_file, indent=2, sort_keys=True)
+        logging.info("profile written to %s" % self.filename)
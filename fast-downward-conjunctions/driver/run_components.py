@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 
 import errno
+import importlib
 import logging
 import os.path
+import signal
 import subprocess
 import sys
+import time
 
 from . import call
 from . import limits
@@ -14,6 +17,8 @@ from . import util
 from .plan_manager import PlanManager
 
 VALIDATE_MEMORY_LIMIT_IN_MB = 3072
+MIN_POLL_INTERVAL = 0.005
+POLL_INTERVAL = 0.1
 #TODO: We might want to turn translate into a module and call it with "python -m translate".
 REL_TRANSLATE_PATH = os.path.join("translate", "translate.py")
 if os.name == "posix":
@@ -82,10 +87,32 @@ def call_component(executable, options, stdin=None,
         [executable] + options,
         stdin=stdin, time_limit=time_limit, memory_limit=memory_limit)
 
-def run_1_bfws(args):
+def _get_bfws_time_limit(args):
+    """
+    Return the time limit for the 1-BFWS phase: the minimum of its own
+    limit and the configured share of the remaining overall time.
+    """
+    time_limit = limits.get_time_limit(
+        args.bfws_time_limit, args.overall_time_limit)
+    if args.bfws_time_fraction is not None:
+        remaining_time = limits.get_time_limit(None, args.overall_time_limit)
+        if remaining_time is not None:
+            share = args.bfws_time_fraction * remaining_time
+            if time_limit is None or share < time_limit:
+                time_limit = share
+    return time_limit
+
+# Exit codes of bfws.py that mean it ran out of time or memory: SIGXCPU
+# at the soft CPU limit, SIGKILL at the hard limit, and the exit code of
+# the planner components for running out of memory.
+BFWS_LIMIT_EXITCODES = set([
+    returncodes.EXIT_SIGXCPU, -signal.SIGKILL, returncodes.EXIT_OUT_OF_MEMORY])
+
+def run_1_bfws(args, profile=None):
     logging.info("Running 1-bfws.")
-    ## JM hard code the time_limit & memory_limit here first.
-    time_limit, memory_limit = None, None
+    time_limit = _get_bfws_time_limit(args)
+    memory_limit = limits.get_memory_limit(
+        args.bfws_memory_limit, args.overall_memory_limit)
     print_component_settings(
         "1-bfws", args.translate_inputs, None,
         time_limit, memory_limit)
@@ -94,11 +121,40 @@ def run_1_bfws(args):
     if not BFWS_REPO:
         sys.exit("Error: BFWS_REPO not set.")
     bfws = os.path.join(BFWS_REPO, "fd-version/bfws.py")
-    bfws_options = args.translate_inputs + ["dual-1-BFWS"]
+    if args.concurrent_translate:
+        bfws_options = args.translate_inputs + ["concurrent-dual-1-BFWS"]
+    else:
+        bfws_options = args.translate_inputs + ["dual-1-BFWS"]
+    if "preprocess" in args.components:
+        # If 1-BFWS fails, bfws.py pipes the task it has already grounded
+        # straight into the preprocessor instead of writing output.sas.
+        preprocess = get_executable(args.build, REL_PREPROCESS_PATH)
+        bfws_options += [preprocess] + args.preprocess_options
+    if profile is not None:
+        bfws_options = [
+            "--profile", profile.new_phase_file("bfws")] + bfws_options
     print_callstring(bfws, bfws_options, None)
-    call.check_call(
-        [bfws] + bfws_options,
-        time_limit=time_limit, memory_limit=memory_limit)
+    try:
+        call.check_call(
+            [bfws] + bfws_options,
+            time_limit=time_limit, memory_limit=memory_limit)
+    except subprocess.CalledProcessError as err:
+        if err.returncode not in BFWS_LIMIT_EXITCODES:
+            logging.error("1-bfws failed with exit code %d." % err.returncode)
+            raise
+        # 1-BFWS ran out of its budget before handing over a task, so run
+        # the second phase from scratch with what is left. bfws.py takes
+        # its SAS worker and preprocessor down with it (see
+        # grounding.dieWithParent), so they cannot overwrite the files
+        # written below.
+        logging.info("1-bfws exceeded its limits (exit code %d), running "
+                     "the translator for the second phase." % err.returncode)
+        if os.path.exists('plan.ipc'):
+            os.remove('plan.ipc')
+        run_translate(args, profile)
+        if "preprocess" in args.components:
+            run_preprocess(args)
+        return False
     if os.path.getsize('plan.ipc') == 0:
         os.remove('plan.ipc')
         return False
@@ -106,7 +162,51 @@ def run_1_bfws(args):
         os.rename('plan.ipc', 'sas_plan')
         return True
 
-def run_translate(args):
+def _has_option(options, name):
+    return any(option == name or option.startswith(name + "=")
+               for option in options)
+
+# Set by preload_translator: the path of translate.py and the imported
+# translate module.
+_preloaded_translator = None
+
+def preload_translator(build):
+    """
+    Import the translator of the given build into this process. Afterwards,
+    run_translate runs it in a forked child of this process instead of
+    starting a new interpreter that imports all translator modules again.
+    This only pays off for processes that run many tasks, like the worker
+    (see worker.py).
+    """
+    global _preloaded_translator
+    translate = get_executable(build, REL_TRANSLATE_PATH)
+    sys.path.insert(0, os.path.dirname(translate))
+    _preloaded_translator = (translate, importlib.import_module("translate"))
+
+def _call_preloaded_translator(options, time_limit, memory_limit):
+    translate, translate_module = _preloaded_translator
+    print_callstring(sys.executable, [translate] + options, None)
+    call.check_fork(
+        [sys.executable, translate] + options,
+        lambda: translate_module.main(options),
+        time_limit=time_limit, memory_limit=memory_limit)
+
+def _get_translate_options(args, profile):
+    translate_options = list(args.translate_options)
+    if "preprocess" in args.components and not _has_option(
+            translate_options, "--output-format"):
+        # The preprocessor reads the binary format much faster.
+        translate_options += ["--output-format", "binary"]
+    if profile is not None:
+        translate_options += [
+            "--profile", profile.new_phase_file("translate")]
+    return translate_options
+
+def _is_preloaded(translate):
+    return (_preloaded_translator is not None and
+            _preloaded_translator[0] == translate)
+
+def run_translate(args, profile=None):
     logging.info("Running translator.")
     time_limit = limits.get_time_limit(
         args.translate_time_limit, args.overall_time_limit)
@@ -116,9 +216,15 @@ def run_translate(args):
         "translator", args.translate_inputs, args.translate_options,
         time_limit, memory_limit)
     translate = get_executable(args.build, REL_TRANSLATE_PATH)
-    call_component(
-        translate, args.translate_inputs + args.translate_options,
-        time_limit=time_limit, memory_limit=memory_limit)
+    translate_options = _get_translate_options(args, profile)
+    if _is_preloaded(translate):
+        _call_preloaded_translator(
+            args.translate_inputs + translate_options,
+            time_limit, memory_limit)
+    else:
+        call_component(
+            translate, args.translate_inputs + translate_options,
+            time_limit=time_limit, memory_limit=memory_limit)
 
 
 def run_preprocess(args):
@@ -158,7 +264,7 @@ def run_search(args):
         logging.info("search portfolio: %s" % args.portfolio)
         portfolio_runner.run(
             args.portfolio, search, args.search_input, plan_manager,
-            time_limit, memory_limit)
+            time_limit, memory_limit, args.portfolio_jobs)
     else:
         if not args.search_options:
             raise ValueError(
@@ -179,6 +285,228 @@ def run_search(args):
             return 0
 
 
+def can_pipe_components(args):
+    """Return True if the translator, preprocessor and search of this run
+    can be connected by pipes (see run_pipeline). With an overall time
+    limit, this needs limits.can_lower_time_limits: otherwise the search
+    could not be kept from using the time of the earlier components."""
+    return (args.components[:3] == ["translate", "preprocess", "search"] and
+            not args.keep_intermediate and not args.dual and
+            bool(args.translate_inputs) and
+            "--help" not in args.preprocess_options and
+            "--help" not in args.search_options and
+            (args.overall_time_limit is None or
+             limits.can_lower_time_limits()))
+
+
+def _start_component(executable, options, stdin=None, stdin_name=None,
+                     time_limit=None, memory_limit=None, pass_fds=()):
+    if executable.endswith(".py"):
+        options = [executable] + options
+        executable = sys.executable
+        assert executable, "Path to interpreter could not be found"
+    print_callstring(executable, options, stdin_name)
+    process = call.start_call(
+        [executable] + options, stdin=stdin,
+        time_limit=time_limit, memory_limit=memory_limit, pass_fds=pass_fds)
+    return process, [executable] + options
+
+
+def _start_preloaded_translator(options, time_limit, memory_limit,
+                                close_fds):
+    translate, translate_module = _preloaded_translator
+    print_callstring(sys.executable, [translate] + options, None)
+
+    def run():
+        # The fork inherits all pipe ends of the driver, which would keep
+        # the readers of the other pipes from seeing their end.
+        for fd in close_fds:
+            os.close(fd)
+        translate_module.main(options)
+
+    pid = call.fork_call(run, time_limit, memory_limit)
+    return call.ForkedProcess(pid), [sys.executable, translate] + options
+
+
+def _get_pipe_name(fd):
+    return "/dev/fd/%d" % fd
+
+
+def _lower_time_limits(processes, overall_time_limit):
+    """Make sure that the running processes cannot use more than what
+    is left of the overall time limit."""
+    if overall_time_limit is None:
+        return
+    cpu_times = [limits.get_cpu_time(process.pid) for process in processes]
+    if None in cpu_times:
+        return
+    remaining_time = max(
+        0, overall_time_limit - util.get_elapsed_time() - sum(cpu_times))
+    for process, cpu_time in zip(processes, cpu_times):
+        limits.lower_time_limit(process.pid, cpu_time + remaining_time)
+
+
+def _wait_for_stages(stages, overall_time_limit):
+    """Wait until all (name, process, cmd) stages have exited. As soon as
+    one fails, kill the others. Return the stage that failed first (the
+    earlier one in the pipeline if several failed at the same time) and
+    its exit code, or (None, 0)."""
+    running = list(stages)
+    failed = None
+    poll_interval = MIN_POLL_INTERVAL
+    while running:
+        finished = [stage for stage in running
+                    if stage[1].poll() is not None]
+        if not finished:
+            # Most tasks are small, so check often at first.
+            time.sleep(poll_interval)
+            poll_interval = min(2 * poll_interval, POLL_INTERVAL)
+            continue
+        poll_interval = MIN_POLL_INTERVAL
+        for stage in finished:
+            running.remove(stage)
+            if stage[1].returncode != 0 and failed is None:
+                failed = stage
+        if failed is not None:
+            for _, process, _ in running:
+                process.kill()
+        else:
+            _lower_time_limits(
+                [process for _, process, _ in running], overall_time_limit)
+    if failed is None:
+        return None, 0
+    return failed, failed[1].returncode
+
+
+def run_pipeline(args, profile=None):
+    """
+    Run the translator, preprocessor and search at the same time, with
+    the output of each one read by the next one from a pipe. Unlike
+    running them one after the other, this does not write output.sas and
+    output to disk and read them back. The components hardly overlap:
+    the translator writes the task only once it is complete, and the
+    preprocessor and search read all of their input before parsing it.
+    A portfolio reads the preprocessed task from memory instead, because
+    it runs the search several times.
+
+    The time and memory limits of all components are computed when the
+    pipeline starts. Whenever a component finishes, the time limits of the
+    running ones are lowered to what is left of the overall time limit
+    (see limits.lower_time_limit).
+    """
+    logging.info("Running translator, preprocessor and search (%s) "
+                 "connected by pipes." % args.build)
+    translate = get_executable(args.build, REL_TRANSLATE_PATH)
+    preprocess = get_executable(args.build, REL_PREPROCESS_PATH)
+    search = get_executable(args.build, REL_SEARCH_PATH)
+    if not args.portfolio and not args.search_options:
+        raise ValueError(
+            "search needs --alias, --portfolio, or search options")
+
+    plan_manager = PlanManager(args.plan_file)
+    plan_manager.delete_existing_plans()
+
+    translate_time_limit = limits.get_time_limit(
+        args.translate_time_limit, args.overall_time_limit)
+    translate_memory_limit = limits.get_memory_limit(
+        args.translate_memory_limit, args.overall_memory_limit)
+    preprocess_time_limit = limits.get_time_limit(
+        args.preprocess_time_limit, args.overall_time_limit)
+    preprocess_memory_limit = limits.get_memory_limit(
+        args.preprocess_memory_limit, args.overall_memory_limit)
+
+    sas_read, sas_write = call.make_pipe()
+    output_read, output_write = call.make_pipe()
+    pipe_fds = [sas_read, sas_write, output_read, output_write]
+    stages = []
+    try:
+        translate_options = _get_translate_options(args, profile) + [
+            "--sas-file", _get_pipe_name(sas_write)]
+        print_component_settings(
+            "translator", args.translate_inputs, translate_options,
+            translate_time_limit, translate_memory_limit)
+        if _is_preloaded(translate):
+            process, cmd = _start_preloaded_translator(
+                args.translate_inputs + translate_options,
+                translate_time_limit, translate_memory_limit,
+                [fd for fd in pipe_fds if fd != sas_write])
+        else:
+            process, cmd = _start_component(
+                translate, args.translate_inputs + translate_options,
+                time_limit=translate_time_limit,
+                memory_limit=translate_memory_limit, pass_fds=(sas_write,))
+        stages.append(("translate", process, cmd))
+
+        preprocess_options = args.preprocess_options + [
+            "--output", _get_pipe_name(output_write)]
+        print_component_settings(
+            "preprocessor", _get_pipe_name(sas_read), preprocess_options,
+            preprocess_time_limit, preprocess_memory_limit)
+        process, cmd = _start_component(
+            preprocess, preprocess_options,
+            stdin=sas_read, stdin_name=_get_pipe_name(sas_read),
+            time_limit=preprocess_time_limit,
+            memory_limit=preprocess_memory_limit,
+            pass_fds=(output_write,))
+        stages.append(("preprocess", process, cmd))
+
+        if not args.portfolio:
+            search_time_limit = limits.get_time_limit(
+                args.search_time_limit, args.overall_time_limit)
+            search_memory_limit = limits.get_memory_limit(
+                args.search_memory_limit, args.overall_memory_limit)
+            search_options = args.search_options + [
+                "--internal-plan-file", args.plan_file]
+            print_component_settings(
+                "search", _get_pipe_name(output_read), search_options,
+                search_time_limit, search_memory_limit)
+            process, cmd = _start_component(
+                search, search_options,
+                stdin=output_read, stdin_name=_get_pipe_name(output_read),
+                time_limit=search_time_limit,
+                memory_limit=search_memory_limit)
+            stages.append(("search", process, cmd))
+    except:
+        for _, process, _ in stages:
+            process.kill()
+            process.wait()
+        if args.portfolio:
+            os.close(output_read)
+        raise
+    finally:
+        # Only the components keep the pipes open, so that each one sees
+        # the end of its input when the previous one exits.
+        for fd in pipe_fds:
+            if fd != output_read or not args.portfolio:
+                os.close(fd)
+
+    if args.portfolio:
+        with os.fdopen(output_read, "rb") as output_file:
+            preprocessed_task = output_file.read()
+
+    stage, returncode = _wait_for_stages(stages, args.overall_time_limit)
+    if stage is not None:
+        name, _, cmd = stage
+        if name == "search" and returncode in returncodes.EXPECTED_EXITCODES:
+            return returncode
+        raise subprocess.CalledProcessError(returncode, cmd)
+    if not args.portfolio:
+        return 0
+
+    time_limit = limits.get_time_limit(
+        args.search_time_limit, args.overall_time_limit)
+    memory_limit = limits.get_memory_limit(
+        args.search_memory_limit, args.overall_memory_limit)
+    print_component_settings(
+        "search", "preprocessor output", args.search_options,
+        time_limit, memory_limit)
+    logging.info("search portfolio: %s" % args.portfolio)
+    portfolio_runner.run(
+        args.portfolio, search, call.InputData(preprocessed_task),
+        plan_manager, time_limit, memory_limit, args.portfolio_jobs)
+    return 0
+
+
 def run_validate(args):
     logging.info("Running validate.")
 
@@ -6,14 +6,23 @@ Test module for Fast Downward driver script. Run with
     py.test driver/tests.py
 """
 
+import argparse
 import os
+import shutil
 import subprocess
+import tempfile
 
 from .aliases import ALIASES, PORTFOLIOS
 from .arguments import EXAMPLES
+from . import call
+from .experiment import get_instances, get_plan_info, load_benchmark
 from . import limits
+from .plan_manager import PlanManager
+from .portfolio_runner import compute_run_time
 from .returncodes import EXIT_PLAN_FOUND, EXIT_UNSOLVED_INCOMPLETE
+from .run_components import can_pipe_components
 from .util import REPO_ROOT_DIR, find_domain_filename
+from .worker import Worker, _Connection, get_driver_args, parse_job
 
 
 def preprocess():
@@ -67,6 +76,136 @@ def test_time_limits():
             (expected_soft, expected_hard))
 
 
+def test_parallel_portfolio_run_times():
+    configs = [(1, []), (1, []), (2, [])]
+    for pos, jobs, expected in [
+            (0, 1, 25),
+            (0, 2, 50),
+            (0, 4, 75),
+            (2, 2, 100),
+            ]:
+        assert compute_run_time(
+            100, configs, pos, jobs, lambda: 0) == expected
+
+
+def test_merge_plans():
+    directory = tempfile.mkdtemp()
+    try:
+        plan_manager = PlanManager(os.path.join(directory, "sas_plan"))
+        job_plan = os.path.join(directory, "sas_plan.job1.1")
+        for cost in [10, 12, 8]:
+            with open(job_plan, "w") as plan_file:
+                plan_file.write("(noop)\n; cost = %d (general cost)\n" % cost)
+            assert plan_manager.merge_plan(job_plan)
+            assert not os.path.exists(job_plan)
+        with open(job_plan, "w") as plan_file:
+            plan_file.write("(noop)\n")
+        assert not plan_manager.merge_plan(job_plan)
+        assert plan_manager.get_best_plan_cost() == 8
+        assert [os.path.basename(plan) for plan in
+                plan_manager.get_existing_plans()] == [
+                    "sas_plan.1", "sas_plan.2"]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_worker_jobs():
+    job = parse_job(
+        '{"problem": "p.pddl", "domain": "d.pddl", "time_limit": 60, '
+        '"args": ["--alias", "lama-first"], "options": ["--search-options"]}')
+    assert get_driver_args(job, "release64") == [
+        "--alias", "lama-first", "--build", "release64",
+        "--overall-time-limit", "60", "d.pddl", "p.pddl",
+        "--search-options"]
+    job = parse_job('{"problem": "p.pddl", "args": ["--debug"]}')
+    assert get_driver_args(job, "release64") == ["--debug", "p.pddl"]
+    for line in ['["p.pddl"]', '{"domain": "d.pddl"}',
+                 '{"problem": "p.pddl", "args": "--debug"}']:
+        try:
+            parse_job(line)
+        except ValueError:
+            pass
+        else:
+            assert False, line
+
+
+def test_worker_rejects_invalid_lines():
+    job_read, job_write = os.pipe()
+    result_read, result_write = os.pipe()
+    try:
+        os.write(job_write, b'{"problem": "p.pddl"}\n\xff\n[]\n')
+        worker = Worker("release64", 1)
+        connection = _Connection(job_read, result_write)
+        for line in connection.read_lines():
+            worker.submit(line, connection)
+        assert [job for job, _ in worker.pending] == [{"problem": "p.pddl"}]
+        results = os.read(result_read, 4096).decode("utf-8").splitlines()
+        assert len(results) == 2
+        assert all('"id": null' in result for result in results)
+    finally:
+        for fd in [job_read, job_write, result_read, result_write]:
+            os.close(fd)
+
+
+def test_pipes():
+    # Pass the input of "cat" through a pipe given as a file name, like
+    # run_pipeline does.
+    read_fd, write_fd = call.make_pipe()
+    process = call.start_call(
+        ["sh", "-c", "cat > /dev/fd/%d" % write_fd],
+        stdin=call.InputData(b"task\n"), pass_fds=(write_fd,))
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe:
+        assert pipe.read() == b"task\n"
+    assert process.wait() == 0
+
+
+def test_can_pipe_components():
+    args = argparse.Namespace(
+        components=["translate", "preprocess", "search"],
+        keep_intermediate=False, dual=False,
+        translate_inputs=["domain.pddl", "problem.pddl"],
+        preprocess_options=[], search_options=["--search", "astar(blind())"],
+        overall_time_limit=None)
+    can_lower_time_limits = limits.can_lower_time_limits
+    limits.can_lower_time_limits = lambda: False
+    try:
+        assert can_pipe_components(args)
+        # Without prlimit the search could exceed the overall time limit.
+        args.overall_time_limit = 60
+        assert not can_pipe_components(args)
+        limits.can_lower_time_limits = lambda: True
+        assert can_pipe_components(args)
+    finally:
+        limits.can_lower_time_limits = can_lower_time_limits
+
+
+def test_experiment_manifest():
+    directory = tempfile.mkdtemp()
+    try:
+        manifest = os.path.join(directory, "domains.py")
+        with open(manifest, "w") as manifest_file:
+            manifest_file.write(
+                "benchmark_a = {'gripper': [('domain.pddl', 'p01.pddl')]}\n"
+                "benchmark_b = {}\n")
+        benchmark = load_benchmark(manifest, "benchmark_a")
+        assert get_instances(benchmark) == [
+            ("gripper", "domain.pddl", "p01.pddl")]
+        try:
+            load_benchmark(manifest)
+        except ValueError:
+            pass
+        else:
+            assert False
+        plan = os.path.join(directory, "sas_plan")
+        with open(plan, "w") as plan_file:
+            plan_file.write("(pick ball1 rooma left)\n(move rooma roomb)\n"
+                            "; cost = 2 (unit cost)\n")
+        assert get_plan_info(plan) == (2, 2)
+    finally:
+        shutil.rmtree(directory)
+
+
 def test_automatic_domain_file_name_computation():
     benchmarks_dir = os.path.join(REPO_ROOT_DIR, "benchmarks")
     for dirpath, dirnames, filenames in os.walk(benchmarks_dir):
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+
+"""
+Long-lived planner process for solving many tasks in a row. Run with
+
+    ./fast-downward-worker.py [--build BUILD] [--jobs N] [--socket PATH]
+
+Starting the driver for every task costs a new interpreter and the
+imports of the driver, and the translator pays the same again. The
+worker pays this once: it imports the driver, preloads the translator
+of BUILD (see run_components.preload_translator) and runs every job in
+a forked child of itself. The child runs the driver as if it had been
+started in the job directory, so the time and memory limits of the
+components apply as usual, and it runs the translator in a fork of
+itself instead of a new interpreter.
+
+Jobs are JSON objects, one per line, read from stdin or from the
+connections to the Unix socket PATH. For every job, the worker writes a
+line with a JSON object holding its result to stdout or to the
+connection the job came from. A job has the keys
+
+  problem       PDDL problem file (required)
+  domain        PDDL domain file (default: found like the driver does)
+  time_limit    overall time limit of the driver (e.g. 300 or "5m")
+  memory_limit  overall memory limit of the driver (e.g. "4G")
+  args          list of driver options, e.g. ["--alias", "lama-first"]
+  options       list of component options passed after the input files
+  cwd           directory the driver runs in, created if needed
+                (default: the directory of the worker)
+  log           file in cwd receiving the output of the driver
+                (default: run.log)
+  id            copied to the result
+
+File names in the job are relative to cwd. Jobs running at the same time
+(with --jobs N) need a directory of their own. The result has the keys
+id, cwd, exitcode (of the driver, negative if it was killed by a signal)
+and wall_time, or id and error if the job could not be started.
+"""
+
+from __future__ import print_function
+
+import argparse
+import errno
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import time
+
+from . import call
+from . import main as driver_main
+from . import run_components
+
+
+POLL_INTERVAL = 0.1
+READ_SIZE = 65536
+DEFAULT_LOG = "run.log"
+
+
+def get_driver_args(job, build):
+    """Return the driver command line for job. Jobs run with the build
+    of the worker unless they select one themselves."""
+    args = list(job.get("args", []))
+    if not any(arg in ["--build", "--debug"] or arg.startswith("--build=")
+               for arg in args):
+        args += ["--build", build]
+    for key, option in [("time_limit", "--overall-time-limit"),
+                        ("memory_limit", "--overall-memory-limit")]:
+        if job.get(key) is not None:
+            args += [option, str(job[key])]
+    if job.get("domain") is not None:
+        args.append(job["domain"])
+    args.append(job["problem"])
+    return args + list(job.get("options", []))
+
+
+def parse_job(line):
+    job = json.loads(line)
+    if not isinstance(job, dict):
+        raise ValueError("job must be a JSON object")
+    if "problem" not in job:
+        raise ValueError("job needs a problem")
+    for key in ["problem", "domain", "cwd", "log"]:
+        if key in job and not _is_string(job[key]):
+            raise ValueError("%s must be a string" % key)
+    for key in ["args", "options"]:
+        if not (isinstance(job.get(key, []), list) and
+                all(_is_string(arg) for arg in job.get(key, []))):
+            raise ValueError("%s must be a list of strings" % key)
+    return job
+
+
+def _is_string(value):
+    try:
+        return isinstance(value, basestring)
+    except NameError:
+        return isinstance(value, str)
+
+
+def _run_job(argv, cwd, log, inherited_fds):
+    """Run the driver for a job in the forked child of the worker."""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # The worker stops a job by signalling its process group, which
+    # also contains the processes of the planner components.
+    os.setpgid(0, 0)
+    for fd in inherited_fds:
+        os.close(fd)
+    if not os.path.isdir(cwd):
+        os.makedirs(cwd)
+    os.chdir(cwd)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    log_fd = os.open(log, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    os.dup2(log_fd, 1)
+    os.dup2(log_fd, 2)
+    os.close(log_fd)
+    driver_main.main(argv)
+
+
+class _Connection(object):
+    """A stream of jobs and the stream their results are written to."""
+    def __init__(self, infd, outfd, sock=None):
+        self.infd = infd
+        self.outfd = outfd
+        self.sock = sock
+        self.buffer = b""
+        self.eof = False
+        self.open_jobs = 0
+
+    def read_lines(self):
+        try:
+            data = os.read(self.infd, READ_SIZE)
+        except OSError as err:
+            if err.errno != errno.ECONNRESET:
+                raise
+            data = b""
+        if not data:
+            self.eof = True
+            data = b"\n"
+        lines = (self.buffer + data).split(b"\n")
+        self.buffer = lines.pop()
+        return [line for line in lines if line.strip()]
+
+    def send(self, result):
+        data = (json.dumps(result, sort_keys=True) + "\n").encode("utf-8")
+        try:
+            while data:
+                data = data[os.write(self.outfd, data):]
+        except OSError as err:
+            # Results for clients that are gone are dropped.
+            if err.errno not in [errno.EPIPE, errno.ECONNRESET]:
+                raise
+
+    def get_fds(self):
+        return set([self.infd, self.outfd])
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+
+
+class Worker(object):
+    def __init__(self, build, jobs):
+        self.build = build
+        self.jobs = jobs
+        self.listener = None
+        self.connections = []
+        self.pending = []
+        # Maps the pids of running jobs to the job, its connection, its
+        # directory and its start time.
+        self.running = {}
+
+    def submit(self, line, connection):
+        try:
+            job = parse_job(line.decode("utf-8"))
+        except ValueError as err:
+            # Also catches UnicodeDecodeError.
+            connection.send({"id": None, "error": str(err)})
+            return
+        connection.open_jobs += 1
+        self.pending.append((job, connection))
+
+    def _start(self, job, connection):
+        cwd = os.path.abspath(job.get("cwd", "."))
+        argv = get_driver_args(job, self.build)
+        inherited_fds = set()
+        for other in self.connections:
+            inherited_fds |= other.get_fds()
+        inherited_fds -= set([0, 1, 2])
+        if self.listener is not None:
+            inherited_fds.add(self.listener.fileno())
+        log = job.get("log", DEFAULT_LOG)
+        pid = call.fork_call(
+            lambda: _run_job(argv, cwd, log, sorted(inherited_fds)))
+        try:
+            os.setpgid(pid, pid)
+        except OSError:
+            # The child has set its group itself or already exited.
+            pass
+        self.running[pid] = (job, connection, cwd, time.time())
+
+    def start_pending(self):
+        while self.pending and len(self.running) < self.jobs:
+            job, connection = self.pending.pop(0)
+            self._start(job, connection)
+
+    def _finish(self, connection, result):
+        connection.send(result)
+        connection.open_jobs -= 1
+        self._close_finished_connections()
+
+    def _close_finished_connections(self):
+        for connection in list(self.connections):
+            if connection.eof and not connection.open_jobs:
+                connection.close()
+                self.connections.remove(connection)
+
+    def reap(self, block):
+        while self.running:
+            pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            if not pid:
+                break
+            block = False
+            job, connection, cwd, start_time = self.running.pop(pid)
+            self._finish(connection, {
+                "id": job.get("id"),
+                "cwd": cwd,
+                "exitcode": call.get_returncode(status),
+                "wall_time": time.time() - start_time})
+
+    def stop(self):
+        for pid in self.running:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        while self.running:
+            self.reap(block=True)
+
+    def serve(self, connection=None, listener=None):
+        """Run jobs from connection and from the connections accepted by
+        the listening socket listener until all job streams have ended
+        and all jobs have finished."""
+        self.listener = listener
+        if connection is not None:
+            self.connections.append(connection)
+        while True:
+            self.start_pending()
+            fds = [connection.infd for connection in self.connections
+                   if not connection.eof]
+            if listener is not None:
+                fds.append(listener.fileno())
+            if not fds:
+                if not self.running:
+                    break
+                self.reap(block=True)
+                continue
+            try:
+                readable, _, _ = select.select(
+                    fds, [], [], POLL_INTERVAL if self.running else None)
+            except select.error as err:
+                if err.args[0] != errno.EINTR:
+                    raise
+                readable = []
+            self.reap(block=False)
+            if listener is not None and listener.fileno() in readable:
+                sock, _ = listener.accept()
+                self.connections.append(
+                    _Connection(sock.fileno(), sock.fileno(), sock))
+            for connection in list(self.connections):
+                if connection.infd in readable and not connection.eof:
+                    for line in connection.read_lines():
+                        self.submit(line, connection)
+            self._close_finished_connections()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--build", default="release64",
+        help="build whose translator is preloaded and which jobs use "
+        "unless they select a build (default: %(default)s)")
+    parser.add_argument(
+        "--jobs", metavar="N", type=int, default=1,
+        help="run up to N jobs at the same time (default: %(default)s)")
+    parser.add_argument(
+        "--socket", metavar="PATH",
+        help="read jobs from the connections to a Unix socket created "
+        "at PATH instead of stdin, and run until terminated")
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+
+def _exit_on_signal(signum, frame):
+    sys.exit(128 + signum)
+
+
+def main():
+    args = parse_args()
+    if os.path.exists(args.build):
+        # Jobs resolve the build relative to their own directory.
+        args.build = os.path.abspath(args.build)
+    try:
+        run_components.preload_translator(args.build)
+    except IOError as err:
+        sys.exit("Error: %s" % err)
+    worker = Worker(args.build, args.jobs)
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    try:
+        if args.socket:
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(args.socket)
+            try:
+                listener.listen(socket.SOMAXCONN)
+                worker.serve(listener=listener)
+            finally:
+                listener.close()
+                os.remove(args.socket)
+        else:
+            worker.serve(_Connection(
+                sys.stdin.fileno(), sys.stdout.fileno()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+if __name__ == "__main__":
+    from driver.experiment import main
+    main()
@@ -1,3 +1,4 @@
+#include "binary_io.h"
 #include "helper_functions.h"
 #include "axiom.h"
 #include "variable.h"
@@ -24,6 +25,18 @@ Axiom::Axiom(istream &in, const vector<Variable *> &variables) {
     check_magic(in, "end_rule");
 }
 
+Axiom::Axiom(BinaryReader &in, const vector<Variable *> &variables) {
+    int count = in.read_int(); // number of conditions
+    for (int i = 0; i < count; i++) {
+        int varNo = in.read_int();
+        int val = in.read_int();
+        conditions.push_back(Condition(variables[varNo], val));
+    }
+    effect_var = variables[in.read_int()];
+    old_val = in.read_int();
+    effect_val = in.read_int();
+}
+
 bool Axiom::is_redundant() const {
     return effect_var->get_level() == -1;
 }
@@ -64,3 +77,17 @@ void Axiom::generate_cpp_input(ofstream &outfile) const {
     outfile << effect_var->get_level() << " " << old_val << " " << effect_val << endl;
     outfile << "end_rule" << endl;
 }
+
+void Axiom::generate_binary_cpp_input(BinaryWriter &out) const {
+    assert(effect_var->get_level() != -1);
+    out.write_int(conditions.size());
+    for (const Condition &condition : conditions) {
+        assert(condition.var->get_level() != -1);
+        out.write_int(condition.var->get_level());
+        out.write_int(condition.cond);
+    }
+    out.write_int(effect_var->get_level());
+    out.write_int(old_val);
+    out.write_int(effect_val);
+}
+
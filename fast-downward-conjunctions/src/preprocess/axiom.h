@@ -7,6 +7,8 @@
 #include <vector>
 using namespace std;
 
+class BinaryReader;
+class BinaryWriter;
 class Variable;
 
 class Axiom {
@@ -23,11 +25,13 @@ private:
     vector<Condition> conditions;    // var, val
 public:
     Axiom(istream &in, const vector<Variable *> &variables);
+    Axiom(BinaryReader &in, const vector<Variable *> &variables);
 
     bool is_redundant() const;
     void dump() const;
     int get_encoding_size() const;
     void generate_cpp_input(ofstream &outfile) const;
+    void generate_binary_cpp_input(BinaryWriter &out) const;
     const vector<Condition> &get_conditions() const {return conditions; }
     Variable *get_effect_var() const {return effect_var; }
     int get_old_val() const {return old_val; }
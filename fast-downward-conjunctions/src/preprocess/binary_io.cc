@@ -0,0 +1,83 @@
+#include "binary_io.h"
+
+#include <cstdlib>
+#include <sstream>
+
+using namespace std;
+
+static const string SAS_BINARY_MAGIC("\0SAS", 4);
+
+
+bool is_binary_input(istream &in) {
+    return in.peek() == SAS_BINARY_MAGIC[0];
+}
+
+BinaryReader::BinaryReader(istream &in)
+    : pos(0) {
+    ostringstream buffer;
+    buffer << in.rdbuf();
+    data = buffer.str();
+    if (data.compare(0, SAS_BINARY_MAGIC.size(), SAS_BINARY_MAGIC) != 0) {
+        cerr << "Input is not in the binary SAS format." << endl;
+        exit(1);
+    }
+    pos = SAS_BINARY_MAGIC.size();
+    int version = read_int();
+    if (version != SAS_BINARY_FILE_VERSION) {
+        cerr << "Expected binary translator file version "
+             << SAS_BINARY_FILE_VERSION << ", got " << version << "." << endl;
+        cerr << "Exiting." << endl;
+        exit(1);
+    }
+}
+
+void BinaryReader::check_available(size_t num_bytes) const {
+    if (data.size() - pos < num_bytes) {
+        cerr << "Unexpected end of binary translator file." << endl;
+        exit(1);
+    }
+}
+
+int BinaryReader::read_int() {
+    check_available(4);
+    const unsigned char *bytes =
+        reinterpret_cast<const unsigned char *>(data.data() + pos);
+    pos += 4;
+    unsigned int value = bytes[0] | (bytes[1] << 8) | (bytes[2] << 16) |
+                         (static_cast<unsigned int>(bytes[3]) << 24);
+    return static_cast<int>(value);
+}
+
+string BinaryReader::read_string() {
+    int length = read_int();
+    if (length < 0) {
+        cerr << "Invalid string length in binary translator file." << endl;
+        exit(1);
+    }
+    check_available(length);
+    string value = data.substr(pos, length);
+    pos += length;
+    return value;
+}
+
+BinaryWriter::BinaryWriter()
+    : data(SAS_BINARY_MAGIC) {
+    write_int(SAS_BINARY_FILE_VERSION);
+}
+
+void BinaryWriter::write_int(int value) {
+    unsigned int bits = static_cast<unsigned int>(value);
+    data += static_cast<char>(bits & 0xff);
+    data += static_cast<char>((bits >> 8) & 0xff);
+    data += static_cast<char>((bits >> 16) & 0xff);
+    data += static_cast<char>((bits >> 24) & 0xff);
+}
+
+void BinaryWriter::write_string(const string &value) {
+    write_int(value.size());
+    data += value;
+}
+
+void BinaryWriter::write_to(ostream &out) const {
+    out.write(data.data(), data.size());
+}
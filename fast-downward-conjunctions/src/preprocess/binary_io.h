@@ -0,0 +1,42 @@
+#ifndef BINARY_IO_H
+#define BINARY_IO_H
+
+#include <iostream>
+#include <string>
+using namespace std;
+
+/*
+  Reader and writer for the binary SAS format (see SASTask.output_binary
+  in the translator). Files start with the magic string "\0SAS" and the
+  format version. All integers are little-endian 32-bit integers, strings
+  are prefixed with their length.
+*/
+
+static const int SAS_BINARY_FILE_VERSION = 1;
+
+bool is_binary_input(istream &in);
+
+class BinaryReader {
+    string data;
+    size_t pos;
+    void check_available(size_t num_bytes) const;
+public:
+    // Reads all of in and checks the magic string and the version.
+    explicit BinaryReader(istream &in);
+
+    int read_int();
+    string read_string();
+};
+
+class BinaryWriter {
+    string data;
+public:
+    // Starts the output with the magic string and the version.
+    BinaryWriter();
+
+    void write_int(int value);
+    void write_string(const string &value);
+    void write_to(ostream &out) const;
+};
+
+#endif
@@ -6,6 +6,7 @@
 #include <vector>
 #include <fstream>
 
+#include "binary_io.h"
 #include "helper_functions.h"
 #include "state.h"
 #include "mutex_group.h"
@@ -111,6 +112,43 @@ void read_axioms(istream &in, const vector<Variable *> &variables,
         axioms.push_back(Axiom(in, variables));
 }
 
+void read_binary_problem_description(BinaryReader &in,
+                                     bool &metric,
+                                     vector<Variable> &internal_variables,
+                                     vector<Variable *> &variables,
+                                     vector<MutexGroup> &mutexes,
+                                     State &initial_state,
+                                     vector<pair<Variable *, int>> &goals,
+                                     vector<Operator> &operators,
+                                     vector<Axiom> &axioms) {
+    metric = in.read_int();
+    int count = in.read_int();
+    internal_variables.reserve(count);
+    // Important so that the iterators stored in variables are valid.
+    for (int i = 0; i < count; i++) {
+        internal_variables.push_back(Variable(in));
+        variables.push_back(&internal_variables.back());
+    }
+    count = in.read_int();
+    for (int i = 0; i < count; i++)
+        mutexes.push_back(MutexGroup(in, variables));
+    initial_state = State(in, variables);
+    count = in.read_int();
+    for (int i = 0; i < count; i++) {
+        int varNo = in.read_int();
+        int val = in.read_int();
+        goals.push_back(make_pair(variables[varNo], val));
+    }
+    count = in.read_int();
+    operators.reserve(count);
+    for (int i = 0; i < count; i++)
+        operators.push_back(Operator(in, variables));
+    count = in.read_int();
+    axioms.reserve(count);
+    for (int i = 0; i < count; i++)
+        axioms.push_back(Axiom(in, variables));
+}
+
 void read_preprocessed_problem_description(istream &in,
                                            bool &metric,
                                            vector<Variable> &internal_variables,
@@ -120,6 +158,13 @@ void read_preprocessed_problem_description(istream &in,
                                            vector<pair<Variable *, int>> &goals,
                                            vector<Operator> &operators,
                                            vector<Axiom> &axioms) {
+    if (is_binary_input(in)) {
+        BinaryReader reader(in);
+        read_binary_problem_description(
+            reader, metric, internal_variables, variables, mutexes,
+            initial_state, goals, operators, axioms);
+        return;
+    }
     read_and_verify_version(in);
     read_metric(in, metric);
     read_variables(in, internal_variables, variables);
@@ -158,18 +203,83 @@ void dump_DTGs(const vector<Variable *> &ordering,
     }
 }
 
+void generate_binary_cpp_input(const vector<Variable *> &ordered_vars,
+                               const bool &metric,
+                               const vector<MutexGroup> &mutexes,
+                               const State &initial_state,
+                               const vector<int> &ordered_goal_values,
+                               const vector<Operator> &operators,
+                               const vector<Axiom> &axioms,
+                               const string &output_filename) {
+    BinaryWriter out;
+    out.write_int(metric);
+
+    out.write_int(ordered_vars.size());
+    for (Variable *var : ordered_vars)
+        var->generate_binary_cpp_input(out);
+
+    out.write_int(mutexes.size());
+    for (const MutexGroup &mutex : mutexes)
+        mutex.generate_binary_cpp_input(out);
+
+    out.write_int(ordered_vars.size());
+    for (Variable *var : ordered_vars)
+        out.write_int(initial_state[var]);  // for axioms default value
+
+    int num_goals = 0;
+    for (int value : ordered_goal_values)
+        if (value != -1)
+            ++num_goals;
+    out.write_int(num_goals);
+    for (size_t i = 0; i < ordered_goal_values.size(); i++) {
+        if (ordered_goal_values[i] != -1) {
+            out.write_int(i);
+            out.write_int(ordered_goal_values[i]);
+        }
+    }
+
+    out.write_int(operators.size());
+    for (const Operator &op : operators)
+        op.generate_binary_cpp_input(out);
+
+    out.write_int(axioms.size());
+    for (const Axiom &axiom : axioms)
+        axiom.generate_binary_cpp_input(out);
+
+    ofstream outfile(output_filename.c_str(), ios::out | ios::binary);
+    out.write_to(outfile);
+    outfile.close();
+}
+
 void generate_cpp_input(const vector<Variable *> &ordered_vars,
                         const bool &metric,
                         const vector<MutexGroup> &mutexes,
                         const State &initial_state,
                         const vector<pair<Variable *, int>> &goals,
                         const vector<Operator> &operators,
-                        const vector<Axiom> &axioms) {
+                        const vector<Axiom> &axioms,
+                        bool binary,
+                        const string &output_filename) {
     /* NOTE: solvable_in_poly_time flag is no longer included in output,
        since the planner doesn't handle it specially any more anyway. */
 
+    int num_vars = ordered_vars.size();
+    vector<int> ordered_goal_values;
+    ordered_goal_values.resize(num_vars, -1);
+    for (const auto &goal : goals) {
+        int var_index = goal.first->get_level();
+        ordered_goal_values[var_index] = goal.second;
+    }
+
+    if (binary) {
+        generate_binary_cpp_input(ordered_vars, metric, mutexes, initial_state,
+                                  ordered_goal_values, operators, axioms,
+                                  output_filename);
+        return;
+    }
+
     ofstream outfile;
-    outfile.open("output", ios::out);
+    outfile.open(output_filename.c_str(), ios::out);
 
     outfile << "begin_version" << endl;
     outfile << PRE_FILE_VERSION << endl;
@@ -179,7 +289,6 @@ void generate_cpp_input(const vector<Variable *> &ordered_vars,
     outfile << metric << endl;
     outfile << "end_metric" << endl;
 
-    int num_vars = ordered_vars.size();
     outfile << num_vars << endl;
     for (Variable *var : ordered_vars)
         var->generate_cpp_input(outfile);
@@ -193,12 +302,6 @@ void generate_cpp_input(const vector<Variable *> &ordered_vars,
         outfile << initial_state[var] << endl;  // for axioms default value
     outfile << "end_state" << endl;
 
-    vector<int> ordered_goal_values;
-    ordered_goal_values.resize(num_vars, -1);
-    for (const auto &goal : goals) {
-        int var_index = goal.first->get_level();
-        ordered_goal_values[var_index] = goal.second;
-    }
     outfile << "begin_goal" << endl;
     outfile << goals.size() << endl;
     for (int i = 0; i < num_vars; i++)
@@ -216,9 +319,9 @@ void generate_cpp_input(const vector<Variable *> &ordered_vars,
 
     outfile.close();
 }
-void generate_unsolvable_cpp_input() {
+void generate_unsolvable_cpp_input(const string &output_filename) {
     ofstream outfile;
-    outfile.open("output", ios::out);
+    outfile.open(output_filename.c_str(), ios::out);
     outfile << "begin_version" << endl;
     outfile << PRE_FILE_VERSION << endl;
     outfile << "end_version" << endl;
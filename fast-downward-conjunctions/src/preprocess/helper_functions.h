@@ -39,14 +39,16 @@ void dump_preprocessed_problem_description(const vector<Variable *> &variables,
 void dump_DTGs(const vector<Variable *> &ordering,
                vector<DomainTransitionGraph> &transition_graphs);
 
-void generate_unsolvable_cpp_input();
+void generate_unsolvable_cpp_input(const string &output_filename);
 void generate_cpp_input(const vector<Variable *> &ordered_var,
                         const bool &metric,
                         const vector<MutexGroup> &mutexes,
                         const State &initial_state,
                         const vector<pair<Variable *, int>> &goals,
                         const vector<Operator> &operators,
-                        const vector<Axiom> &axioms);
+                        const vector<Axiom> &axioms,
+                        bool binary,
+                        const string &output_filename);
 void check_magic(istream &in, string magic);
 
 #endif
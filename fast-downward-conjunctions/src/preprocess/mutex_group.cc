@@ -1,5 +1,6 @@
 #include "mutex_group.h"
 
+#include "binary_io.h"
 #include "helper_functions.h"
 #include "variable.h"
 
@@ -18,6 +19,16 @@ MutexGroup::MutexGroup(istream &in, const vector<Variable *> &variables) : dir(F
     }
     check_magic(in, "end_mutex_group");
 }
+
+MutexGroup::MutexGroup(BinaryReader &in, const vector<Variable *> &variables) : dir(FW) {
+    int size = in.read_int();
+    for (int i = 0; i < size; ++i) {
+        int var_no = in.read_int();
+        int value = in.read_int();
+        facts.push_back(make_pair(variables[var_no], value));
+    }
+}
+
 MutexGroup::MutexGroup(const vector<pair<int, int>> &f,
                        const vector<Variable *> &variables,
                        bool regression) {
@@ -63,6 +74,14 @@ void MutexGroup::generate_cpp_input(ofstream &outfile) const {
     outfile << "end_mutex_group" << endl;
 }
 
+void MutexGroup::generate_binary_cpp_input(BinaryWriter &out) const {
+    out.write_int(facts.size());
+    for (const auto &fact : facts) {
+        out.write_int(fact.first->get_level());
+        out.write_int(fact.second);
+    }
+}
+
 void MutexGroup::strip_unimportant_facts() {
     int new_index = 0;
     for (const auto &fact : facts) {
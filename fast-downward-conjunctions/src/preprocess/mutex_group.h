@@ -7,6 +7,8 @@
 #include "state.h"
 using namespace std;
 
+class BinaryReader;
+class BinaryWriter;
 class Variable;
 
 enum Dir {FW, BW};
@@ -19,6 +21,7 @@ class MutexGroup {
     vector<pair<const Variable *, int>> facts;
 public:
     MutexGroup(istream &in, const vector<Variable *> &variables);
+    MutexGroup(BinaryReader &in, const vector<Variable *> &variables);
 
     MutexGroup(const vector<pair<int, int>> &f,
                const vector<Variable *> &variables,
@@ -36,6 +39,7 @@ public:
         return facts.size();
     }
     void generate_cpp_input(ofstream &outfile) const;
+    void generate_binary_cpp_input(BinaryWriter &out) const;
     void dump() const;
     void get_mutex_group(vector<pair<int, int>> &invariant_group) const;
 
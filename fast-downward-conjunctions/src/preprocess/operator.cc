@@ -1,3 +1,4 @@
+#include "binary_io.h"
 #include "helper_functions.h"
 #include "operator.h"
 #include "variable.h"
@@ -41,6 +42,34 @@ Operator::Operator(istream &in, const vector<Variable *> &variables) : spurious(
     // TODO: Evtl. effektiver: conditions schon sortiert einlesen?
 }
 
+Operator::Operator(BinaryReader &in, const vector<Variable *> &variables) : spurious(false) {
+    name = in.read_string();
+    int count = in.read_int(); // number of prevail conditions
+    for (int i = 0; i < count; i++) {
+        int varNo = in.read_int();
+        int val = in.read_int();
+        prevail.push_back(Prevail(variables[varNo], val));
+    }
+    count = in.read_int(); // number of pre_post conditions
+    for (int i = 0; i < count; i++) {
+        int eff_conds = in.read_int();
+        vector<EffCond> ecs;
+        for (int j = 0; j < eff_conds; j++) {
+            int var = in.read_int();
+            int value = in.read_int();
+            ecs.push_back(EffCond(variables[var], value));
+        }
+        int varNo = in.read_int();
+        int val = in.read_int();
+        int newVal = in.read_int();
+        if (eff_conds)
+            pre_post.push_back(PrePost(variables[varNo], ecs, val, newVal));
+        else
+            pre_post.push_back(PrePost(variables[varNo], val, newVal));
+    }
+    cost = in.read_int();
+}
+
 void Operator::dump() const {
     cout << name << ":" << endl;
     cout << "prevail:";
@@ -123,6 +152,29 @@ void Operator::generate_cpp_input(ofstream &outfile) const {
     outfile << "end_operator" << endl;
 }
 
+void Operator::generate_binary_cpp_input(BinaryWriter &out) const {
+    out.write_string(name);
+    out.write_int(prevail.size());
+    for (const auto &prev : prevail) {
+        assert(prev.var->get_level() != -1);
+        out.write_int(prev.var->get_level());
+        out.write_int(prev.prev);
+    }
+    out.write_int(pre_post.size());
+    for (const auto &eff : pre_post) {
+        assert(eff.var->get_level() != -1);
+        out.write_int(eff.effect_conds.size());
+        for (const auto &cond : eff.effect_conds) {
+            out.write_int(cond.var->get_level());
+            out.write_int(cond.cond);
+        }
+        out.write_int(eff.var->get_level());
+        out.write_int(eff.pre);
+        out.write_int(eff.post);
+    }
+    out.write_int(cost);
+}
+
 // Removes ambiguity in the preconditions,
 // detects whether the operator is spurious
 void Operator::remove_ambiguity(const H2Mutexes &h2) {
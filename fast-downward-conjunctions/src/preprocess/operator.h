@@ -10,6 +10,8 @@
 #include "variable.h"
 using namespace std;
 
+class BinaryReader;
+class BinaryWriter;
 class H2Mutexes;
 
 class Operator {
@@ -86,6 +88,7 @@ private:
     std::vector<std::pair<Variable *, int>> potential_preconditions_var;
 public:
     Operator(istream &in, const vector<Variable *> &variables);
+    Operator(BinaryReader &in, const vector<Variable *> &variables);
 
     void strip_unimportant_effects();
     bool is_redundant() const;
@@ -93,6 +96,7 @@ public:
     void dump() const;
     int get_encoding_size() const;
     void generate_cpp_input(ofstream &outfile) const;
+    void generate_binary_cpp_input(BinaryWriter &out) const;
     int get_cost() const {return cost; }
     string get_name() const {return name; }
     bool has_conditional_effects() const {
@@ -3,9 +3,10 @@
  * goals, initial state),
  * then calls functions to build causal graph, domain_transition_graphs and
  * successor generator
- * finally prints output to file "output.sas"
+ * finally prints output to file "output" (or the file given with --output)
  */
 
+#include "binary_io.h"
 #include "helper_functions.h"
 #include "successor_generator.h"
 #include "causal_graph.h"
@@ -24,6 +25,7 @@ int main(int argc, const char **argv) {
     bool include_augmented_preconditions = false;
     bool expensive_statistics = false;
     bool disable_bw_h2 = false;
+    string output_filename = "output";
 
     bool metric;
     vector<Variable *> variables;
@@ -60,13 +62,23 @@ int main(int argc, const char **argv) {
             disable_bw_h2 = true;
         } else if (arg.compare("--stat") == 0) {
             expensive_statistics = true;
+        } else if (arg.compare("--output") == 0) {
+            i++;
+            if (i < argc) {
+                output_filename = argv[i];
+            } else {
+                cerr << "please specify the output file after --output" << endl;
+                exit(2);
+            }
         } else {
             cerr << "unknown option " << arg << endl << endl;
-            cout << "Usage: ./preprocess [--no_rel] [--no_h2]  [--no_bw_h2] [--augmented_pre] [--stat] < output" << endl;
+            cout << "Usage: ./preprocess [--no_rel] [--no_h2]  [--no_bw_h2] [--augmented_pre] [--stat] [--output FILE] < output" << endl;
             exit(2);
         }
     }
 
+    // The output is written in the format of the input.
+    bool binary = is_binary_input(cin);
     read_preprocessed_problem_description
         (cin, metric, internal_variables, variables, mutexes, initial_state, goals, operators, axioms);
     //dump_preprocessed_problem_description
@@ -101,7 +113,7 @@ int main(int argc, const char **argv) {
 			       h2_mutex_time, disable_bw_h2)){
 	                // TODO: don't duplicate the code to return an unsolvable task, log and exit here
             cout << "Unsolvable task in preprocessor" << endl;
-            generate_unsolvable_cpp_input();
+            generate_unsolvable_cpp_input(output_filename);
             cout << "done" << endl;
             return 0;
 	}
@@ -138,7 +150,7 @@ int main(int argc, const char **argv) {
         if (initial_state.remove_unreachable_facts()) {
             // TODO: don't duplicate the code to return an unsolvable task, log and exit here
             cout << "Unsolvable task in preprocessor" << endl;
-            generate_unsolvable_cpp_input();
+            generate_unsolvable_cpp_input(output_filename);
             cout << "done" << endl;
             return 0;
         }
@@ -243,12 +255,12 @@ int main(int argc, const char **argv) {
     cout << "Writing output..." << endl;
     if (ordering.empty()) {
         cout << "Unsolvable task in preprocessor" << endl;
-        generate_unsolvable_cpp_input();
+        generate_unsolvable_cpp_input(output_filename);
     } else {
         generate_cpp_input(
             ordering, metric,
             mutexes, initial_state, goals,
-            operators, axioms);
+            operators, axioms, binary, output_filename);
     }
     cout << "done" << endl;
 }
@@ -1,6 +1,9 @@
 #include "state.h"
+#include "binary_io.h"
 #include "helper_functions.h"
 
+#include <cstdlib>
+
 class Variable;
 
 State::State(istream &in, const vector<Variable *> &variables) {
@@ -13,6 +16,17 @@ State::State(istream &in, const vector<Variable *> &variables) {
     check_magic(in, "end_state");
 }
 
+State::State(BinaryReader &in, const vector<Variable *> &variables) {
+    int count = in.read_int();
+    if (count != static_cast<int>(variables.size())) {
+        cerr << "Initial state has " << count << " values, expected "
+             << variables.size() << "." << endl;
+        exit(1);
+    }
+    for (Variable *var : variables)
+        values[var] = in.read_int(); //for axioms, this is default value
+}
+
 int State::operator[](Variable *var) const {
     return values.find(var)->second;
 }
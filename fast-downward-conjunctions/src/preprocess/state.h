@@ -6,6 +6,7 @@
 #include <vector>
 using namespace std;
 
+class BinaryReader;
 class Variable;
 
 class State {
@@ -13,6 +14,7 @@ class State {
 public:
     State() {} // TODO: Entfernen (erfordert kleines Redesign)
     State(istream &in, const vector<Variable *> &variables);
+    State(BinaryReader &in, const vector<Variable *> &variables);
 
     int operator[](Variable *var) const;
     void dump() const;
@@ -1,5 +1,6 @@
 #include "variable.h"
 
+#include "binary_io.h"
 #include "helper_functions.h"
 
 #include <cassert>
@@ -22,6 +23,19 @@ Variable::Variable(istream &in) {
     reachable = vector<bool> (range, true);
 }
 
+Variable::Variable(BinaryReader &in) {
+    name = in.read_string();
+    layer = in.read_int();
+    int range = in.read_int();
+    values.resize(range);
+    for (int i = 0; i < range; ++i)
+        values[i] = in.read_string();
+    level = -1;
+    necessary = false;
+    reachable_values = range;
+    reachable = vector<bool> (range, true);
+}
+
 void Variable::set_level(int theLevel) {
     level = theLevel;
 }
@@ -71,6 +85,15 @@ void Variable::generate_cpp_input(ofstream &outfile) const {
     outfile << "end_variable" << endl;
 }
 
+void Variable::generate_binary_cpp_input(BinaryWriter &out) const {
+    out.write_string(name);
+    out.write_int(layer);
+    out.write_int(reachable_values);
+    for (size_t i = 0; i < values.size(); ++i)
+        if (reachable[i])
+            out.write_string(values[i]);
+}
+
 void Variable::remove_unreachable_facts() {
     vector<string> new_values;
     for (size_t i = 0; i < values.size(); i++) {
@@ -5,6 +5,9 @@
 #include <vector>
 using namespace std;
 
+class BinaryReader;
+class BinaryWriter;
+
 class Variable {
     vector<string> values;
     string name;
@@ -15,6 +18,7 @@ class Variable {
     int reachable_values;
 public:
     Variable(istream &in);
+    Variable(BinaryReader &in);
     void set_level(int level);
     void set_necessary();
     void reset_necessary(){necessary= false;}
@@ -25,6 +29,7 @@ public:
     int get_layer() const {return layer; }
     bool is_derived() const {return layer != -1; }
     void generate_cpp_input(ofstream &outfile) const;
+    void generate_binary_cpp_input(BinaryWriter &out) const;
     void dump() const;
 
     string get_fact_name(int value) const {
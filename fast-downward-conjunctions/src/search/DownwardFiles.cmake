@@ -125,6 +125,7 @@ fast_downward_plugin(
     NAME UTILS
     HELP "System utilities"
     SOURCES
+        utils/binary_reader.cc
         utils/collections.h
         utils/countdown_timer.cc
         utils/dynamic_bitset.h
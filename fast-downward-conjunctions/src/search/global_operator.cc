@@ -2,6 +2,7 @@
 
 #include "globals.h"
 
+#include "utils/binary_reader.h"
 #include "utils/collections.h"
 #include "utils/system.h"
 
@@ -59,6 +60,26 @@ void GlobalOperator::read_pre_post(istream &in) {
     for (int i = 0; i < cond_count; ++i)
         conditions.push_back(GlobalCondition(in));
     in >> var >> pre >> post;
+    add_pre_post(var, pre, post, conditions);
+}
+
+void GlobalOperator::read_pre_post(utils::BinaryReader &in) {
+    int cond_count = in.read_int();
+    vector<GlobalCondition> conditions;
+    conditions.reserve(cond_count);
+    for (int i = 0; i < cond_count; ++i) {
+        int var = in.read_int();
+        int val = in.read_int();
+        conditions.push_back(GlobalCondition(var, val));
+    }
+    int var = in.read_int();
+    int pre = in.read_int();
+    int post = in.read_int();
+    add_pre_post(var, pre, post, conditions);
+}
+
+void GlobalOperator::add_pre_post(
+    int var, int pre, int post, const vector<GlobalCondition> &conditions) {
     if (pre != -1)
         check_fact(var, pre);
     check_fact(var, post);
@@ -100,6 +121,35 @@ GlobalOperator::GlobalOperator(istream &in, bool axiom) {
     }
 }
 
+GlobalOperator::GlobalOperator(utils::BinaryReader &in, bool axiom) {
+    marked = false;
+
+    is_an_axiom = axiom;
+    if (!is_an_axiom) {
+        name = in.read_string();
+        int count = in.read_int();
+        preconditions.reserve(count);
+        for (int i = 0; i < count; ++i) {
+            int var = in.read_int();
+            int val = in.read_int();
+            preconditions.push_back(GlobalCondition(var, val));
+        }
+        count = in.read_int();
+        for (int i = 0; i < count; ++i)
+            read_pre_post(in);
+
+        int op_cost = in.read_int();
+        cost = g_use_metric ? op_cost : 1;
+
+        g_min_action_cost = min(g_min_action_cost, cost);
+        g_max_action_cost = max(g_max_action_cost, cost);
+    } else {
+        name = "<axiom>";
+        cost = 0;
+        read_pre_post(in);
+    }
+}
+
 void GlobalCondition::dump() const {
     cout << g_variable_name[var] << ": " << val;
 }
@@ -7,6 +7,10 @@
 #include <string>
 #include <vector>
 
+namespace utils {
+class BinaryReader;
+}
+
 struct GlobalCondition {
     int var;
     int val;
@@ -54,8 +58,12 @@ class GlobalOperator {
 
     mutable bool marked; // Used for short-term marking of preferred operators
     void read_pre_post(std::istream &in);
+    void read_pre_post(utils::BinaryReader &in);
+    void add_pre_post(int var, int pre, int post,
+                      const std::vector<GlobalCondition> &conditions);
 public:
     explicit GlobalOperator(std::istream &in, bool is_axiom);
+    GlobalOperator(utils::BinaryReader &in, bool is_axiom);
     void dump() const;
     const std::string &get_name() const {return name; }
 
@@ -9,6 +9,7 @@
 #include "task_utils/successor_generator.h"
 #include "tasks/root_task.h"
 
+#include "utils/binary_reader.h"
 #include "utils/logging.h"
 #include "utils/rng.h"
 #include "utils/system.h"
@@ -140,24 +141,52 @@ void read_variables(istream &in) {
     }
 }
 
-void read_mutexes(istream &in) {
-    vector<vector<set<FactPair>>> inconsistent_facts;
+static void init_mutexes(vector<vector<set<FactPair>>> &inconsistent_facts) {
     inconsistent_facts.resize(g_variable_domain.size());
     g_inconsistent_facts.resize(g_variable_domain.size());
     for (size_t i = 0; i < g_variable_domain.size(); ++i) {
         inconsistent_facts[i].resize(g_variable_domain[i]);
         g_inconsistent_facts[i].resize(g_variable_domain[i]);
     }
+}
 
-    int num_mutex_groups;
-    in >> num_mutex_groups;
-
+static void add_mutex_group(const vector<FactPair> &invariant_group,
+                            vector<vector<set<FactPair>>> &inconsistent_facts) {
     /* NOTE: Mutex groups can overlap, in which case the same mutex
        should not be represented multiple times. The current
        representation takes care of that automatically by using sets.
        If we ever change this representation, this is something to be
        aware of. */
+    for (const FactPair &fact1 : invariant_group) {
+        for (const FactPair &fact2 : invariant_group) {
+            if (fact1.var != fact2.var) {
+                /* The "different variable" test makes sure we
+                   don't mark a fact as mutex with itself
+                   (important for correctness) and don't include
+                   redundant mutexes (important to conserve
+                   memory). Note that the preprocessor removes
+                   mutex groups that contain *only* redundant
+                   mutexes, but it can of course generate mutex
+                   groups which lead to *some* redundant mutexes,
+                   where some but not all facts talk about the
+                   same variable. */
+                inconsistent_facts[fact1.var][fact1.value].insert(fact2);
+            }
+        }
+        g_inconsistent_facts[fact1.var][fact1.value].reserve(
+            inconsistent_facts[fact1.var][fact1.value].size());
+        g_inconsistent_facts[fact1.var][fact1.value].assign(
+            std::begin(inconsistent_facts[fact1.var][fact1.value]),
+            std::end(inconsistent_facts[fact1.var][fact1.value]));
+    }
+}
+
+void read_mutexes(istream &in) {
+    vector<vector<set<FactPair>>> inconsistent_facts;
+    init_mutexes(inconsistent_facts);
 
+    int num_mutex_groups;
+    in >> num_mutex_groups;
     for (int i = 0; i < num_mutex_groups; ++i) {
         check_magic(in, "begin_mutex_group");
         int num_facts;
@@ -171,39 +200,22 @@ void read_mutexes(istream &in) {
             invariant_group.emplace_back(var, value);
         }
         check_magic(in, "end_mutex_group");
-        for (const FactPair &fact1 : invariant_group) {
-            for (const FactPair &fact2 : invariant_group) {
-                if (fact1.var != fact2.var) {
-                    /* The "different variable" test makes sure we
-                       don't mark a fact as mutex with itself
-                       (important for correctness) and don't include
-                       redundant mutexes (important to conserve
-                       memory). Note that the preprocessor removes
-                       mutex groups that contain *only* redundant
-                       mutexes, but it can of course generate mutex
-                       groups which lead to *some* redundant mutexes,
-                       where some but not all facts talk about the
-                       same variable. */
-                    inconsistent_facts[fact1.var][fact1.value].insert(fact2);
-                }
-            }
-            g_inconsistent_facts[fact1.var][fact1.value].reserve(
-                inconsistent_facts[fact1.var][fact1.value].size());
-            g_inconsistent_facts[fact1.var][fact1.value].assign(
-                std::begin(inconsistent_facts[fact1.var][fact1.value]),
-                std::end(inconsistent_facts[fact1.var][fact1.value]));
-        }
+        add_mutex_group(invariant_group, inconsistent_facts);
     }
 }
 
-void read_goal(istream &in) {
-    check_magic(in, "begin_goal");
-    int count;
-    in >> count;
+static void check_goal_count(int count) {
     if (count < 1) {
         cerr << "Task has no goal condition!" << endl;
         utils::exit_with(ExitCode::INPUT_ERROR);
     }
+}
+
+void read_goal(istream &in) {
+    check_magic(in, "begin_goal");
+    int count;
+    in >> count;
+    check_goal_count(count);
     for (int i = 0; i < count; ++i) {
         int var, val;
         in >> var >> val;
@@ -231,27 +243,91 @@ void read_axioms(istream &in) {
     in >> count;
     for (int i = 0; i < count; ++i)
         g_axioms.push_back(GlobalOperator(in, true));
+}
 
-    g_axiom_evaluator = new AxiomEvaluator(TaskProxy(*g_root_task()));
+static void read_binary_task(utils::BinaryReader &in) {
+    g_use_metric = in.read_int();
+
+    int count = in.read_int();
+    for (int i = 0; i < count; ++i) {
+        g_variable_name.push_back(in.read_string());
+        g_axiom_layers.push_back(in.read_int());
+        int range = in.read_int();
+        g_variable_domain.push_back(range);
+        vector<string> fact_names(range);
+        for (size_t j = 0; j < fact_names.size(); ++j)
+            fact_names[j] = in.read_string();
+        g_fact_names.push_back(fact_names);
+    }
+
+    vector<vector<set<FactPair>>> inconsistent_facts;
+    init_mutexes(inconsistent_facts);
+    int num_mutex_groups = in.read_int();
+    for (int i = 0; i < num_mutex_groups; ++i) {
+        int num_facts = in.read_int();
+        vector<FactPair> invariant_group;
+        invariant_group.reserve(num_facts);
+        for (int j = 0; j < num_facts; ++j) {
+            int var = in.read_int();
+            int value = in.read_int();
+            invariant_group.emplace_back(var, value);
+        }
+        add_mutex_group(invariant_group, inconsistent_facts);
+    }
+
+    count = in.read_int();
+    if (count != static_cast<int>(g_variable_domain.size())) {
+        cerr << "Initial state has " << count << " values, expected "
+             << g_variable_domain.size() << "." << endl;
+        utils::exit_with(ExitCode::INPUT_ERROR);
+    }
+    g_initial_state_data.resize(count);
+    for (int i = 0; i < count; ++i)
+        g_initial_state_data[i] = in.read_int();
+    g_default_axiom_values = g_initial_state_data;
+
+    count = in.read_int();
+    check_goal_count(count);
+    for (int i = 0; i < count; ++i) {
+        int var = in.read_int();
+        int val = in.read_int();
+        g_goal.push_back(make_pair(var, val));
+    }
+
+    count = in.read_int();
+    g_operators.reserve(count);
+    for (int i = 0; i < count; ++i)
+        g_operators.push_back(GlobalOperator(in, false));
+
+    count = in.read_int();
+    g_axioms.reserve(count);
+    for (int i = 0; i < count; ++i)
+        g_axioms.push_back(GlobalOperator(in, true));
 }
 
 void read_everything(istream &in) {
     cout << "reading input... [t=" << utils::g_timer << "]" << endl;
-    read_and_verify_version(in);
-    read_metric(in);
-    read_variables(in);
-    read_mutexes(in);
-    g_initial_state_data.resize(g_variable_domain.size());
-    check_magic(in, "begin_state");
-    for (size_t i = 0; i < g_variable_domain.size(); ++i) {
-        in >> g_initial_state_data[i];
-    }
-    check_magic(in, "end_state");
-    g_default_axiom_values = g_initial_state_data;
+    if (utils::is_binary_input(in)) {
+        utils::BinaryReader reader(in);
+        read_binary_task(reader);
+    } else {
+        read_and_verify_version(in);
+        read_metric(in);
+        read_variables(in);
+        read_mutexes(in);
+        g_initial_state_data.resize(g_variable_domain.size());
+        check_magic(in, "begin_state");
+        for (size_t i = 0; i < g_variable_domain.size(); ++i) {
+            in >> g_initial_state_data[i];
+        }
+        check_magic(in, "end_state");
+        g_default_axiom_values = g_initial_state_data;
 
-    read_goal(in);
-    read_operators(in);
-    read_axioms(in);
+        read_goal(in);
+        read_operators(in);
+        read_axioms(in);
+    }
+    g_axiom_evaluator = new AxiomEvaluator(TaskProxy(*g_root_task()));
 
     // Ignore everything else
     // Ignore successor generator from preprocessor output.
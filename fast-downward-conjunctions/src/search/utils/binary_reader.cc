@@ -0,0 +1,64 @@
+#include "binary_reader.h"
+
+#include "system.h"
+
+#include <sstream>
+
+using namespace std;
+
+namespace utils {
+static const int BINARY_FILE_VERSION = 1;
+static const string BINARY_MAGIC("\0SAS", 4);
+
+bool is_binary_input(istream &in) {
+    return in.peek() == BINARY_MAGIC[0];
+}
+
+BinaryReader::BinaryReader(istream &in)
+    : pos(0) {
+    ostringstream buffer;
+    buffer << in.rdbuf();
+    data = buffer.str();
+    if (data.compare(0, BINARY_MAGIC.size(), BINARY_MAGIC) != 0) {
+        cerr << "Input is not in the binary task format." << endl;
+        exit_with(ExitCode::INPUT_ERROR);
+    }
+    pos = BINARY_MAGIC.size();
+    int version = read_int();
+    if (version != BINARY_FILE_VERSION) {
+        cerr << "Expected binary preprocessor file version "
+             << BINARY_FILE_VERSION << ", got " << version << "." << endl;
+        cerr << "Exiting." << endl;
+        exit_with(ExitCode::INPUT_ERROR);
+    }
+}
+
+void BinaryReader::check_available(size_t num_bytes) const {
+    if (data.size() - pos < num_bytes) {
+        cerr << "Unexpected end of binary preprocessor file." << endl;
+        exit_with(ExitCode::INPUT_ERROR);
+    }
+}
+
+int BinaryReader::read_int() {
+    check_available(4);
+    const unsigned char *bytes =
+        reinterpret_cast<const unsigned char *>(data.data() + pos);
+    pos += 4;
+    unsigned int value = bytes[0] | (bytes[1] << 8) | (bytes[2] << 16) |
+                         (static_cast<unsigned int>(bytes[3]) << 24);
+    return static_cast<int>(value);
+}
+
+string BinaryReader::read_string() {
+    int length = read_int();
+    if (length < 0) {
+        cerr << "Invalid string length in binary preprocessor file." << endl;
+        exit_with(ExitCode::INPUT_ERROR);
+    }
+    check_available(length);
+    string value = data.substr(pos, length);
+    pos += length;
+    return value;
+}
+}
@@ -0,0 +1,30 @@
+#ifndef UTILS_BINARY_READER_H
+#define UTILS_BINARY_READER_H
+
+#include <iostream>
+#include <string>
+
+namespace utils {
+/*
+  Reader for the binary task format written by the translator and the
+  preprocessor (see SASTask.output_binary in the translator). Inputs
+  start with the magic string "\0SAS" and the format version. All
+  integers are little-endian 32-bit integers, strings are prefixed with
+  their length.
+*/
+class BinaryReader {
+    std::string data;
+    size_t pos;
+    void check_available(size_t num_bytes) const;
+public:
+    // Reads all of in and checks the magic string and the version.
+    explicit BinaryReader(std::istream &in);
+
+    int read_int();
+    std::string read_string();
+};
+
+extern bool is_binary_input(std::istream &in);
+}
+
+#endif
@@ -0,0 +1,121 @@
+#! /usr/bin/env python
+
+"""Time the add/delete effect deduplication of PropositionalAction.
+
+Usage: effect_benchmark.py [DOMAIN TASK]
+
+Compares constructing PropositionalActions with constructing them with
+the former quadratic deduplication (QuadraticAction). Without
+arguments, the comparison runs on synthetic actions with a growing number
+of conditional effects. With a domain and task, it runs on the effects of
+all ground actions of that task."""
+
+from __future__ import print_function
+
+import sys
+import timeit
+
+import pddl
+
+
+class QuadraticAction(pddl.PropositionalAction):
+    """PropositionalAction with the former deduplication, which looked up
+    every delete effect in the list of add effects."""
+    __slots__ = ()
+
+    def __init__(self, name, precondition, effects, cost):
+        self.name = name
+        self.precondition = precondition
+        self.add_effects = []
+        self.del_effects = []
+        for condition, effect in effects:
+            if not effect.negated:
+                self.add_effects.append((condition, effect))
+        for condition, effect in effects:
+            if effect.negated and (condition, effect.negate()) not in self.add_effects:
+                self.del_effects.append((condition, effect.negate()))
+        self.cost = cost
+
+
+def quadratic_dedup(effects):
+    action = QuadraticAction("bench", [], effects, 1)
+    return action.add_effects, action.del_effects
+
+
+def current_dedup(effects):
+    action = pddl.PropositionalAction("bench", [], effects, 1)
+    return action.add_effects, action.del_effects
+
+
+def synthetic_effects(num_effects):
+    """Effects of a universally quantified conditional effect: for every
+    object, add one atom and delete another one under a condition on
+    that object. Every fourth delete effect clashes with an add effect."""
+    effects = []
+    for i in range(num_effects // 2):
+        obj = "o%d" % i
+        condition = [pddl.Atom("ready", [obj])]
+        effects.append((condition, pddl.Atom("done", [obj])))
+        if i % 4 == 0:
+            deleted = pddl.NegatedAtom("done", [obj])
+        else:
+            deleted = pddl.NegatedAtom("ready", [obj])
+        effects.append((condition, deleted))
+    return effects
+
+
+def time_dedup(function, effect_lists, repeat=5):
+    def run():
+        for effects in effect_lists:
+            function(effects)
+    number = max(1, 20000 // max(1, sum(map(len, effect_lists))))
+    return min(timeit.repeat(run, number=number, repeat=repeat)) / number
+
+
+def report(label, effect_lists):
+    for effects in effect_lists:
+        assert quadratic_dedup(effects) == current_dedup(effects)
+    quadratic = time_dedup(quadratic_dedup, effect_lists)
+    current = time_dedup(current_dedup, effect_lists)
+    print("%-28s quadratic: %9.3f ms  current: %9.3f ms  speedup: %5.2fx" % (
+        label, quadratic * 1000, current * 1000, quadratic / current))
+
+
+def record_ground_effects():
+    import instantiate
+    import normalize
+    import options
+    import pddl_parser
+
+    options.setup()
+    task = pddl_parser.open()
+    normalize.normalize(task)
+    recorded = []
+    action_class = pddl.actions.PropositionalAction
+    def recording_action(name, precondition, effects, cost):
+        recorded.append(effects)
+        return action_class(name, precondition, effects, cost)
+    pddl.actions.PropositionalAction = recording_action
+    try:
+        instantiate.explore(task)
+    finally:
+        pddl.actions.PropositionalAction = action_class
+    return recorded
+
+
+def main():
+    if len(sys.argv) == 3:
+        effect_lists = record_ground_effects()
+        num_effects = sum(map(len, effect_lists))
+        print("%d ground actions, %d effects (max %d per action)" % (
+            len(effect_lists), num_effects,
+            max([len(effects) for effects in effect_lists] or [0])))
+        report("all ground actions", effect_lists)
+    else:
+        for num_effects in [2, 4, 8, 12, 16, 64, 256, 1024]:
+            report("%d effects per action" % num_effects,
+                   [synthetic_effects(num_effects)])
+
+
+if __name__ == "__main__":
+    main()
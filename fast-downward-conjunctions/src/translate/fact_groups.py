@@ -2,14 +2,35 @@ from __future__ import print_function
 
 import invariant_finder
 import options
-import pddl
 import timers
 
 
 DEBUG = False
 
 
-def expand_group(group, task, reachable_facts):
+def get_group_positions(groups):
+    """Map each predicate to the positions at which ?X occurs in the
+    facts of the groups."""
+    positions = {}
+    for group in groups:
+        for fact in group:
+            if "?X" in fact.args:
+                pos = list(fact.args).index("?X")
+                positions.setdefault(fact.predicate, set()).add(pos)
+    return positions
+
+def index_reachable_facts(groups, reachable_facts):
+    """Map (predicate, position, other arguments) to the reachable facts
+    with these other arguments, for the positions of ?X in the groups."""
+    positions = get_group_positions(groups)
+    index = {}
+    for atom in reachable_facts:
+        for pos in positions.get(atom.predicate, ()):
+            key = (atom.predicate, pos, atom.args[:pos] + atom.args[pos + 1:])
+            index.setdefault(key, []).append(atom)
+    return index
+
+def expand_group(group, reachable_fact_index):
     result = []
     for fact in group:
         try:
@@ -17,68 +38,114 @@ def expand_group(group, task, reachable_facts):
         except ValueError:
             result.append(fact)
         else:
-            # NOTE: This could be optimized by only trying objects of the correct
-            #       type, or by using a unifier which directly generates the
-            #       applicable objects. It is not worth optimizing this at this stage,
-            #       though.
-            for obj in task.objects:
-                newargs = list(fact.args)
-                newargs[pos] = obj.name
-                atom = pddl.Atom(fact.predicate, newargs)
-                if atom in reachable_facts:
-                    result.append(atom)
+            # Only the reachable facts that match the group fact in all
+            # other positions are enumerated. The order does not matter,
+            # as compute_groups sorts the groups.
+            key = (fact.predicate, pos, fact.args[:pos] + fact.args[pos + 1:])
+            result.extend(reachable_fact_index.get(key, ()))
     return result
 
-def instantiate_groups(groups, task, reachable_facts):
-    return [expand_group(group, task, reachable_facts) for group in groups]
+def instantiate_groups(groups, reachable_facts):
+    index = index_reachable_facts(groups, reachable_facts)
+    return [expand_group(group, index) for group in groups]
 
 class GroupCoverQueue:
-    def __init__(self, groups):
-        if groups:
-            self.max_size = max([len(group) for group in groups])
-            self.groups_by_size = [[] for i in range(self.max_size + 1)]
-            self.groups_by_fact = {}
-            for group in groups:
-                group = set(group) # Copy group, as it will be modified.
-                self.groups_by_size[len(group)].append(group)
-                for fact in group:
-                    self.groups_by_fact.setdefault(fact, []).append(group)
-            self._update_top()
-        else:
-            self.max_size = 0
+    """Greedy cover of the reachable facts by mutex groups.
+
+    Facts are numbered, groups are lists of fact ids, and for every group
+    we count its facts that are not covered yet. Groups are kept in
+    buckets by this count and are moved to their current bucket lazily,
+    when they are found in a bucket for a larger count."""
+    def __init__(self, groups, reachable_facts):
+        self.facts = list(reachable_facts)
+        self.fact_ids = dict((fact, id) for id, fact in enumerate(self.facts))
+        self.group_facts = []
+        self.groups_by_fact = [[] for fact in self.facts]
+        for group in groups:
+            group_id = len(self.group_facts)
+            fact_ids = []
+            for fact in group:
+                fact_id = self.fact_ids.get(fact)
+                if fact_id is None:
+                    fact_id = self.fact_ids[fact] = len(self.facts)
+                    self.facts.append(fact)
+                    self.groups_by_fact.append([])
+                if not self.groups_by_fact[fact_id] or \
+                        self.groups_by_fact[fact_id][-1] != group_id:
+                    fact_ids.append(fact_id)
+                    self.groups_by_fact[fact_id].append(group_id)
+            self.group_facts.append(fact_ids)
+        self.num_uncovered = [len(fact_ids) for fact_ids in self.group_facts]
+        self.covered = bytearray(len(self.facts))
+        self.chosen = bytearray(len(self.facts))
+        self.num_reachable_facts = len(reachable_facts)
+        self.chosen_sizes = []
+        self.max_size = max(self.num_uncovered or [0])
+        self.groups_by_size = [[] for i in range(self.max_size + 1)]
+        for group_id, size in enumerate(self.num_uncovered):
+            self.groups_by_size[size].append(group_id)
+        self._update_top()
     def __bool__(self):
         return self.max_size > 1
     __nonzero__ = __bool__
     def pop(self):
-        result = list(self.top) # Copy; this group will shrink further.
+        fact_ids = [fact_id for fact_id in self.group_facts[self.top]
+                    if not self.covered[fact_id]]
+        for fact_id in fact_ids:
+            self.chosen[fact_id] = 1
         if options.use_partial_encoding:
-            for fact in result:
-                for group in self.groups_by_fact[fact]:
-                    group.remove(fact)
+            for fact_id in fact_ids:
+                self.covered[fact_id] = 1
+                for group_id in self.groups_by_fact[fact_id]:
+                    self.num_uncovered[group_id] -= 1
+        self.chosen_sizes.append(len(fact_ids))
         self._update_top()
-        return result
+        return [self.facts[fact_id] for fact_id in fact_ids]
     def _update_top(self):
         while self.max_size > 1:
             max_list = self.groups_by_size[self.max_size]
             while max_list:
                 candidate = max_list.pop()
-                if len(candidate) == self.max_size:
+                size = self.num_uncovered[candidate]
+                if size == self.max_size:
                     self.top = candidate
                     return
-                self.groups_by_size[len(candidate)].append(candidate)
+                self.groups_by_size[size].append(candidate)
             self.max_size -= 1
+    def get_unchosen_facts(self):
+        """Return the reachable facts that are in no chosen group."""
+        return [self.facts[fact_id]
+                for fact_id in range(self.num_reachable_facts)
+                if not self.chosen[fact_id]]
+    def get_ungrouped_facts(self):
+        """Return the reachable facts that are in no group at all."""
+        return [self.facts[fact_id]
+                for fact_id in range(self.num_reachable_facts)
+                if not self.groups_by_fact[fact_id]]
+    def get_statistics(self):
+        return {
+            "chosen_groups": len(self.chosen_sizes),
+            "max_chosen_group_size": max(self.chosen_sizes or [0]),
+            "covered_facts": sum(self.chosen_sizes),
+            "ungrouped_facts": len(self.get_ungrouped_facts()),
+        }
 
 def choose_groups(groups, reachable_facts):
-    queue = GroupCoverQueue(groups)
-    uncovered_facts = reachable_facts.copy()
+    """Return the groups chosen for the partial (or full) encoding and
+    all mutex groups. Facts that are not covered by the chosen groups or
+    not part of any group become groups of their own."""
+    queue = GroupCoverQueue(groups, reachable_facts)
     result = []
     while queue:
-        group = queue.pop()
-        uncovered_facts.difference_update(group)
-        result.append(group)
+        result.append(queue.pop())
+    uncovered_facts = queue.get_unchosen_facts()
     print(len(uncovered_facts), "uncovered facts")
     result += [[fact] for fact in uncovered_facts]
-    return result
+    mutex_groups = list(groups)
+    mutex_groups += [[fact] for fact in queue.get_ungrouped_facts()]
+    timers.add_counts(uncovered_facts=len(uncovered_facts),
+                      **queue.get_statistics())
+    return result, mutex_groups
 
 def build_translation_key(groups):
     group_keys = []
@@ -91,36 +158,21 @@ def build_translation_key(groups):
         group_keys.append(group_key)
     return group_keys
 
-def collect_all_mutex_groups(groups, atoms):
-    # NOTE: This should be functionally identical to choose_groups
-    # when partial_encoding is set to False. Maybe a future
-    # refactoring could take that into account.
-    all_groups = []
-    uncovered_facts = atoms.copy()
-    for group in groups:
-        uncovered_facts.difference_update(group)
-        all_groups.append(group)
-    all_groups += [[fact] for fact in uncovered_facts]
-    return all_groups
-
 def sort_groups(groups):
     return sorted(sorted(group) for group in groups)
 
-def compute_groups(task, atoms, reachable_action_params):
-    groups = invariant_finder.get_groups(task, reachable_action_params)
+def compute_groups(task, atoms, reachable_action_params, domain_cache=None):
+    groups = invariant_finder.get_groups(
+        task, reachable_action_params, domain_cache)
 
     with timers.timing("Instantiating groups"):
-        groups = instantiate_groups(groups, task, atoms)
+        groups = instantiate_groups(groups, atoms)
 
     # Sort here already to get deterministic mutex groups.
     groups = sort_groups(groups)
-    # TODO: I think that collect_all_mutex_groups should do the same thing
-    #       as choose_groups with partial_encoding=False, so these two should
-    #       be unified.
-    with timers.timing("Collecting mutex groups"):
-        mutex_groups = collect_all_mutex_groups(groups, atoms)
     with timers.timing("Choosing groups", block=True):
-        groups = choose_groups(groups, atoms)
+        groups, mutex_groups = choose_groups(groups, atoms)
+        timers.add_counts(groups=len(groups), mutex_groups=len(mutex_groups))
     groups = sort_groups(groups)
     with timers.timing("Building translation key"):
         translation_key = build_translation_key(groups)
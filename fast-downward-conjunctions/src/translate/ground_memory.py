@@ -0,0 +1,70 @@
+#! /usr/bin/env python
+
+"""Report the memory used by the ground actions and fluent facts of a task.
+
+Usage: ground_memory.py DOMAIN TASK
+
+Sizes are measured with sys.getsizeof and include everything reachable
+from the objects (instance dictionaries or slots, lists, tuples and
+literals). Objects shared between several actions, like the object
+name strings, are counted once."""
+
+from __future__ import print_function
+
+import sys
+
+import instantiate
+import normalize
+import options
+import pddl_parser
+
+
+def get_attribute_values(obj):
+    if hasattr(obj, "__dict__"):
+        yield obj.__dict__
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            if hasattr(obj, slot):
+                yield getattr(obj, slot)
+
+
+def get_total_size(objects, seen):
+    total = 0
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif not isinstance(obj, (str, int, float, type(u""))):
+            stack.extend(get_attribute_values(obj))
+    return total
+
+
+def main():
+    options.setup()
+    task = pddl_parser.open()
+    normalize.normalize(task)
+    (relaxed_reachable, fluent_facts, actions, axioms,
+     reachable_action_params) = instantiate.explore(task)
+    # Share the set of seen objects, so that the fact measurements do
+    # not count the strings that are already charged to the actions.
+    seen = set()
+    action_bytes = get_total_size(actions, seen)
+    fact_bytes = get_total_size(fluent_facts, seen)
+    print("%d ground actions: %d bytes (%.1f bytes per action)" % (
+        len(actions), action_bytes,
+        float(action_bytes) / max(len(actions), 1)))
+    print("%d fluent facts: %d bytes (%.1f bytes per fact)" % (
+        len(fluent_facts), fact_bytes,
+        float(fact_bytes) / max(len(fluent_facts), 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,10 @@
 
 from __future__ import print_function
 
-from collections import defaultdict
+from collections import defaultdict, deque
 
 import build_model
+import options
 import pddl_to_prolog
 import pddl
 import timers
@@ -31,33 +32,38 @@ def get_objects_by_type(typed_objects, types):
     return result
 
 def instantiate(task, model):
+    (relaxed_reachable, fluent_facts, actions, axioms,
+     reachable_action_parameters) = instantiate_lazily(task, model)
+    return (relaxed_reachable, fluent_facts, list(actions), axioms,
+            reachable_action_parameters)
+
+def instantiate_lazily(task, model):
+    """Like instantiate, but return the ground actions as an iterator.
+
+    The model is scanned once for everything that fact groups need
+    (fluent facts, reachable action parameters, axioms). The action
+    atoms are kept in a queue that the iterator drains, so neither the
+    model nor all PropositionalActions have to be alive at once."""
     relaxed_reachable = False
     fluent_facts = get_fluent_facts(task, model)
     init_facts = set(task.init)
 
     type_to_objects = get_objects_by_type(task.objects, task.types)
 
-    instantiated_actions = []
+    action_atoms = deque()
     instantiated_axioms = []
     reachable_action_parameters = defaultdict(list)
     for atom in model:
         if isinstance(atom.predicate, pddl.Action):
             action = atom.predicate
-            parameters = action.parameters
-            inst_parameters = atom.args[:len(parameters)]
+            inst_parameters = atom.args[:len(action.parameters)]
             # Note: It's important that we use the action object
             # itself as the key in reachable_action_parameters (rather
             # than action.name) since we can have multiple different
             # actions with the same name after normalization, and we
             # want to distinguish their instantiations.
             reachable_action_parameters[action].append(inst_parameters)
-            variable_mapping = dict([(par.name, arg)
-                                     for par, arg in zip(parameters, atom.args)])
-            inst_action = action.instantiate(variable_mapping, init_facts,
-                                             fluent_facts, type_to_objects,
-                                             task.use_min_cost_metric)
-            if inst_action:
-                instantiated_actions.append(inst_action)
+            action_atoms.append(atom)
         elif isinstance(atom.predicate, pddl.Axiom):
             axiom = atom.predicate
             variable_mapping = dict([(par.name, arg)
@@ -68,17 +74,44 @@ def instantiate(task, model):
         elif atom.predicate == "@goal-reachable":
             relaxed_reachable = True
 
-    return (relaxed_reachable, fluent_facts, instantiated_actions,
+    actions = instantiate_actions(task, action_atoms, init_facts,
+                                  fluent_facts, type_to_objects)
+    return (relaxed_reachable, fluent_facts, actions,
             sorted(instantiated_axioms), reachable_action_parameters)
 
-def explore(task):
-    prog = pddl_to_prolog.translate(task)
-    model = build_model.compute_model(prog)
+def instantiate_actions(task, action_atoms, init_facts, fluent_facts,
+                        type_to_objects):
+    while action_atoms:
+        atom = action_atoms.popleft()
+        action = atom.predicate
+        variable_mapping = dict([(par.name, arg)
+                                 for par, arg in zip(action.parameters, atom.args)])
+        inst_action = action.instantiate(variable_mapping, init_facts,
+                                         fluent_facts, type_to_objects,
+                                         task.use_min_cost_metric)
+        if inst_action:
+            yield inst_action
+
+def compute_model(task, domain_program=None):
+    prog = pddl_to_prolog.translate(task, domain_program)
+    if options.model_engine == "seminaive":
+        return build_model.compute_model_seminaive(prog)
+    else:
+        return build_model.compute_model(prog)
+
+def explore(task, domain_program=None):
+    model = compute_model(task, domain_program)
     with timers.timing("Completing instantiation"):
         return instantiate(task, model)
 
+def explore_lazily(task, domain_program=None):
+    model = compute_model(task, domain_program)
+    with timers.timing("Completing instantiation"):
+        return instantiate_lazily(task, model)
+
 if __name__ == "__main__":
     import pddl_parser
+    options.setup()
     task = pddl_parser.open()
     relaxed_reachable, atoms, actions, axioms, _ = explore(task)
     print("goal relaxed reachable: %s" % relaxed_reachable)
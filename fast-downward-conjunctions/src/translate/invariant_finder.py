@@ -4,6 +4,7 @@ from __future__ import print_function
 
 from collections import deque, defaultdict
 import itertools
+import multiprocessing
 import time
 
 import invariants
@@ -44,17 +45,7 @@ class BalanceChecker(object):
         return self.action_to_heavy_action[action]
 
     def add_inequality_preconds(self, action, reachable_action_params):
-        if reachable_action_params is None or len(action.parameters) < 2:
-            return action
-        inequal_params = []
-        combs = itertools.combinations(range(len(action.parameters)), 2)
-        for pos1, pos2 in combs:
-            for params in reachable_action_params[action]:
-                if params[pos1] == params[pos2]:
-                    break
-            else:
-                inequal_params.append((pos1, pos2))
-
+        inequal_params = get_inequal_params(action, reachable_action_params)
         if inequal_params:
             precond_parts = [action.precondition]
             for pos1, pos2 in inequal_params:
@@ -69,6 +60,21 @@ class BalanceChecker(object):
         else:
             return action
 
+def get_inequal_params(action, reachable_action_params):
+    """Return the pairs of parameter positions of the action that are
+    never instantiated with the same object in reachable_action_params."""
+    if reachable_action_params is None or len(action.parameters) < 2:
+        return []
+    inequal_params = []
+    combs = itertools.combinations(range(len(action.parameters)), 2)
+    for pos1, pos2 in combs:
+        for params in reachable_action_params[action]:
+            if params[pos1] == params[pos2]:
+                break
+        else:
+            inequal_params.append((pos1, pos2))
+    return inequal_params
+
 def get_fluents(task):
     fluent_names = set()
     for action in task.actions:
@@ -97,6 +103,13 @@ def find_invariants(task, reachable_action_params):
             candidates.append(invariant)
             seen_candidates.add(invariant)
 
+    if options.invariant_generation_processes > 1:
+        for invariant in check_candidates_in_parallel(
+                candidates, balance_checker, enqueue_func,
+                options.invariant_generation_processes):
+            yield invariant
+        return
+
     start_time = time.clock()
     while candidates:
         candidate = candidates.popleft()
@@ -106,6 +119,55 @@ def find_invariants(task, reachable_action_params):
         if candidate.check_balance(balance_checker, enqueue_func):
             yield candidate
 
+_worker_balance_checker = None
+
+def _init_worker(balance_checker):
+    global _worker_balance_checker
+    _worker_balance_checker = balance_checker
+
+def _check_candidate(candidate):
+    refinements = []
+    balanced = candidate.check_balance(
+        _worker_balance_checker, refinements.append)
+    return balanced, refinements
+
+def check_candidates_in_parallel(candidates, balance_checker, enqueue_func,
+                                 processes):
+    # Balance checks only depend on the candidate, so all queued
+    # candidates can be checked at once. Passing the refinements to
+    # enqueue_func in queue order afterwards yields the same queue, and
+    # hence the same invariants, as checking the candidates one by one.
+    # The main process is idle while the workers run, so the time limit
+    # is measured in wall-clock time.
+    start_time = time.time()
+    pool = multiprocessing.Pool(processes, _init_worker, (balance_checker,))
+    try:
+        while candidates:
+            if time.time() - start_time > options.invariant_generation_max_time:
+                print("Time limit reached, aborting invariant generation")
+                return
+            batch = list(candidates)
+            candidates.clear()
+            chunksize = max(1, len(batch) // (4 * processes))
+            results = pool.map(_check_candidate, batch, chunksize)
+            for candidate, (balanced, refinements) in zip(batch, results):
+                for refinement in refinements:
+                    enqueue_func(refinement)
+                if balanced:
+                    yield candidate
+    finally:
+        pool.terminate()
+
+def revalidate_invariants(task, invariants, reachable_action_params):
+    """Return the given invariants (e.g. proven for another problem of the
+    same domain) that are balanced for this task, in the given order.
+    This only needs one balance check per invariant and no search."""
+    balance_checker = BalanceChecker(task, reachable_action_params)
+    def ignore_refinement(invariant):
+        pass
+    return [invariant for invariant in invariants
+            if invariant.check_balance(balance_checker, ignore_refinement)]
+
 def useful_groups(invariants, initial_facts):
     predicate_to_invariants = defaultdict(list)
     for invariant in invariants:
@@ -127,9 +189,14 @@ def useful_groups(invariants, initial_facts):
     for (invariant, parameters) in useful_groups:
         yield [part.instantiate(parameters) for part in sorted(invariant.parts)]
 
-def get_groups(task, reachable_action_params=None):
+def get_groups(task, reachable_action_params=None, domain_cache=None):
     with timers.timing("Finding invariants", block=True):
-        invariants = sorted(find_invariants(task, reachable_action_params))
+        if domain_cache is None:
+            invariants = sorted(find_invariants(task, reachable_action_params))
+        else:
+            invariants = domain_cache.get_invariants(
+                task, reachable_action_params)
+        timers.add_counts(invariants=len(invariants))
     with timers.timing("Checking invariant weight"):
         result = list(useful_groups(invariants, task.init))
     return result
@@ -138,6 +205,7 @@ if __name__ == "__main__":
     import normalize
     import pddl_parser
 
+    options.setup()
     print("Parsing...")
     task = pddl_parser.open()
     print("Normalizing...")
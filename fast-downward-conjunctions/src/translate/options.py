@@ -4,12 +4,13 @@ import argparse
 import sys
 
 
-def parse_args():
+def get_argparser(with_inputs=True):
     argparser = argparse.ArgumentParser()
-    argparser.add_argument(
-        "domain", help="path to domain pddl file")
-    argparser.add_argument(
-        "task", help="path to task pddl file")
+    if with_inputs:
+        argparser.add_argument(
+            "domain", help="path to domain pddl file")
+        argparser.add_argument(
+            "task", help="path to task pddl file")
     argparser.add_argument(
         "--relaxed", dest="generate_relaxed_task", action="store_true",
         help="output relaxed task (no delete effects)")
@@ -30,6 +31,13 @@ def parse_args():
     argparser.add_argument(
         "--invariant-generation-max-time", default=300, type=int,
         help="max time for invariant generation (default: %(default)ds)")
+    argparser.add_argument(
+        "--invariant-generation-processes", default=1, type=int,
+        metavar="N",
+        help="check invariant candidates in batches on a pool of N "
+        "processes (default: %(default)d). The invariants found are the "
+        "same as with one process, but the time limit is measured in "
+        "wall-clock time and only checked between batches.")
     argparser.add_argument(
         "--add-implied-preconditions", action="store_true",
         help="infer additional preconditions. This setting can cause a "
@@ -39,10 +47,56 @@ def parse_args():
         "--keep-unreachable-facts",
         dest="filter_unreachable_facts", action="store_false",
         help="keep facts that can't be reached from the initial state")
+    argparser.add_argument(
+        "--model-engine", choices=["queue", "seminaive"], default="queue",
+        help="algorithm for computing the relaxed reachability model of "
+        "the Datalog program: 'queue' processes one atom at a time, "
+        "'seminaive' fires rules on whole batches of new atoms using "
+        "hash-indexed joins (default: %(default)s)")
+    argparser.add_argument(
+        "--negated-conditions", choices=["multiply-out", "axioms"],
+        default="multiply-out",
+        help="how to translate negated conditions on facts of variables "
+        "with more than two values: 'multiply-out' creates one operator "
+        "(or axiom or effect) per remaining value of the variable, which "
+        "can grow exponentially with the number of such conditions, "
+        "'axioms' uses one derived variable per condition instead. Only "
+        "use 'axioms' with search components that support axioms "
+        "(default: %(default)s)")
+    argparser.add_argument(
+        "--domain-cache", metavar="DIR",
+        help="keep the normalized domain, its Datalog rules and its "
+        "invariants in DIR and reuse them for later problems of the same "
+        "domain (see domain_cache.py)")
+    argparser.add_argument(
+        "--profile", metavar="FILE",
+        help="write wall-clock time, CPU time, peak memory and object "
+        "counts of every translator phase as JSON to FILE")
+    argparser.add_argument(
+        "--output-format", choices=["text", "binary"], default="text",
+        help="format of output.sas: 'binary' is much faster to write and "
+        "to read for the preprocessor, but not human-readable "
+        "(default: %(default)s)")
+    argparser.add_argument(
+        "--sas-file", metavar="FILE", default="output.sas",
+        help="write the SAS+ task to FILE, which can also be a named pipe "
+        "or a file descriptor like /dev/fd/3 (default: %(default)s)")
     argparser.add_argument(
         "--dump-task", action="store_true",
         help="dump human-readable SAS+ representation of the task")
-    return argparser.parse_args()
+    return argparser
+
+
+def parse_args(argv=None):
+    return get_argparser().parse_args(argv)
+
+
+def get_defaults():
+    """Return a dictionary mapping the names of all options to their
+    default values. The input files default to None."""
+    defaults = vars(get_argparser(with_inputs=False).parse_args([]))
+    defaults.update(domain=None, task=None)
+    return defaults
 
 
 def copy_args_to_module(args):
@@ -51,9 +105,27 @@ def copy_args_to_module(args):
         module_dict[key] = value
 
 
-def setup():
-    args = parse_args()
+def setup(argv=None):
+    """Set the options from the command line argv (default:
+    sys.argv[1:])."""
+    args = parse_args(argv)
     copy_args_to_module(args)
 
 
-setup()
+def set_options(**kwargs):
+    """Set the options given as keyword arguments and all others to their
+    defaults. The options are named like the attributes of this module,
+    e.g. set_options(task="p01.pddl", use_partial_encoding=False)."""
+    values = get_defaults()
+    unknown = set(kwargs) - set(values)
+    if unknown:
+        raise TypeError("unknown translator options: %s" %
+                        ", ".join(sorted(unknown)))
+    values.update(kwargs)
+    copy_args_to_module(argparse.Namespace(**values))
+
+
+# Importing this module sets all options to their defaults. The
+# translator sets them from its command line with setup(), programs that
+# use it as a library with set_options().
+set_options()
@@ -0,0 +1,107 @@
+#! /usr/bin/env python
+
+"""Time the PDDL tokenizer and nested list builder.
+
+Usage: parser_benchmark.py [FILE_OR_DIRECTORY ...]
+
+Compares parsing with the former line-by-line tokenizer and recursive list
+builder (legacy_parse) with parsing via
+lisp_parser.parse_nested_list_from_file. Directories are searched
+recursively and contribute their five largest PDDL files. Without
+arguments, the largest files of LAPKT-public/benchmarks are used."""
+
+from __future__ import print_function
+
+import codecs
+import os
+import sys
+import timeit
+
+from pddl_parser import lisp_parser
+
+TRANSLATE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_BENCHMARKS = os.path.join(
+    TRANSLATE_DIR, "..", "..", "..", "LAPKT-public", "benchmarks")
+NUM_LARGEST_FILES = 5
+
+
+def legacy_tokenize(input):
+    for line in input:
+        line = line.split(";", 1)[0]  # Strip comments.
+        try:
+            line.encode("ascii")
+        except UnicodeEncodeError:
+            raise lisp_parser.ParseError(
+                "Non-ASCII character outside comment: %s" % line[0:-1])
+        line = line.replace("(", " ( ").replace(")", " ) ").replace("?", " ?")
+        for token in line.split():
+            yield token.lower()
+
+
+def legacy_parse_list_aux(tokenstream):
+    # Leading "(" has already been swallowed.
+    while True:
+        try:
+            token = next(tokenstream)
+        except StopIteration:
+            raise lisp_parser.ParseError("Missing ')'")
+        if token == ")":
+            return
+        elif token == "(":
+            yield list(legacy_parse_list_aux(tokenstream))
+        else:
+            yield token
+
+
+def legacy_parse(filename):
+    with codecs.open(filename, encoding="ISO-8859-1") as input_file:
+        tokens = legacy_tokenize(input_file)
+        next_token = next(tokens)
+        if next_token != "(":
+            raise lisp_parser.ParseError("Expected '(', got %s." % next_token)
+        result = list(legacy_parse_list_aux(tokens))
+        for tok in tokens:  # Check that generator is exhausted.
+            raise lisp_parser.ParseError("Unexpected token: %s." % tok)
+        return result
+
+
+def find_largest_files(directory):
+    files = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.endswith(".pddl"):
+                path = os.path.join(dirpath, filename)
+                files.append((os.path.getsize(path), path))
+    files.sort(reverse=True)
+    return [path for size, path in files[:NUM_LARGEST_FILES]]
+
+
+def time_parse(function, filename, repeat=3):
+    return min(timeit.repeat(lambda: function(filename),
+                             number=1, repeat=repeat))
+
+
+def report(filename):
+    assert legacy_parse(filename) == \
+        lisp_parser.parse_nested_list_from_file(filename)
+    legacy = time_parse(legacy_parse, filename)
+    current = time_parse(lisp_parser.parse_nested_list_from_file, filename)
+    print("%-50s %6d KB  legacy: %7.3f s  current: %7.3f s  "
+          "speedup: %5.2fx" % (
+              os.path.relpath(filename), os.path.getsize(filename) // 1024,
+              legacy, current, legacy / current))
+
+
+def main():
+    paths = sys.argv[1:] or [DEFAULT_BENCHMARKS]
+    for path in paths:
+        if os.path.isdir(path):
+            for filename in find_largest_files(path):
+                report(filename)
+        else:
+            report(path)
+
+
+if __name__ == "__main__":
+    main()
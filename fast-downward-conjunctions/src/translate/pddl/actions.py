@@ -102,7 +102,13 @@ class Action(object):
             return None
 
 
-class PropositionalAction:
+MAX_EFFECTS_FOR_LIST_LOOKUP = 8
+
+
+class PropositionalAction(object):
+    __slots__ = ("name", "precondition", "add_effects", "del_effects",
+                 "cost")
+
     def __init__(self, name, precondition, effects, cost):
         self.name = name
         self.precondition = precondition
@@ -111,13 +117,26 @@ class PropositionalAction:
         for condition, effect in effects:
             if not effect.negated:
                 self.add_effects.append((condition, effect))
-        # Warning: This is O(N^2), could be turned into O(N).
-        # But that might actually harm performance, since there are
-        # usually few effects.
-        # TODO: Measure this in critical domains, then use sets if acceptable.
-        for condition, effect in effects:
-            if effect.negated and (condition, effect.negate()) not in self.add_effects:
-                self.del_effects.append((condition, effect.negate()))
+        # A delete effect is dropped if the same atom is added under the
+        # same condition. Scanning add_effects for this is quadratic, but
+        # it is the cheapest option for the few effects of most actions.
+        # Above MAX_EFFECTS_FOR_LIST_LOOKUP effects (e.g. for large
+        # universally quantified conditional effects) we use a set.
+        # effect_benchmark.py measures both options.
+        if len(effects) > MAX_EFFECTS_FOR_LIST_LOOKUP:
+            added = set((tuple(condition), effect)
+                        for condition, effect in self.add_effects)
+            for condition, effect in effects:
+                if effect.negated:
+                    atom = effect.negate()
+                    if (tuple(condition), atom) not in added:
+                        self.del_effects.append((condition, atom))
+        else:
+            for condition, effect in effects:
+                if effect.negated:
+                    atom = effect.negate()
+                    if (condition, atom) not in self.add_effects:
+                        self.del_effects.append((condition, atom))
         self.cost = cost
 
     def __repr__(self):
@@ -8,11 +8,20 @@ from __future__ import print_function
 # Careful: Most other classes (e.g. Effects, Axioms, Actions) are not!
 
 class Condition(object):
+    # Ground literals are by far the most numerous conditions, so
+    # Literal and its subclasses keep all their state in slots. Other
+    # conditions still get an instance dictionary from their classes.
+    __slots__ = ("parts", "hash")
     def __init__(self, parts):
         self.parts = tuple(parts)
         self.hash = hash((self.__class__, self.parts))
     def __hash__(self):
         return self.hash
+    def __reduce__(self):
+        # The precomputed hash is only valid within one process (class
+        # hashes are based on their id), so unpickling must go through
+        # the constructor instead of restoring the slots.
+        return (self.__class__, (self.parts,))
     def __ne__(self, other):
         return not self == other
     def __lt__(self, other):
@@ -78,6 +87,8 @@ class ConstantCondition(Condition):
     parts = ()
     def __init__(self):
         self.hash = hash(self.__class__)
+    def __reduce__(self):
+        return (self.__class__, ())
     def change_parts(self, parts):
         return self
     def __eq__(self, other):
@@ -165,6 +176,8 @@ class QuantifiedCondition(Condition):
         self.parameters = tuple(parameters)
         self.parts = tuple(parts)
         self.hash = hash((self.__class__, self.parameters, self.parts))
+    def __reduce__(self):
+        return (self.__class__, (self.parameters, self.parts))
     def __eq__(self, other):
         # Compare hash first for speed reasons.
         return (self.hash == other.hash and
@@ -221,11 +234,14 @@ class ExistentialCondition(QuantifiedCondition):
 class Literal(Condition):
     # Defining __eq__ blocks inheritance of __hash__, so must set it explicitly.
     __hash__ = Condition.__hash__
-    parts = []
+    __slots__ = ("predicate", "args")
+    parts = ()
     def __init__(self, predicate, args):
         self.predicate = predicate
         self.args = tuple(args)
         self.hash = hash((self.__class__, self.predicate, self.args))
+    def __reduce__(self):
+        return (self.__class__, (self.predicate, self.args))
     def __eq__(self, other):
         # Compare hash first for speed reasons.
         return (self.hash == other.hash and
@@ -263,6 +279,7 @@ class Literal(Condition):
         return set(arg for arg in self.args if arg[0] == "?")
 
 class Atom(Literal):
+    __slots__ = ()
     negated = False
     def to_untyped_strips(self):
         return [self]
@@ -279,6 +296,7 @@ class Atom(Literal):
         return self
 
 class NegatedAtom(Literal):
+    __slots__ = ()
     negated = True
     def _relaxed(self, parts):
         return Truth()
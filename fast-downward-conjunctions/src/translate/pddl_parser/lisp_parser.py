@@ -1,4 +1,6 @@
-__all__ = ["ParseError", "parse_nested_list"]
+import re
+
+__all__ = ["ParseError", "parse_nested_list", "parse_nested_list_from_file"]
 
 class ParseError(Exception):
     def __init__(self, value):
@@ -6,39 +8,64 @@ class ParseError(Exception):
     def __str__(self):
         return self.value
 
+COMMENT_RE = re.compile(r";[^\r\n]*")
+NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+
 # Basic functions for parsing PDDL (Lisp) files.
 def parse_nested_list(input_file):
-    tokens = tokenize(input_file)
-    next_token = next(tokens)
-    if next_token != "(":
-        raise ParseError("Expected '(', got %s." % next_token)
-    result = list(parse_list_aux(tokens))
-    for tok in tokens:  # Check that generator is exhausted.
-        raise ParseError("Unexpected token: %s." % tok)
-    return result
+    """Parse the lines of input_file, e.g. an open text file."""
+    return build_nested_list(tokenize("".join(input_file)))
 
-def tokenize(input):
-    for line in input:
-        line = line.split(";", 1)[0]  # Strip comments.
-        try:
-            line.encode("ascii")
-        except UnicodeEncodeError:
-            raise ParseError("Non-ASCII character outside comment: %s" %
-                             line[0:-1])
-        line = line.replace("(", " ( ").replace(")", " ) ").replace("?", " ?")
-        for token in line.split():
-            yield token.lower()
+def parse_nested_list_from_file(filename):
+    """Parse the PDDL file with the given name. The whole file is read
+    and tokenized in one pass. We use the Latin-1 encoding (which allows
+    a superset of ASCII, of the Latin-* encodings and of UTF-8) to allow
+    special characters in comments. tokenize() validates that only ASCII
+    is used in all other parts."""
+    with open(filename, "rb") as input_file:
+        text = input_file.read().decode("ISO-8859-1")
+    return build_nested_list(tokenize(text))
 
-def parse_list_aux(tokenstream):
-    # Leading "(" has already been swallowed.
-    while True:
-        try:
-            token = next(tokenstream)
-        except StopIteration:
-            raise ParseError("Missing ')'")
-        if token == ")":
-            return
-        elif token == "(":
-            yield list(parse_list_aux(tokenstream))
+def tokenize(text):
+    """Return the list of lower-case tokens of text. The whole text is
+    split at once, which is much faster than splitting it line by line."""
+    text = COMMENT_RE.sub("", text)
+    match = NON_ASCII_RE.search(text)
+    if match:
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        line_end = text.find("\n", match.start())
+        if line_end == -1:
+            line_end = len(text)
+        raise ParseError("Non-ASCII character outside comment: %s" %
+                         text[line_start:line_end])
+    text = text.lower()
+    text = text.replace("(", " ( ").replace(")", " ) ").replace("?", " ?")
+    return text.split()
+
+def build_nested_list(tokens):
+    """Build the nested list for a token list that starts with "(".
+    Sublists are built iteratively, so that deeply nested or very long
+    lists do not hit the recursion limit."""
+    tokens = iter(tokens)
+    next_token = next(tokens, "end of file")
+    if next_token != "(":
+        raise ParseError("Expected '(', got %s." % next_token)
+    stack = []
+    current = []
+    for token in tokens:
+        if token == "(":
+            sublist = []
+            current.append(sublist)
+            stack.append(current)
+            current = sublist
+        elif token == ")":
+            if not stack:
+                break
+            current = stack.pop()
         else:
-            yield token
+            current.append(token)
+    else:
+        raise ParseError("Missing ')'")
+    for token in tokens:
+        raise ParseError("Unexpected token: %s." % token)
+    return current
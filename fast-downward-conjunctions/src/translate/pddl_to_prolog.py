@@ -2,8 +2,6 @@
 
 from __future__ import print_function
 
-import itertools
-
 import normalize
 import pddl
 import timers
@@ -13,10 +11,22 @@ class PrologProgram:
         self.facts = []
         self.rules = []
         self.objects = set()
-        def predicate_name_generator():
-            for count in itertools.count():
-                yield "p$%d" % count
-        self.new_name = predicate_name_generator()
+        self.uses_object_predicate = False
+        self.num_new_names = 0
+        self.new_name = self._generate_new_names()
+    def _generate_new_names(self):
+        while True:
+            name = "p$%d" % self.num_new_names
+            self.num_new_names += 1
+            yield name
+    def __getstate__(self):
+        # Generators cannot be pickled; num_new_names suffices to resume.
+        state = dict(self.__dict__)
+        del state["new_name"]
+        return state
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.new_name = self._generate_new_names()
     def add_fact(self, atom):
         self.facts.append(Fact(atom))
         self.objects |= set(atom.args)
@@ -27,26 +37,37 @@ class PrologProgram:
             print(fact, file=file)
         for rule in self.rules:
             print(getattr(rule, "type", "none"), rule, file=file)
-    def normalize(self):
+    def normalize(self, domain_program=None):
         # Normalized prolog programs have the following properties:
         # 1. Each variable that occurs in the effect of a rule also occurs in its
         #    condition.
         # 2. The variables that appear in each effect or condition are distinct.
         # 3. There are no rules with empty condition.
-        self.remove_free_effect_variables()
+        # The rules of domain_program (see translate_domain) are normalized
+        # already. They precede our rules, so their trivial rules become
+        # facts before ours.
+        self.remove_free_effect_variables(domain_program)
+        if domain_program is not None:
+            for fact in domain_program.facts:
+                self.add_fact(fact.atom)
         self.split_duplicate_arguments()
         self.convert_trivial_rules()
-    def split_rules(self):
+    def split_rules(self, domain_program=None):
         import split_rules
         # Splits rules whose conditions can be partitioned in such a way that
         # the parts have disjoint variable sets, then split n-ary joins into
         # a number of binary joins, introducing new pseudo-predicates for the
         # intermediate values.
         new_rules = []
+        if domain_program is not None:
+            # These rules are split already. Continue their numbering of
+            # pseudo-predicates.
+            new_rules += domain_program.rules
+            self.num_new_names = domain_program.num_new_names
         for rule in self.rules:
             new_rules += split_rules.split_rule(rule, self.new_name)
         self.rules = new_rules
-    def remove_free_effect_variables(self):
+    def remove_free_effect_variables(self, domain_program=None):
         """Remove free effect variables like the variable Y in the rule
         p(X, Y) :- q(X). This is done by introducing a new predicate
         @object, setting it true for all objects, and translating the above
@@ -55,7 +76,8 @@ class PrologProgram:
 
         # Note: This should never be necessary for typed domains.
         # Leaving it in at the moment regardless.
-        must_add_predicate = False
+        must_add_predicate = (domain_program is not None and
+                              domain_program.uses_object_predicate)
         for rule in self.rules:
             eff_vars = get_variables([rule.effect])
             cond_vars = get_variables(rule.conditions)
@@ -64,6 +86,7 @@ class PrologProgram:
                 eff_vars -= cond_vars
                 for var in sorted(eff_vars):
                     rule.add_condition(pddl.Atom("@object", [var]))
+        self.uses_object_predicate = must_add_predicate
         if must_add_predicate:
             print("Unbound effect variables: Adding @object predicate.")
             self.facts += [Fact(pddl.Atom("@object", [obj])) for obj in self.objects]
@@ -157,23 +180,46 @@ def translate_facts(prog, task):
         if isinstance(fact, pddl.Atom):
             prog.add_fact(fact)
 
-def translate(task):
+def translate(task, domain_program=None):
     # Note: The function requires that the task has been normalized.
+    # If domain_program is given, it must come from translate_domain for
+    # the domain of the task, and only the rules of the goal and of the
+    # axioms added by normalize.normalize_goal are translated here.
     with timers.timing("Generating Datalog program"):
         prog = PrologProgram()
         translate_facts(prog, task)
-        for conditions, effect in normalize.build_exploration_rules(task):
+        if domain_program is None:
+            rules = normalize.build_exploration_rules(task)
+        else:
+            rules = normalize.build_problem_exploration_rules(
+                task, domain_program.num_domain_axioms)
+        for conditions, effect in rules:
             prog.add_rule(Rule(conditions, effect))
     with timers.timing("Normalizing Datalog program", block=True):
         # Using block=True because normalization can output some messages
         # in rare cases.
-        prog.normalize()
-        prog.split_rules()
+        prog.normalize(domain_program)
+        prog.split_rules(domain_program)
+    return prog
+
+def translate_domain(domain):
+    """Translate the actions and axioms of a normalized domain (see
+    pddl_parser.parsing_functions.parse_domain) into a normalized and
+    split program without facts, which can be passed to translate() for
+    every problem of the domain."""
+    prog = PrologProgram()
+    for conditions, effect in normalize.build_domain_exploration_rules(domain):
+        prog.add_rule(Rule(conditions, effect))
+    prog.normalize()
+    prog.split_rules()
+    prog.num_domain_axioms = len(domain.axioms)
     return prog
 
 
 if __name__ == "__main__":
+    import options
     import pddl_parser
+    options.setup()
     task = pddl_parser.open()
     normalize.normalize(task)
     prog = translate(task)
@@ -0,0 +1,65 @@
+import pddl
+from pddl_to_prolog import Rule, PrologProgram
+import build_model
+
+
+def get_program():
+    prog = PrologProgram()
+    for x, y in [("a", "b"), ("b", "c"), ("c", "d"), ("d", "b"), ("e", "f")]:
+        prog.add_fact(pddl.Atom("edge", [x, y]))
+    for obj in "abcdef":
+        prog.add_fact(pddl.Atom("node", [obj]))
+        prog.add_fact(pddl.Atom("=", [obj, obj]))
+    prog.add_fact(pddl.Atom("start", ["a"]))
+    prog.add_fact(pddl.Atom("color", ["red"]))
+    prog.add_fact(pddl.Atom("color", ["blue"]))
+    # Recursive join: transitive closure.
+    prog.add_rule(Rule([pddl.Atom("edge", ["?x", "?y"])],
+                       pddl.Atom("path", ["?x", "?y"])))
+    prog.add_rule(Rule([pddl.Atom("path", ["?x", "?y"]),
+                        pddl.Atom("edge", ["?y", "?z"])],
+                       pddl.Atom("step", ["?x", "?y", "?z"])))
+    prog.add_rule(Rule([pddl.Atom("step", ["?x", "?y", "?z"])],
+                       pddl.Atom("path", ["?x", "?z"])))
+    # Constants in conditions and effects.
+    prog.add_rule(Rule([pddl.Atom("path", ["a", "?y"])],
+                       pddl.Atom("from-a", ["?y", "a"])))
+    # Product of conditions without shared variables.
+    prog.add_rule(Rule([pddl.Atom("from-a", ["?y", "?s"]),
+                        pddl.Atom("color", ["?c"])],
+                       pddl.Atom("painted", ["?y", "?c"])))
+    # Projection and a free effect variable.
+    prog.add_rule(Rule([pddl.Atom("path", ["?x", "?y"])],
+                       pddl.Atom("pair", ["?x", "?z"])))
+    # Equality and a wide rule that is split into several joins.
+    prog.add_rule(Rule([pddl.Atom("path", ["?x", "?y"]),
+                        pddl.Atom("=", ["?x", "?y"])],
+                       pddl.Atom("loop", ["?x", "?y"])))
+    prog.add_rule(Rule([pddl.Atom("loop", ["?x", "?y"])],
+                       pddl.Atom("cyclic", ["?x"])))
+    prog.add_rule(Rule([pddl.Atom("start", ["?s"]),
+                        pddl.Atom("path", ["?s", "?y"]),
+                        pddl.Atom("cyclic", ["?y"]),
+                        pddl.Atom("painted", ["?y", "blue"])],
+                       pddl.Atom("goal", [])))
+    prog.add_rule(Rule([pddl.Atom("cyclic", ["e"])],
+                       pddl.Atom("unreachable", [])))
+    prog.normalize()
+    prog.split_rules()
+    return prog
+
+
+def as_set(model):
+    return set((atom.predicate, tuple(atom.args)) for atom in model)
+
+
+def test_seminaive_model_matches_queue_model():
+    prog = get_program()
+    queue_model = build_model.compute_model(prog)
+    seminaive_model = build_model.compute_model_seminaive(prog)
+    assert len(seminaive_model) == len(as_set(seminaive_model))
+    assert as_set(seminaive_model) == as_set(queue_model)
+    predicates = set(atom.predicate for atom in seminaive_model)
+    assert "goal" in predicates
+    assert "unreachable" not in predicates
+    assert ("cyclic", ("b",)) in as_set(seminaive_model)